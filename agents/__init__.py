@@ -1,3 +1,6 @@
 from .workflow import ResearchWorkflow
+from .plan_cache import QueryPlanCache
+from .budget import QueryBudget
+from .checkpoints import CheckpointStore
 
-__all__ = ['ResearchWorkflow']
+__all__ = ['ResearchWorkflow', 'QueryPlanCache', 'QueryBudget', 'CheckpointStore']
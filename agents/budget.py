@@ -0,0 +1,107 @@
+import time
+from typing import Any, Dict, List, Optional, Union
+from memory.tokens import estimate_tokens
+import config
+
+class QueryBudget:
+    """Deadline, token and cost limits for one workflow run
+    
+    Each step gets a deadline at its cumulative share of the total (see
+    BUDGET_STEP_SHARES), so time a step does not use rolls over to the next.
+    Degradations applied to stay within budget are recorded and mark the
+    result as partial.
+    """
+    
+    def __init__(
+        self,
+        deadline_seconds: float,
+        max_tokens: Optional[int] = None,
+        max_cost_usd: Optional[float] = None,
+        max_sub_queries: int = 5,
+        external_verification: bool = True,
+        profile: str = "custom"
+    ):
+        self.deadline_seconds = deadline_seconds
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+        self.max_sub_queries = max_sub_queries
+        self.external_verification = external_verification
+        self.profile = profile
+        self.started: Optional[float] = None
+        self.tokens_used = 0
+        self.cost_usd = 0.0
+        self.degradations: List[str] = []
+    
+    @classmethod
+    def from_profile(cls, profile: str) -> "QueryBudget":
+        return cls(profile=profile, **config.QUERY_BUDGETS[profile])
+    
+    @classmethod
+    def resolve(cls, budget: Union["QueryBudget", str, None]) -> "QueryBudget":
+        """A started budget from a profile name, an existing budget, or the default profile"""
+        if not isinstance(budget, QueryBudget):
+            budget = cls.from_profile(budget or config.DEFAULT_QUERY_BUDGET)
+        if budget.started is None:
+            budget.start()
+        return budget
+    
+    def start(self):
+        self.started = time.monotonic()
+    
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started if self.started is not None else 0.0
+    
+    @property
+    def remaining_seconds(self) -> float:
+        return max(self.deadline_seconds - self.elapsed_seconds, 0.0)
+    
+    @property
+    def remaining_tokens(self) -> float:
+        token_limits = [float("inf")]
+        if self.max_tokens is not None:
+            token_limits.append(self.max_tokens - self.tokens_used)
+        if self.max_cost_usd is not None:
+            # Remaining spend expressed in (output-priced, i.e. conservative) tokens
+            token_limits.append((self.max_cost_usd - self.cost_usd) / config.LLM_OUTPUT_COST_PER_1K_TOKENS * 1000)
+        return max(min(token_limits), 0)
+    
+    @property
+    def partial(self) -> bool:
+        return bool(self.degradations)
+    
+    def step_timeout(self, step: str) -> float:
+        """Seconds left until the step's deadline"""
+        steps = list(config.BUDGET_STEP_SHARES)
+        cumulative_share = sum(config.BUDGET_STEP_SHARES[name] for name in steps[:steps.index(step) + 1])
+        return max(cumulative_share * self.deadline_seconds - self.elapsed_seconds, 0.0)
+    
+    def can_afford(self, steps: List[str], tokens: int = 0) -> bool:
+        """Whether the remaining budget covers the given steps' time shares and tokens"""
+        seconds_needed = sum(config.BUDGET_STEP_SHARES[step] for step in steps) * self.deadline_seconds
+        return self.remaining_seconds >= seconds_needed and self.remaining_tokens >= tokens
+    
+    def record(self, prompt: str, completion: str = ""):
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(completion)
+        self.tokens_used += prompt_tokens + completion_tokens
+        self.cost_usd += (
+            prompt_tokens * config.LLM_INPUT_COST_PER_1K_TOKENS
+            + completion_tokens * config.LLM_OUTPUT_COST_PER_1K_TOKENS
+        ) / 1000
+    
+    def degrade(self, reason: str):
+        if reason not in self.degradations:
+            self.degradations.append(reason)
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile,
+            "deadline_seconds": self.deadline_seconds,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "max_tokens": self.max_tokens,
+            "tokens_used": self.tokens_used,
+            "cost_usd": round(self.cost_usd, 4),
+            "degradations": list(self.degradations),
+            "partial": self.partial
+        }
@@ -0,0 +1,110 @@
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from tools.financial_extractor import FinancialMetricsExtractor
+import config
+
+# Workflow steps in order; a checkpoint holds the event the step emitted
+CHECKPOINT_STEPS = ("plan", "research", "calculate", "validate")
+
+# Follow-ups that reshape the last answer rather than ask for new data
+REFINEMENT_PATTERN = re.compile(
+    r"\b(?:elaborate|expand on|more detail|in detail|go deeper|explain (?:that|this|it|why)|"
+    r"just the|only the|focus on|shorter|briefly|in short|simplify|simpler|rephrase|"
+    r"tl;?dr|summari[sz]e (?:that|this|it))\b",
+    re.IGNORECASE
+)
+
+def is_refinement(query: str, previous_turn: Optional[str] = None) -> bool:
+    """Whether a question reshapes an earlier answer rather than asking for new data
+    
+    With previous_turn (the earlier question and answer), a question naming a
+    company, segment, metric or year that turn did not mention is a new
+    question, however it is worded ("Briefly, what was 2023 free cash flow?").
+    """
+    if not REFINEMENT_PATTERN.search(query):
+        return False
+    return previous_turn is None or not _entities(query) - _entities(previous_turn)
+
+def _entities(text: str) -> set:
+    mentions = FinancialMetricsExtractor.find_entity_mentions(text, config.KNOWN_COMPANIES)
+    return {(m["type"], m["value"]) for m in mentions}
+
+class CheckpointStore:
+    """LRU store of per-run workflow step outputs, bounded by run count and serialized size
+    
+    A run is keyed by its normalized question. Each step's output event is
+    stored as JSON (so restored runs cannot alias live state), flagged
+    partial when the run had degraded by then. Retries resume from the
+    deepest complete checkpoint of their own key; refinements of the last
+    answer resume from the deepest checkpoint of the run they refine. The
+    last run is tracked per session, so concurrent callers never refine
+    each other's answers.
+    """
+    
+    def __init__(self, max_runs: int = config.CHECKPOINT_MAX_RUNS, max_bytes: int = config.CHECKPOINT_MAX_BYTES):
+        self.max_runs = max_runs
+        self.max_bytes = max_bytes
+        self._runs: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self.total_bytes = 0
+        self._latest_keys: "OrderedDict[Optional[str], str]" = OrderedDict()
+        self.resumes = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key_for(query: str) -> str:
+        return " ".join(re.sub(r"[^\w\s%$.]", " ", query.lower()).split())
+    
+    def latest_key(self, session_id: Optional[str] = None) -> Optional[str]:
+        """Key of the session's last completed run"""
+        return self._latest_keys.get(session_id)
+    
+    def set_latest_key(self, session_id: Optional[str], key: Optional[str]):
+        """Record the session's last run; None when its last answer came from elsewhere"""
+        if key is None:
+            self._latest_keys.pop(session_id, None)
+            return
+        self._latest_keys[session_id] = key
+        self._latest_keys.move_to_end(session_id)
+        while len(self._latest_keys) > config.CONVERSATION_MAX_SESSIONS:
+            self._latest_keys.popitem(last=False)
+    
+    def save(self, key: str, step: str, payload: Dict[str, Any], partial: bool = False):
+        serialized = json.dumps(payload, default=str)
+        run = self._runs.setdefault(key, {})
+        if step in run:
+            self.total_bytes -= len(run[step]["payload"])
+        run[step] = {"payload": serialized, "partial": partial}
+        self.total_bytes += len(serialized)
+        self._runs.move_to_end(key)
+        while len(self._runs) > 1 and (len(self._runs) > self.max_runs or self.total_bytes > self.max_bytes):
+            _, evicted = self._runs.popitem(last=False)
+            self.total_bytes -= sum(len(checkpoint["payload"]) for checkpoint in evicted.values())
+            self.evictions += 1
+    
+    def deepest(self, key: str, allow_partial: bool = False) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(step, payload) of the latest step checkpointed for key, or None"""
+        run = self._runs.get(key)
+        if not run:
+            return None
+        for step in reversed(CHECKPOINT_STEPS):
+            checkpoint = run.get(step)
+            if checkpoint is not None and (allow_partial or not checkpoint["partial"]):
+                self._runs.move_to_end(key)
+                self.resumes += 1
+                return step, json.loads(checkpoint["payload"])
+        return None
+    
+    def load(self, key: str, step: str) -> Optional[Dict[str, Any]]:
+        """Payload of one checkpoint, or None"""
+        checkpoint = self._runs.get(key, {}).get(step)
+        return json.loads(checkpoint["payload"]) if checkpoint is not None else None
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": len(self._runs),
+            "bytes": self.total_bytes,
+            "resumes": self.resumes,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,63 @@
+from itertools import product
+from typing import Dict, List, Optional, Set, Tuple
+from tools.financial_extractor import FIGURE_METRICS, FinancialMetricsExtractor
+
+# (segment or None for company level, metric, year or None for any year)
+Requirement = Tuple[Optional[str], str, Optional[int]]
+
+class CoverageTracker:
+    """Tracks which of a plan's data points the research so far has produced figures for
+    
+    Each data point is parsed into segment/metric/year requirements
+    ("Aerospace and HBT margin 2023" needs two figures). A margin also counts
+    as covered once the segment profit and revenue it is computed from are
+    both known. Data points naming no supported metric cannot be checked, so a
+    plan with any of them is never complete and runs all its sub-queries.
+    """
+    
+    def __init__(self, data_points: List[str]):
+        self.data_points = list(data_points)
+        self.requirements: Dict[str, List[Requirement]] = {}
+        self.trackable = bool(self.data_points)
+        for data_point in self.data_points:
+            requirements = self.parse(data_point)
+            if not requirements:
+                self.trackable = False
+            self.requirements[data_point] = requirements
+        self._known: Set[Tuple[Optional[str], str, int]] = set()
+    
+    @staticmethod
+    def parse(data_point: str) -> List[Requirement]:
+        mentions = FinancialMetricsExtractor.find_entity_mentions(data_point)
+        segments = [m["value"] for m in mentions if m["type"] == "segment"] or [None]
+        metrics = [FIGURE_METRICS[m["value"]] for m in mentions if m["type"] == "metric" and m["value"] in FIGURE_METRICS]
+        years = [int(m["value"]) for m in mentions if m["type"] == "year"] or [None]
+        return list(product(dict.fromkeys(segments), dict.fromkeys(metrics), dict.fromkeys(years)))
+    
+    def _satisfied(self, requirement: Requirement) -> bool:
+        segment, metric, year = requirement
+        years = [year] if year is not None else {known_year for _, _, known_year in self._known}
+        for candidate_year in years:
+            if (segment, metric, candidate_year) in self._known:
+                return True
+            if metric == "margin" and {(segment, "segment_profit", candidate_year), (segment, "revenue", candidate_year)} <= self._known:
+                return True
+        return False
+    
+    def add(self, text: str) -> bool:
+        """Record the figures in one piece of research; returns whether everything is now covered"""
+        for figure in FinancialMetricsExtractor.extract_figures(text):
+            self._known.add((figure["segment"], figure["metric"], figure["year"]))
+        return self.complete
+    
+    @property
+    def covered(self) -> List[str]:
+        return [
+            data_point for data_point, requirements in self.requirements.items()
+            if requirements and all(self._satisfied(requirement) for requirement in requirements)
+        ]
+    
+    @property
+    def complete(self) -> bool:
+        return self.trackable and len(self.covered) == len(self.requirements)
+
@@ -0,0 +1,145 @@
+import copy
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from tools.financial_extractor import FinancialMetricsExtractor
+import config
+
+class QueryPlanCache:
+    """LRU cache of planner output keyed by query template
+    
+    Queries are canonicalized by replacing entity slots (company, segments,
+    metrics, years) with positional placeholders, so "YoY margin for Aerospace
+    and HBT from 2022 to 2023" and "YoY revenue for PMT and SPS from 2021 to 2022"
+    share one template. Cached plans store the same placeholders and are
+    re-instantiated with the new query's slot values on a hit. Years the
+    planner adds (the prior year of a YoY question) are stored as offsets
+    from the query's first year, and aliases of a slot ("net sales" for
+    revenue) as that slot. A plan naming any other entity is not cached,
+    since the entity would be replayed literally for a different query.
+    """
+    
+    def __init__(self, max_entries: int = 256, companies: Optional[List[str]] = None):
+        self.max_entries = max_entries
+        self.companies = companies if companies is not None else config.KNOWN_COMPANIES
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 3)
+        }
+    
+    def canonicalize(self, query: str) -> Tuple[str, Dict[str, str]]:
+        """Return the template key and the slot values (placeholder -> surface text)"""
+        text = " ".join(query.split())
+        mentions, slots, placeholder_by_value = self._assign_slots(text)
+        
+        pieces = []
+        cursor = 0
+        for mention in mentions:
+            value_key = (mention["type"], mention["value"].lower())
+            pieces.append(text[cursor:mention["start"]])
+            pieces.append(f"<<{placeholder_by_value[value_key]}>>")
+            cursor = mention["end"]
+        pieces.append(text[cursor:])
+        
+        template = "".join(pieces).lower()
+        template = re.sub(r"[^\w<>\s]", " ", template)
+        return " ".join(template.split()), slots
+    
+    def _assign_slots(self, text: str) -> Tuple[List[Dict[str, Any]], Dict[str, str], Dict[Tuple[str, str], str]]:
+        """Entity mentions, slot values, and the placeholder for each (type, canonical value)"""
+        mentions = FinancialMetricsExtractor.find_entity_mentions(text, self.companies)
+        slots: Dict[str, str] = {}
+        placeholder_by_value: Dict[Tuple[str, str], str] = {}
+        type_counts: Dict[str, int] = {}
+        for mention in mentions:
+            value_key = (mention["type"], mention["value"].lower())
+            if value_key not in placeholder_by_value:
+                index = type_counts.get(mention["type"], 0)
+                type_counts[mention["type"]] = index + 1
+                placeholder_by_value[value_key] = f"{mention['type']}_{index}"
+                slots[placeholder_by_value[value_key]] = mention["text"]
+        return mentions, slots, placeholder_by_value
+    
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Instantiate a cached plan for this query's template, or None on a miss"""
+        key, slots = self.canonicalize(query)
+        entry = self._entries.get(key)
+        if entry is None or set(entry["placeholders"]) - set(slots):
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return _map_strings(entry["skeleton"], lambda text: _fill_placeholders(text, slots))
+    
+    def store(self, query: str, plan: Dict[str, Any]) -> bool:
+        """Cache a plan skeleton; plans that don't reference any slot, or name entities no slot covers, are not cached"""
+        key, slots = self.canonicalize(query)
+        if not slots:
+            return False
+        
+        _, _, placeholder_by_value = self._assign_slots(" ".join(query.split()))
+        base_year = int(slots["year_0"]) if "year_0" in slots else None
+        used_placeholders = set()
+        uncovered = []
+        
+        def to_skeleton(text: str) -> str:
+            pieces = []
+            cursor = 0
+            for mention in FinancialMetricsExtractor.find_entity_mentions(text, self.companies):
+                placeholder = placeholder_by_value.get((mention["type"], mention["value"].lower()))
+                if placeholder is not None:
+                    used_placeholders.add(placeholder)
+                elif mention["type"] == "year" and base_year is not None:
+                    used_placeholders.add("year_0")
+                    placeholder = f"year_0{int(mention['value']) - base_year:+d}"
+                else:
+                    uncovered.append(mention["text"])
+                    continue
+                pieces.append(text[cursor:mention["start"]])
+                pieces.append(f"<<{placeholder}>>")
+                cursor = mention["end"]
+            pieces.append(text[cursor:])
+            return "".join(pieces)
+        
+        skeleton = _map_strings(plan, to_skeleton)
+        if not used_placeholders or uncovered:
+            return False
+        
+        self._entries[key] = {"skeleton": skeleton, "placeholders": sorted(used_placeholders)}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+def _fill_placeholders(text: str, slots: Dict[str, str]) -> str:
+    def fill(match) -> str:
+        name, offset = match.group(1), match.group(2)
+        if name not in slots:
+            return match.group(0)
+        return str(int(slots[name]) + int(offset)) if offset else slots[name]
+    return re.sub(r"<<(\w+?)([+-]\d+)?>>", fill, text)
+
+def _map_strings(value: Any, transform) -> Any:
+    if isinstance(value, str):
+        return transform(value)
+    if isinstance(value, list):
+        return [_map_strings(item, transform) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_strings(item, transform) for key, item in value.items()}
+    return copy.deepcopy(value)
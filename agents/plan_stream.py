@@ -0,0 +1,82 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+class IncrementalPlanParser:
+    """Scans streamed planner JSON and emits array entries as soon as they close
+    
+    Only the structure needed to recognise the entries of one top-level array
+    field (sub_queries by default) is tracked: the container stack, string and
+    escape state, and the most recent top-level key. The full text is kept so
+    the complete plan can be parsed once the stream ends.
+    """
+    
+    def __init__(self, field: str = "sub_queries"):
+        self.field = field
+        self.entries: List[str] = []
+        self._chunks: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._string_chars: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_key: Optional[str] = None
+    
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+    
+    def feed(self, delta: str) -> List[str]:
+        """Consume the next chunk of planner output; returns entries completed by it"""
+        self._chunks.append(delta)
+        completed = []
+        for char in delta:
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    value = self._decode("".join(self._string_chars))
+                    if self._stack == ["{"]:
+                        self._last_string = value
+                    elif self._stack == ["{", "["] and self._array_key == self.field and value.strip():
+                        self.entries.append(value)
+                        completed.append(value)
+                    continue
+                self._string_chars.append(char)
+            elif char == '"':
+                self._in_string = True
+                self._string_chars = []
+            elif char == ":" and self._stack == ["{"]:
+                self._current_key = self._last_string
+            elif char in "{[":
+                self._stack.append(char)
+                if self._stack == ["{", "["]:
+                    self._array_key = self._current_key
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+        return completed
+    
+    @staticmethod
+    def _decode(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+    
+    def plan(self) -> Optional[Dict[str, Any]]:
+        """The complete plan, or None if the streamed text is not valid JSON"""
+        text = self.text.strip()
+        # Tolerate a markdown fence or stray prose around the JSON object
+        match = re.search(r"\{.*\}", text, re.DOTALL)
+        for candidate in [text] + ([match.group(0)] if match else []):
+            try:
+                plan = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(plan, dict):
+                return plan
+        return None
@@ -0,0 +1,45 @@
+from typing import List, Optional, Sequence
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+import config
+
+def adaptive_depth(
+    scores: Sequence[float],
+    min_k: int = config.RETRIEVAL_MIN_K,
+    relative_cutoff: float = config.RETRIEVAL_RELATIVE_CUTOFF,
+    knee_min_drop: float = config.RETRIEVAL_KNEE_MIN_DROP
+) -> int:
+    """How many of the (best first) scored nodes to keep
+    
+    Nodes scoring below relative_cutoff of the best are dropped, and so is
+    everything after the largest drop between neighbours when that drop is
+    at least knee_min_drop. A query with one clear match keeps little; one
+    whose scores stay flat keeps everything it retrieved. Never fewer than
+    min_k (or all of them, if fewer were retrieved).
+    """
+    if len(scores) <= min_k:
+        return len(scores)
+    best = scores[0]
+    depth = sum(1 for score in scores if score >= best * relative_cutoff)
+    drops = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+    knee = max(range(len(drops)), key=drops.__getitem__)
+    if drops[knee] >= knee_min_drop:
+        depth = min(depth, knee + 1)
+    return max(depth, min_k)
+
+class AdaptiveDepthPostprocessor(BaseNodePostprocessor):
+    """Trims a query engine's retrieved nodes to an adaptive depth before synthesis"""
+    
+    min_k: int = config.RETRIEVAL_MIN_K
+    
+    @classmethod
+    def class_name(cls) -> str:
+        return "AdaptiveDepthPostprocessor"
+    
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None
+    ) -> List[NodeWithScore]:
+        nodes = sorted(nodes, key=lambda node: node.score or 0.0, reverse=True)
+        return nodes[:adaptive_depth([node.score or 0.0 for node in nodes], self.min_k)]
@@ -6,12 +6,26 @@ from llama_index.core.workflow import (
     Event,
     Context
 )
-from llama_index.core.llms import ChatMessage
-from llama_index.llms.openai import OpenAI
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, TYPE_CHECKING
+import asyncio
+import contextvars
 import json
 import config
+from .budget import QueryBudget, estimate_tokens
+from .checkpoints import CHECKPOINT_STEPS, CheckpointStore
+from .coverage import CoverageTracker
+from .plan_cache import QueryPlanCache
+from .plan_stream import IncrementalPlanParser
+from .retrieval_depth import AdaptiveDepthPostprocessor
+
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.llms import LLM
+
+MAX_SUB_QUERIES = 5
+
+# Step log of the current run; run() gives each run its own list, which its step tasks inherit
+_run_steps: contextvars.ContextVar[List[str]] = contextvars.ContextVar("workflow_steps")
 
 class QueryPlanEvent(Event):
     plan: Dict[str, Any]
@@ -20,47 +34,377 @@ class QueryPlanEvent(Event):
 class ResearchEvent(Event):
     results: List[Dict[str, Any]]
     plan: Dict[str, Any]
+    nodes: List[Dict[str, Any]] = []
+    evidence: List[str] = []
+
+class CalculationEvent(Event):
+    results: List[Dict[str, Any]]
+    plan: Dict[str, Any]
+    calculations: Dict[str, Any]
+    nodes: List[Dict[str, Any]] = []
 
 class ValidationEvent(Event):
     validated_results: Dict[str, Any]
     is_valid: bool
+    results: List[Dict[str, Any]] = []
+    nodes: List[Dict[str, Any]] = []
 
 class SummaryEvent(Event):
     summary: str
     workflow_steps: List[str]
 
+CHECKPOINT_EVENTS = {
+    "plan": QueryPlanEvent,
+    "research": ResearchEvent,
+    "calculate": CalculationEvent,
+    "validate": ValidationEvent
+}
+
 class ResearchWorkflow(Workflow):
     
-    def __init__(self, index: VectorStoreIndex, llm: OpenAI, **kwargs):
+    def __init__(
+        self,
+        index: "VectorStoreIndex",
+        llm: "LLM",
+        vector_backend=None,
+        metadata_index=None,
+        summary_tree=None,
+        shard_manager=None,
+        research_mode: str = config.RESEARCH_MODE,
+        **kwargs
+    ):
         super().__init__(**kwargs)
         self.index = index
         self.llm = llm
-        self.query_engine = index.as_query_engine(llm=llm, similarity_top_k=5)
-        self.workflow_steps = []
+        self.vector_backend = vector_backend
+        self.metadata_index = metadata_index
+        self.summary_tree = summary_tree
+        self.shard_manager = shard_manager
+        self.companies = sorted(set(config.KNOWN_COMPANIES) | set(shard_manager.catalog.companies if shard_manager else []))
+        self.research_mode = research_mode
+        self._claim_verifier = None
+        self.query_engine = self.create_query_engine(similarity_top_k=config.RETRIEVAL_MAX_K)
+        self.plan_cache = QueryPlanCache(config.PLAN_CACHE_SIZE, self.companies) if config.PLAN_CACHE_SIZE > 0 else None
+        self.checkpoints = CheckpointStore() if config.CHECKPOINT_MAX_BYTES > 0 else None
+    
+    @property
+    def workflow_steps(self) -> List[str]:
+        """Step log of the run this is called from; concurrent runs never share one"""
+        return _run_steps.get([])
+    
+    def run(self, *args, **kwargs):
+        # The run's step tasks are created inside, so they copy a context holding a fresh log
+        token = _run_steps.set([])
+        try:
+            return super().run(*args, **kwargs)
+        finally:
+            _run_steps.reset(token)
+    
+    @property
+    def claim_verifier(self):
+        """Semantic claim verifier over the index's stored embeddings (not available for sharded corpora)"""
+        if self._claim_verifier is None and config.CLAIM_VERIFICATION == "semantic" and self.index is not None:
+            from tools.fact_verifier import SemanticClaimVerifier
+            self._claim_verifier = SemanticClaimVerifier.from_index(self.index, self.vector_backend)
+        return self._claim_verifier
+    
+    def create_retriever(
+        self,
+        similarity_top_k: int,
+        node_ids: Optional[List[str]] = None,
+        route_context: str = ""
+    ):
+        if self.shard_manager is not None:
+            # Each shard applies its own metadata pre-filter after routing
+            return self.shard_manager.as_retriever(similarity_top_k, route_context=route_context)
+        
+        if self.vector_backend is None:
+            if node_ids is None:
+                return self.index.as_retriever(similarity_top_k=similarity_top_k)
+            from llama_index.core.indices.vector_store.retrievers import VectorIndexRetriever
+            return VectorIndexRetriever(self.index, similarity_top_k=similarity_top_k, node_ids=node_ids)
+        
+        from indexing.vector_backends import VectorBackendRetriever
+        return VectorBackendRetriever(
+            self.vector_backend,
+            self.index.docstore,
+            similarity_top_k=similarity_top_k,
+            node_ids=node_ids
+        )
+    
+    def create_query_engine(
+        self,
+        similarity_top_k: int,
+        node_ids: Optional[List[str]] = None,
+        route_context: str = "",
+        min_k: int = config.RETRIEVAL_MIN_K,
+        **kwargs
+    ):
+        """Query engine retrieving up to similarity_top_k nodes, trimmed to an adaptive depth of at least min_k"""
+        from llama_index.core.query_engine import RetrieverQueryEngine
+        retriever = self.create_retriever(similarity_top_k, node_ids=node_ids, route_context=route_context)
+        if config.ADAPTIVE_RETRIEVAL:
+            kwargs.setdefault("node_postprocessors", [AdaptiveDepthPostprocessor(min_k=min(min_k, similarity_top_k))])
+        return RetrieverQueryEngine.from_args(retriever, llm=self.llm, **kwargs)
+    
+    def _prefilter(self, sub_query: str) -> Optional[Dict[str, Any]]:
+        """Metadata candidates for a sub-query from its segment/year/table mentions"""
+        if self.metadata_index is None:
+            return None
+        return self.metadata_index.candidate_node_ids(sub_query)
+    
+    def _log_prefilter(self, candidates: Optional[Dict[str, Any]]):
+        if candidates is not None:
+            filter_text = "; ".join(f"{field}={', '.join(values)}" for field, values in candidates["filters"].items())
+            self.workflow_steps.append(f"    Pre-filtered to {len(candidates['node_ids'])} nodes ({filter_text})")
+    
+    async def _answer_sub_query(self, sub_query: str, route_context: str = "") -> Dict[str, Any]:
+        """Retrieve and synthesize one sub-query (query_engine mode)"""
+        candidates = self._prefilter(sub_query)
+        if candidates is None and self.shard_manager is None:
+            query_engine = self.query_engine
+        else:
+            # Sharded sub-queries often drop the company; route them by the original question's
+            query_engine = self.create_query_engine(
+                config.RETRIEVAL_MAX_K,
+                node_ids=candidates["node_ids"] if candidates else None,
+                route_context=route_context
+            )
+        response = await query_engine.aquery(sub_query)
+        return {"response": response, "retriever": query_engine.retriever, "candidates": candidates}
+    
+    async def _retrieve_sub_query(
+        self,
+        sub_query: str,
+        route_context: str = "",
+        embedding=None,
+        similarity_top_k: int = config.RETRIEVAL_MAX_K
+    ) -> Dict[str, Any]:
+        """Retrieve nodes for one sub-query without synthesis (retrieve_only mode)"""
+        from llama_index.core.schema import QueryBundle
+        candidates = self._prefilter(sub_query)
+        retriever = self.create_retriever(
+            similarity_top_k=similarity_top_k,
+            node_ids=candidates["node_ids"] if candidates else None,
+            route_context=route_context
+        )
+        nodes = await retriever.aretrieve(QueryBundle(query_str=sub_query, embedding=embedding))
+        retrieved = len(nodes)
+        if config.ADAPTIVE_RETRIEVAL:
+            nodes = AdaptiveDepthPostprocessor(min_k=min(config.RETRIEVAL_MIN_K, similarity_top_k)).postprocess_nodes(nodes)
+        return {"nodes": nodes, "retrieved": retrieved, "retriever": retriever, "candidates": candidates}
+    
+    def _start_sub_query(
+        self,
+        sub_query: str,
+        route_context: str,
+        research_tasks: set,
+        embedding=None,
+        retrieve_only: bool = False
+    ) -> "asyncio.Task":
+        """Start one sub-query's research, registered with the run so cancel_run can stop it
+        
+        retrieve_only skips the per-sub-query synthesis even in query_engine mode,
+        for callers that only keep the source chunks.
+        """
+        if retrieve_only or self.research_mode == "retrieve_only":
+            task = asyncio.create_task(self._retrieve_sub_query(sub_query, route_context, embedding))
+        else:
+            task = asyncio.create_task(self._answer_sub_query(sub_query, route_context))
+        research_tasks.add(task)
+        return task
+    
+    async def _complete(self, ctx: Context, step_name: str, prompt: str, timeout: float):
+        """LLM completion under a step deadline, marked as in flight while it runs"""
+        await ctx.set("llm_in_flight", {"step": step_name, "prompt_tokens": estimate_tokens(prompt)})
+        try:
+            return await asyncio.wait_for(self.llm.acomplete(prompt), timeout)
+        finally:
+            await ctx.set("llm_in_flight", None)
+    
+    async def _stream_plan(
+        self,
+        ctx: Context,
+        planning_prompt: str,
+        user_query: str,
+        parser: IncrementalPlanParser,
+        max_sub_queries: int = MAX_SUB_QUERIES
+    ) -> Optional[Dict[str, Any]]:
+        """Stream the planner output, starting research on each sub-query as soon as it is complete"""
+        prefetched: Dict[str, asyncio.Task] = {}
+        await ctx.set("prefetched_sub_queries", prefetched)
+        research_tasks = await ctx.get("research_tasks")
+        overview = self._answers_from_summaries(user_query)
+        if overview:
+            from indexing.summary_tree import names_metric
+        
+        await ctx.set("llm_in_flight", {"step": "plan", "prompt_tokens": estimate_tokens(planning_prompt)})
+        try:
+            response_stream = await self.llm.astream_complete(planning_prompt)
+            async for chunk in response_stream:
+                delta = chunk.delta if chunk.delta is not None else chunk.text[len(parser.text):]
+                for sub_query in parser.feed(delta):
+                    if overview and not names_metric(sub_query):
+                        # Answered from the summary tree instead of chunk retrieval
+                        continue
+                    if len(prefetched) < max_sub_queries and sub_query not in prefetched:
+                        self.workflow_steps.append(f"  Sub-query {len(prefetched) + 1} streamed, starting research early")
+                        prefetched[sub_query] = self._start_sub_query(sub_query, user_query, research_tasks, retrieve_only=bool(overview))
+        finally:
+            await ctx.set("llm_in_flight", None)
+        
+        query_plan = parser.plan()
+        if query_plan is None and parser.entries:
+            # Truncated or malformed JSON: keep the sub-queries that did stream
+            query_plan = self._fallback_plan(user_query, parser.entries)
+        return query_plan
+    
+    @staticmethod
+    def _fallback_plan(user_query: str, sub_queries: Optional[List[str]] = None) -> Dict[str, Any]:
+        return {
+            "objective": user_query,
+            "sub_queries": sub_queries or [user_query],
+            "data_points": ["segment data", "financial metrics"],
+            "analysis_steps": ["retrieve data", "calculate changes", "compare"]
+        }
+    
+    async def _resume(self, ctx: Context, user_query: str, resume: Optional[Dict[str, Any]]) -> Optional[Event]:
+        """Event of the deepest reusable checkpoint, or None to run from the start
+        
+        resume={"key", "focus"} refines an earlier run: its deepest checkpoint
+        is used even if that run degraded, and the summary is refocused on the
+        new question. Otherwise a repeat of a checkpointed question resumes
+        from its deepest complete step.
+        """
+        if self.checkpoints is None:
+            return None
+        key = resume["key"] if resume else self.checkpoints.key_for(user_query)
+        await ctx.set("checkpoint_key", key)
+        checkpoint = self.checkpoints.deepest(key, allow_partial=bool(resume))
+        if checkpoint is None:
+            return None
+        
+        step_name, payload = checkpoint
+        await ctx.set("resumed_step", step_name)
+        sources = self.checkpoints.load(key, "sources")
+        if sources is not None:
+            await ctx.set("source_nodes", sources["nodes"])
+        if resume:
+            await ctx.set("focus", resume["focus"])
+        skipped = CHECKPOINT_STEPS[:CHECKPOINT_STEPS.index(step_name) + 1]
+        self.workflow_steps.append(f"Resumed from the '{step_name}' checkpoint of an earlier run (skipping {', '.join(skipped)})")
+        return CHECKPOINT_EVENTS[step_name](**payload)
+    
+    async def _checkpoint(self, ctx: Context, step_name: str, ev: Event):
+        """Store the event a step emitted, so retries and refinements can resume after it"""
+        key = await ctx.get("checkpoint_key", default=None)
+        if self.checkpoints is None or key is None or step_name == await ctx.get("resumed_step", default=None):
+            return
+        budget = await ctx.get("budget")
+        self.checkpoints.save(key, step_name, ev.model_dump(), partial=budget.partial)
+        source_nodes = await ctx.get("source_nodes", default=None)
+        if step_name == "research" and source_nodes:
+            # Synthesized (query_engine) research keeps its nodes outside the event
+            self.checkpoints.save(key, "sources", {"nodes": source_nodes}, partial=budget.partial)
+    
+    async def cancel_run(self, handler) -> Dict[str, Any]:
+        """Stop a run (e.g. on barge-in): its steps, any LLM call in flight and its research tasks
+        
+        Returns what was abandoned, as an estimate of the work saved.
+        """
+        ctx = handler.ctx
+        research_tasks = await ctx.get("research_tasks", default=set())
+        llm_in_flight = await ctx.get("llm_in_flight", default=None)
+        budget = await ctx.get("budget", default=None)
+        
+        pending_tasks = [task for task in research_tasks if not task.done()]
+        for task in pending_tasks:
+            task.cancel()
+        if not handler.done():
+            await handler.cancel_run()
+        await asyncio.gather(handler, *pending_tasks, return_exceptions=True)
+        
+        return {
+            "research_tasks_cancelled": len(pending_tasks),
+            "research_tasks_completed": len(research_tasks) - len(pending_tasks),
+            "llm_call_cancelled": llm_in_flight["step"] if llm_in_flight else None,
+            "llm_prompt_tokens_abandoned": llm_in_flight["prompt_tokens"] if llm_in_flight else 0,
+            "elapsed_seconds": round(budget.elapsed_seconds, 2) if budget else None
+        }
     
     @step
-    async def plan_query(self, ctx: Context, ev: StartEvent) -> QueryPlanEvent:
+    async def plan_query(
+        self,
+        ctx: Context,
+        ev: StartEvent
+    ) -> Union[QueryPlanEvent, ResearchEvent, CalculationEvent, ValidationEvent]:
         user_query = ev.get("query")
         conversation_context = ev.get("context", "")
+        budget = QueryBudget.resolve(ev.get("budget"))
+        await ctx.set("budget", budget)
+        await ctx.set("research_tasks", set())
+        await ctx.set("session_id", ev.get("session_id"))
+        
+        resumed = await self._resume(ctx, user_query, ev.get("resume"))
+        if resumed is not None:
+            return resumed
         
         self.workflow_steps.append("Planning query decomposition")
         
+        follow_up = ev.get("follow_up")
+        if follow_up and follow_up.get("nodes"):
+            await ctx.set("follow_up", follow_up)
+            self.workflow_steps.append(
+                f"  Follow-up to an earlier question (similarity {follow_up.get('similarity', 0):.2f}); "
+                f"reusing its research, skipping decomposition"
+            )
+            self.workflow_steps.append("Created 1 sub-queries")
+            return QueryPlanEvent(plan=self._fallback_plan(user_query, [follow_up["resolved_query"]]), original_query=user_query)
+        
+        if budget.max_sub_queries <= 1:
+            budget.degrade("fewer_sub_queries")
+            self.workflow_steps.append(f"  {budget.profile} budget allows one sub-query; skipping decomposition")
+            self.workflow_steps.append("Created 1 sub-queries")
+            return QueryPlanEvent(plan=self._fallback_plan(user_query), original_query=user_query)
+        
+        # A plan drawn up with earlier turns in the context may depend on them, so it is neither reused nor cached
+        plan_cache = self.plan_cache if not ev.get("conversation_turns", 0) else None
+        query_plan = plan_cache.lookup(user_query) if plan_cache else None
+        if query_plan is not None:
+            self.workflow_steps.append(f"  Reused cached plan template (hit rate: {plan_cache.hit_rate:.0%})")
+            num_sub_queries = len(query_plan.get('sub_queries', []))
+            self.workflow_steps.append(f"Created {num_sub_queries} sub-queries")
+            return QueryPlanEvent(plan=query_plan, original_query=user_query)
+        
         planning_prompt = config.QUERY_PLANNER_PROMPT.format(
             context=conversation_context,
             query=user_query
         )
 
-        llm_response = await self.llm.acomplete(planning_prompt)
-        
+        parser = IncrementalPlanParser()
         try:
-            query_plan = json.loads(str(llm_response))
+            if config.PLAN_STREAMING:
+                query_plan = await asyncio.wait_for(
+                    self._stream_plan(ctx, planning_prompt, user_query, parser, min(MAX_SUB_QUERIES, budget.max_sub_queries)),
+                    budget.step_timeout("plan")
+                )
+            else:
+                llm_response = await self._complete(ctx, "plan", planning_prompt, budget.step_timeout("plan"))
+                parser.feed(str(llm_response))
+                query_plan = parser.plan()
+            if query_plan is None:
+                raise ValueError("Planner output is not valid JSON")
+            if plan_cache:
+                plan_cache.store(user_query, query_plan)
+        except asyncio.TimeoutError:
+            budget.degrade("plan_timeout")
+            self.workflow_steps.append(f"  Planner exceeded its budget; continuing with {len(parser.entries) or 1} sub-queries")
+            query_plan = self._fallback_plan(user_query, parser.entries)
+        except asyncio.CancelledError:
+            raise
         except:
-            query_plan = {
-                "objective": user_query,
-                "sub_queries": [user_query],
-                "data_points": ["segment data", "financial metrics"],
-                "analysis_steps": ["retrieve data", "calculate changes", "compare"]
-            }
+            query_plan = self._fallback_plan(user_query)
+        budget.record(planning_prompt, parser.text)
         
         num_sub_queries = len(query_plan.get('sub_queries', []))
         self.workflow_steps.append(f"Created {num_sub_queries} sub-queries")
@@ -69,23 +413,99 @@ class ResearchWorkflow(Workflow):
     
     @step
     async def research(self, ctx: Context, ev: QueryPlanEvent) -> ResearchEvent:
+        await self._checkpoint(ctx, "plan", ev)
         query_plan = ev.plan
         
         self.workflow_steps.append("Retrieving information")
         
         research_results = []
-        sub_queries = query_plan.get("sub_queries", [ev.original_query])
+        evidence_texts = []
+        source_nodes: Dict[str, Dict[str, Any]] = {}
+        budget = await ctx.get("budget")
+        research_tasks = await ctx.get("research_tasks")
+        
+        follow_up = await ctx.get("follow_up", default=None)
+        if follow_up:
+            return await self._research_follow_up(follow_up, query_plan, ev.original_query, budget, research_tasks)
+        
+        sub_queries = query_plan.get("sub_queries", [ev.original_query])[:MAX_SUB_QUERIES]
+        affordable = self._affordable_sub_queries(budget, len(sub_queries))
+        if affordable < len(sub_queries):
+            budget.degrade("fewer_sub_queries")
+            self.workflow_steps.append(f"  Budget allows {affordable} of {len(sub_queries)} sub-queries")
+            sub_queries = sub_queries[:affordable]
+        
+        # Sub-queries whose research already started while the plan was streaming
+        prefetched = await ctx.get("prefetched_sub_queries", default={})
+        await ctx.set("prefetched_sub_queries", {})
+        for sub_query in set(prefetched) - set(sub_queries):
+            prefetched.pop(sub_query).cancel()
+        if prefetched:
+            self.workflow_steps.append(f"  {len(prefetched)} of {len(sub_queries)} sub-queries already in flight")
         
         should_extract_financial_data = any(
             keyword in ev.original_query.lower() 
             for keyword in ['margin', 'profit', 'revenue', 'yoy', 'financial', 'segment']
         )
         
-        for query_index, sub_query in enumerate(sub_queries[:5]):
+        if self._answers_from_summaries(ev.original_query):
+            return await self._research_overview(
+                ev.original_query,
+                sub_queries,
+                query_plan,
+                prefetched=prefetched,
+                budget=budget,
+                research_tasks=research_tasks
+            )
+        
+        if self.research_mode == "retrieve_only":
+            return await self._research_retrieve_only(
+                sub_queries,
+                query_plan,
+                should_extract_financial_data,
+                route_context=ev.original_query,
+                prefetched=prefetched,
+                budget=budget,
+                research_tasks=research_tasks
+            )
+        
+        coverage = self._coverage_tracker(query_plan, len(sub_queries))
+        if coverage is not None:
+            # Streamed sub-queries that already finished may cover the plan before the rest start
+            for task in prefetched.values():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    coverage.add(str(task.result()["response"]))
+            if coverage.complete:
+                self.workflow_steps.append(
+                    f"  Every planned data point covered: skipped {len(sub_queries) - len(prefetched)} of {len(sub_queries)} sub-queries"
+                )
+                sub_queries = [sub_query for sub_query in sub_queries if sub_query in prefetched]
+        
+        tasks = [
+            prefetched.get(sub_query) or self._start_sub_query(sub_query, ev.original_query, research_tasks)
+            for sub_query in sub_queries
+        ]
+        finished = await self._await_within(tasks, budget, coverage, lambda outcome: str(outcome["response"]))
+        
+        for query_index, (sub_query, task) in enumerate(zip(sub_queries, tasks)):
+            if task not in finished:
+                continue
             self.workflow_steps.append(f"  Query {query_index+1}: {sub_query[:60]}...")
             
-            query_response = self.query_engine.query(sub_query)
+            outcome = task.result()
+            query_response = outcome["response"]
+            self._log_prefilter(outcome["candidates"])
+            self._log_routing(outcome["retriever"])
+            if config.ADAPTIVE_RETRIEVAL:
+                self.workflow_steps.append(f"    Synthesized from {len(query_response.source_nodes)} of up to {config.RETRIEVAL_MAX_K} nodes")
             answer_text = str(query_response)
+            source_texts = [source_node.node.get_content() for source_node in getattr(query_response, 'source_nodes', [])]
+            evidence_texts.extend(source_texts)
+            for source_node, source_text in zip(getattr(query_response, 'source_nodes', []), source_texts):
+                node_id = source_node.node.node_id
+                score = max(source_node.score or 0.0, source_nodes.get(node_id, {}).get("score", 0.0))
+                source_nodes[node_id] = {"node_id": node_id, "text": source_text, "score": score}
+            budget.record(sub_query + "".join(source_texts), answer_text)
             
             query_result = {
                 "sub_query": sub_query,
@@ -110,61 +530,395 @@ class ResearchWorkflow(Workflow):
             research_results.append(query_result)
         
         self.workflow_steps.append(f"Research complete: {len(research_results)} queries processed")
+        # Kept for the conversation index, so a follow-up can reuse them
+        await ctx.set("source_nodes", list(source_nodes.values()))
+        
+        return ResearchEvent(results=research_results, plan=query_plan, evidence=evidence_texts)
+    
+    async def _research_retrieve_only(
+        self,
+        sub_queries: List[str],
+        query_plan: Dict[str, Any],
+        should_extract_financial_data: bool,
+        route_context: str = "",
+        prefetched: Optional[Dict[str, "asyncio.Task"]] = None,
+        budget: Optional[QueryBudget] = None,
+        research_tasks: Optional[set] = None
+    ) -> ResearchEvent:
+        """Retrieve nodes for every sub-query without per-sub-query LLM synthesis
+        
+        Sub-queries not already started from the streamed plan are embedded in one
+        batched call, and nodes retrieved by several sub-queries are merged by
+        node ID with per-sub-query provenance. The merged node set is synthesized
+        once by the summarizer.
+        """
+        from llama_index.core import Settings
+        
+        prefetched = prefetched or {}
+        pending = [sub_query for sub_query in sub_queries if sub_query not in prefetched]
+        tasks = dict(prefetched)
+        if pending:
+            self.workflow_steps.append(f"  Embedding {len(pending)} sub-queries in one batch")
+            # OpenAI embeddings use the same encoder for queries and documents
+            query_embeddings = await Settings.embed_model.aget_text_embedding_batch(pending)
+            for sub_query, embedding in zip(pending, query_embeddings):
+                tasks[sub_query] = self._start_sub_query(sub_query, route_context, research_tasks if research_tasks is not None else set(), embedding)
+        
+        ordered_tasks = [tasks[sub_query] for sub_query in sub_queries]
+        finished = await self._await_within(
+            ordered_tasks,
+            budget or QueryBudget.resolve(None),
+            self._coverage_tracker(query_plan, len(sub_queries)),
+            lambda outcome: "\n".join(node.node.get_content() for node in outcome["nodes"])
+        )
+        sub_queries = [sub_query for sub_query, task in zip(sub_queries, ordered_tasks) if task in finished]
+        outcomes = [task.result() for task in ordered_tasks if task in finished]
+        retrieved = [outcome["nodes"] for outcome in outcomes]
+        
+        merged_nodes: Dict[str, Dict[str, Any]] = {}
+        research_results = []
+        for query_index, (sub_query, nodes_with_scores) in enumerate(zip(sub_queries, retrieved)):
+            self.workflow_steps.append(f"  Query {query_index+1}: {sub_query[:60]}...")
+            self._log_prefilter(outcomes[query_index]["candidates"])
+            self._log_routing(outcomes[query_index]["retriever"])
+            if len(nodes_with_scores) < outcomes[query_index]["retrieved"]:
+                self.workflow_steps.append(f"    Kept {len(nodes_with_scores)} of {outcomes[query_index]['retrieved']} retrieved nodes")
+            
+            for node_with_score in nodes_with_scores:
+                node_id = node_with_score.node.node_id
+                score = node_with_score.score or 0.0
+                if node_id not in merged_nodes:
+                    merged_nodes[node_id] = {
+                        "node_id": node_id,
+                        "text": node_with_score.node.get_content(),
+                        "score": score,
+                        "sub_queries": []
+                    }
+                merged_nodes[node_id]["score"] = max(merged_nodes[node_id]["score"], score)
+                merged_nodes[node_id]["sub_queries"].append(query_index)
+            
+            query_result = {
+                "sub_query": sub_query,
+                "node_ids": [n.node.node_id for n in nodes_with_scores],
+                "evidence": [n.node.get_content()[:200] for n in nodes_with_scores[:2]],
+                "source_nodes": len(nodes_with_scores)
+            }
+            
+            if should_extract_financial_data and query_index == 0:
+                self.workflow_steps.append("  Using financial extractor")
+                from tools.financial_extractor import FinancialMetricsExtractor
+                retrieved_text = "\n".join(n.node.get_content() for n in nodes_with_scores)
+                query_result["extracted_metrics"] = FinancialMetricsExtractor().extract_metrics(retrieved_text)
+            
+            research_results.append(query_result)
+        
+        total_retrieved = sum(len(nodes_with_scores) for nodes_with_scores in retrieved)
+        self.workflow_steps.append(
+            f"Research complete: {len(research_results)} queries, "
+            f"{len(merged_nodes)} unique nodes ({total_retrieved - len(merged_nodes)} duplicates merged)"
+        )
+        
+        nodes = sorted(merged_nodes.values(), key=lambda node: node["score"], reverse=True)
+        return ResearchEvent(results=research_results, plan=query_plan, nodes=nodes)
+    
+    def _answers_from_summaries(self, user_query: str) -> bool:
+        """Whether a question is broad enough to be answered from the summary tree"""
+        if self.summary_tree is None:
+            return False
+        from indexing.summary_tree import is_broad_query
+        return is_broad_query(user_query)
+    
+    async def _research_overview(
+        self,
+        user_query: str,
+        sub_queries: List[str],
+        query_plan: Dict[str, Any],
+        prefetched: Dict[str, "asyncio.Task"],
+        budget: QueryBudget,
+        research_tasks: set
+    ) -> ResearchEvent:
+        """Answer a broad question from a few section/document summaries
         
-        return ResearchEvent(results=research_results, plan=query_plan)
+        Only sub-queries naming a metric still retrieve chunks, for the exact
+        figures; the rest are covered by the summaries. Everything is
+        synthesized once by the summarizer, as in retrieve_only mode.
+        """
+        from llama_index.core import Settings
+        from indexing.summary_tree import names_metric
+        
+        specific = [query_index for query_index, sub_query in enumerate(sub_queries) if names_metric(sub_query)]
+        pending = [sub_queries[query_index] for query_index in specific if sub_queries[query_index] not in prefetched]
+        for sub_query in set(prefetched) - {sub_queries[query_index] for query_index in specific}:
+            prefetched.pop(sub_query).cancel()
+        
+        # OpenAI embeddings use the same encoder for queries and documents
+        query_embeddings = await Settings.embed_model.aget_text_embedding_batch([user_query] + pending)
+        summaries = self.summary_tree.search(query_embeddings[0])
+        answered_by_summaries = [query_index for query_index in range(len(sub_queries)) if query_index not in specific] or list(range(len(sub_queries)))
+        self.workflow_steps.append(
+            f"  Broad question: {len(summaries)} summaries ({', '.join(summary['kind'] for summary in summaries)}) "
+            f"for {len(sub_queries) - len(specific)} of {len(sub_queries)} sub-queries"
+        )
+        merged_nodes = {summary["node_id"]: dict(summary, sub_queries=answered_by_summaries) for summary in summaries}
+        
+        tasks = dict(prefetched)
+        for sub_query, embedding in zip(pending, query_embeddings[1:]):
+            tasks[sub_query] = self._start_sub_query(sub_query, user_query, research_tasks, embedding, retrieve_only=True)
+        ordered_tasks = [tasks[sub_queries[query_index]] for query_index in specific]
+        finished = await self._await_within(ordered_tasks, budget)
+        
+        research_results = [
+            {"sub_query": sub_queries[query_index], "summary_ids": [summary["node_id"] for summary in summaries], "source_nodes": len(summaries)}
+            for query_index in answered_by_summaries if query_index not in specific
+        ]
+        for query_index, task in zip(specific, ordered_tasks):
+            if task not in finished:
+                continue
+            nodes_with_scores = task.result()["nodes"]
+            self.workflow_steps.append(f"  Query {query_index+1}: {sub_queries[query_index][:60]}... ({len(nodes_with_scores)} chunks)")
+            for node_with_score in nodes_with_scores:
+                node_id = node_with_score.node.node_id
+                if node_id not in merged_nodes:
+                    merged_nodes[node_id] = {
+                        "node_id": node_id,
+                        "text": node_with_score.node.get_content(),
+                        "score": node_with_score.score or 0.0,
+                        "sub_queries": []
+                    }
+                merged_nodes[node_id]["sub_queries"].append(query_index)
+            research_results.append({
+                "sub_query": sub_queries[query_index],
+                "node_ids": [n.node.node_id for n in nodes_with_scores],
+                "evidence": [n.node.get_content()[:200] for n in nodes_with_scores[:2]],
+                "source_nodes": len(nodes_with_scores)
+            })
+        
+        self.workflow_steps.append(
+            f"Research complete: {len(summaries)} summaries and {len(merged_nodes) - len(summaries)} chunks"
+        )
+        # Summaries lead: they carry the overview, the chunks the exact figures
+        nodes = list(merged_nodes.values())[:len(summaries)] + sorted(
+            list(merged_nodes.values())[len(summaries):], key=lambda node: node["score"], reverse=True
+        )
+        return ResearchEvent(results=research_results, plan=query_plan, nodes=nodes)
+    
+    async def _research_follow_up(
+        self,
+        follow_up: Dict[str, Any],
+        query_plan: Dict[str, Any],
+        original_query: str,
+        budget: QueryBudget,
+        research_tasks: set
+    ) -> ResearchEvent:
+        """Answer a follow-up from the earlier turn's nodes plus a small top-up retrieval
+        
+        The top-up searches the earlier question joined with the follow-up, so
+        an added year or segment still finds its own figures.
+        """
+        resolved_query = follow_up["resolved_query"]
+        self.workflow_steps.append(f"  Reusing {len(follow_up['nodes'])} nodes from earlier turns")
+        merged_nodes = {node["node_id"]: {**node, "sub_queries": [0]} for node in follow_up["nodes"]}
+        
+        task = asyncio.create_task(self._retrieve_sub_query(resolved_query, original_query, similarity_top_k=config.FOLLOW_UP_TOP_UP_K))
+        research_tasks.add(task)
+        finished = await self._await_within([task], budget)
+        top_up = task.result()["nodes"] if task in finished else []
+        new_nodes = 0
+        for node_with_score in top_up:
+            node_id = node_with_score.node.node_id
+            if node_id not in merged_nodes:
+                new_nodes += 1
+                merged_nodes[node_id] = {
+                    "node_id": node_id,
+                    "text": node_with_score.node.get_content(),
+                    "score": node_with_score.score or 0.0,
+                    "sub_queries": [0]
+                }
+        self.workflow_steps.append(f"  Top-up retrieval added {new_nodes} of {len(top_up)} nodes")
+        
+        nodes = sorted(merged_nodes.values(), key=lambda node: node["score"], reverse=True)
+        research_results = [{
+            "sub_query": resolved_query,
+            "node_ids": [node["node_id"] for node in nodes],
+            "evidence": [node["text"][:200] for node in nodes[:2]],
+            "source_nodes": len(nodes),
+            "reused_nodes": len(follow_up["nodes"])
+        }]
+        self.workflow_steps.append(f"Research complete: follow-up answered from {len(nodes)} nodes")
+        return ResearchEvent(results=research_results, plan=query_plan, nodes=nodes)
+    
+    def _affordable_sub_queries(self, budget: QueryBudget, num_sub_queries: int) -> int:
+        """Sub-queries the budget can pay for: the profile's cap, and its tokens when each is synthesized"""
+        affordable = min(num_sub_queries, budget.max_sub_queries)
+        if self.research_mode != "retrieve_only":
+            affordable = min(affordable, int(budget.remaining_tokens // config.SUB_QUERY_TOKEN_ESTIMATE))
+        return max(affordable, 1)
+    
+    def _coverage_tracker(self, query_plan: Dict[str, Any], num_sub_queries: int) -> Optional[CoverageTracker]:
+        """Tracker for the plan's data points, or None when early termination cannot apply"""
+        if not config.EARLY_TERMINATION or num_sub_queries <= 1:
+            return None
+        coverage = CoverageTracker(query_plan.get("data_points", []))
+        return coverage if coverage.trackable else None
+    
+    @staticmethod
+    async def _wait_for_coverage(tasks: List["asyncio.Task"], timeout: float, coverage: CoverageTracker, text_of) -> tuple:
+        """asyncio.wait that also returns once the finished tasks cover every data point"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Streamed sub-queries may have finished (and covered the plan) before this step waits
+        finished = {task for task in tasks if task.done()}
+        unfinished = set(tasks) - finished
+        while unfinished and not coverage.complete:
+            done, unfinished = await asyncio.wait(
+                unfinished,
+                timeout=max(deadline - loop.time(), 0.0),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            finished |= done
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    coverage.add(text_of(task.result()))
+        return finished, unfinished
+    
+    async def _await_within(
+        self,
+        tasks: List["asyncio.Task"],
+        budget: QueryBudget,
+        coverage: Optional[CoverageTracker] = None,
+        text_of=None
+    ) -> set:
+        """Wait for research tasks until the research deadline; unfinished ones are cancelled
+        
+        With a coverage tracker (text_of maps a task's result to its text), the
+        rest are also cancelled as soon as every planned data point is covered.
+        """
+        if not tasks:
+            return set()
+        try:
+            if coverage is None:
+                finished, unfinished = await asyncio.wait(tasks, timeout=budget.step_timeout("research"))
+            else:
+                finished, unfinished = await self._wait_for_coverage(tasks, budget.step_timeout("research"), coverage, text_of)
+        except asyncio.CancelledError:
+            # asyncio.wait leaves the awaited tasks running when the step itself is cancelled
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in unfinished:
+            task.cancel()
+        if unfinished and coverage is not None and coverage.complete:
+            self.workflow_steps.append(f"  Every planned data point covered: cancelled {len(unfinished)} of {len(tasks)} sub-queries")
+        elif unfinished:
+            budget.degrade("research_truncated")
+            self.workflow_steps.append(f"  Research deadline reached: dropped {len(unfinished)} of {len(tasks)} sub-queries")
+        return finished
     
     @step
-    async def validate(self, ctx: Context, ev: ResearchEvent) -> ValidationEvent:
+    async def calculate(self, ctx: Context, ev: ResearchEvent) -> CalculationEvent:
+        """Deterministic figures: margins, YoY changes, bps moves and reconciliation residuals"""
+        from tools.financial_calculator import FinancialCalculator
+        from tools.financial_extractor import FinancialMetricsExtractor
+        
+        await self._checkpoint(ctx, "research", ev)
+        self.workflow_steps.append("Calculating figures")
+        
+        # Synthesized answers first, then the raw source text they were drawn from
+        texts = [result.get("answer", "") for result in ev.results]
+        texts += ev.evidence + [node["text"] for node in ev.nodes]
+        figures = [figure for text in texts for figure in FinancialMetricsExtractor.extract_figures(text)]
+        calculations = FinancialCalculator().calculate(figures)
+        
+        self.workflow_steps.append(
+            f"  Computed {len(calculations['segments'])} segments x {len(calculations['years'])} years "
+            f"from {calculations['figures_used']} figures"
+        )
+        if calculations.get("largest_margin_improvement"):
+            best = calculations["largest_margin_improvement"]
+            self.workflow_steps.append(f"  Largest margin improvement: {best['segment']} ({best['margin_change_bps']:+} bps)")
+        
+        return CalculationEvent(
+            results=ev.results,
+            plan=ev.plan,
+            calculations=calculations,
+            nodes=ev.nodes
+        )
+    
+    @step
+    async def validate(self, ctx: Context, ev: CalculationEvent) -> ValidationEvent:
+        await self._checkpoint(ctx, "calculate", ev)
         research_results = ev.results
         query_plan = ev.plan
+        budget = await ctx.get("budget")
         
         self.workflow_steps.append("Validating results")
         
         fact_verification_results = []
-        if research_results and len(research_results) > 0:
+        # Retrieve-only, overview and follow-up research carry nodes, not synthesized answers
+        verify_summary = bool(research_results) and not any(result.get("answer") for result in research_results)
+        if verify_summary:
+            self.workflow_steps.append("  No synthesized research answers to fact-check; checking the summary's figures instead")
+        elif research_results and len(research_results) > 0:
             self.workflow_steps.append("  Running fact verifier")
-            from tools.fact_verifier import FactVerifier
+            from tools.fact_verifier import FactVerifier, extract_numeric_claims
             import os
             
             fact_verifier = FactVerifier(tavily_api_key=os.getenv("TAVILY_API_KEY"))
-            first_research_result = research_results[0]
-            answer_text = first_research_result.get("answer", "")
+            claim_verifier = self.claim_verifier
+            claims = extract_numeric_claims([result.get("answer", "") for result in research_results])
             
-            answer_sentences = answer_text.split('.')
-            for sentence in answer_sentences[:2]:
-                if any(char.isdigit() for char in sentence):
-                    pdf_verification_result = fact_verifier.verify_claim(sentence.strip(), answer_text)
-                    pdf_verification_result["source"] = "PDF"
-                    fact_verification_results.append(pdf_verification_result)
-                    
-                    if pdf_verification_result.get("status") == "verified":
-                        confidence_score = pdf_verification_result.get('confidence', 0)
-                        self.workflow_steps.append(f"  PDF verification: {confidence_score:.2f}")
-                    
-                    if fact_verifier.tavily_client and "revenue" in sentence.lower() or "profit" in sentence.lower():
-                        try:
-                            internet_verification_result = fact_verifier.verify_with_search(sentence.strip()[:50], "Honeywell")
-                            internet_verification_result["source"] = "Internet"
-                            fact_verification_results.append(internet_verification_result)
-                            
-                            if internet_verification_result.get("verified"):
-                                confidence_score = internet_verification_result.get('confidence', 0)
-                                self.workflow_steps.append(f"  Internet verification: {confidence_score:.2f}")
-                        except Exception as search_error:
-                            error_message = str(search_error)[:50]
-                            self.workflow_steps.append(f"  Search unavailable: {error_message}")
-                    
-                    break
+            if claim_verifier is not None and claims:
+                semantic_verification_results = await claim_verifier.averify(claims)
+                for semantic_verification_result in semantic_verification_results:
+                    semantic_verification_result["source"] = "PDF"
+                fact_verification_results.extend(semantic_verification_results)
+                supported_count = sum(1 for result in semantic_verification_results if result["verified"])
+                self.workflow_steps.append(f"  Semantic verification: {supported_count}/{len(claims)} claims supported by indexed nodes")
+                
+                unsupported_claims = [result["claim"] for result in semantic_verification_results if not result["verified"]]
+                if unsupported_claims:
+                    self._verify_online(fact_verifier, unsupported_claims[0], query_plan, fact_verification_results, budget)
+            else:
+                first_research_result = research_results[0]
+                answer_text = first_research_result.get("answer", "")
+                
+                answer_sentences = answer_text.split('.')
+                for sentence in answer_sentences[:2]:
+                    if any(char.isdigit() for char in sentence):
+                        pdf_verification_result = fact_verifier.verify_claim(sentence.strip(), answer_text)
+                        pdf_verification_result["source"] = "PDF"
+                        fact_verification_results.append(pdf_verification_result)
+                        
+                        if pdf_verification_result.get("status") == "verified":
+                            confidence_score = pdf_verification_result.get('confidence', 0)
+                            self.workflow_steps.append(f"  PDF verification: {confidence_score:.2f}")
+                        
+                        self._verify_online(fact_verifier, sentence, query_plan, fact_verification_results, budget)
+                        break
         
+        from tools.financial_calculator import FinancialCalculator
         validation_prompt = config.VALIDATOR_PROMPT.format(
             objective=query_plan.get('objective', 'N/A'),
             results=json.dumps(research_results, indent=2)[:2000],
+            calculations=FinancialCalculator.format_table(ev.calculations),
             fact_verifications=json.dumps(fact_verification_results, indent=2) if fact_verification_results else 'No fact verifications performed'
         )
 
-        llm_response = await self.llm.acomplete(validation_prompt)
+        # Too little budget left for two LLM calls: the summarizer validates as it answers
+        merge_with_summary = not budget.can_afford(["validate", "summarize"], tokens=2 * estimate_tokens(validation_prompt))
+        llm_response = None
+        if not merge_with_summary:
+            try:
+                llm_response = await self._complete(ctx, "validate", validation_prompt, budget.step_timeout("validate"))
+                budget.record(validation_prompt, str(llm_response))
+            except asyncio.TimeoutError:
+                merge_with_summary = True
         
         try:
+            if merge_with_summary:
+                raise ValueError("Validation merged into the summary")
             validation_result = json.loads(str(llm_response))
         except:
             if fact_verification_results:
@@ -181,6 +935,13 @@ class ResearchWorkflow(Workflow):
             }
         
         validation_result["fact_verifications"] = fact_verification_results
+        validation_result["fact_verification"] = "deferred_to_summary" if verify_summary else "research"
+        validation_result["calculations"] = ev.calculations
+        if merge_with_summary:
+            budget.degrade("merged_validate_summarize")
+            self.workflow_steps.append("  Budget low: validating within the summary call")
+            validation_result["merged_validation"] = True
+            validation_result["objective"] = query_plan.get('objective', 'N/A')
         
         is_valid = validation_result.get("is_valid", True)
         confidence_score = validation_result.get("confidence", 0.8)
@@ -190,27 +951,185 @@ class ResearchWorkflow(Workflow):
         
         return ValidationEvent(
             validated_results=validation_result,
-            is_valid=is_valid
+            is_valid=is_valid,
+            results=research_results,
+            nodes=ev.nodes
         )
     
     @step
     async def summarize(self, ctx: Context, ev: ValidationEvent) -> StopEvent:
+        await self._checkpoint(ctx, "validate", ev)
         validated_results = ev.validated_results
+        budget = await ctx.get("budget")
+        focus = await ctx.get("focus", default=None)
         
         self.workflow_steps.append("Creating summary")
         
-        summary_prompt = config.SUMMARIZER_PROMPT.format(
-            validated_results=json.dumps(validated_results, indent=2)[:2000]
-        )
+        from tools.financial_calculator import FinancialCalculator
+        calculations = FinancialCalculator.format_table(validated_results.get("calculations", {}))
+        if validated_results.get("merged_validation"):
+            summary_prompt = config.VALIDATE_AND_SUMMARIZE_PROMPT.format(
+                objective=validated_results.get("objective", "N/A"),
+                results=json.dumps(ev.results, indent=2)[:2000],
+                calculations=calculations,
+                fact_verifications=json.dumps(validated_results.get("fact_verifications", []), indent=2)[:1500]
+            )
+            if ev.nodes:
+                summary_prompt += "\n\nSOURCE EXCERPTS:\n" + self._format_sources(ev.nodes)
+        elif ev.nodes:
+            summary_prompt = config.RETRIEVAL_SUMMARIZER_PROMPT.format(
+                validated_results=json.dumps(validated_results, indent=2)[:2000],
+                calculations=calculations,
+                sources=self._format_sources(ev.nodes)
+            )
+        else:
+            summary_prompt = config.SUMMARIZER_PROMPT.format(
+                validated_results=json.dumps(validated_results, indent=2)[:2000],
+                calculations=calculations
+            )
+        if focus:
+            summary_prompt += config.REFINEMENT_FOCUS_PROMPT.format(focus=focus)
 
-        llm_response = await self.llm.acomplete(summary_prompt)
-        final_summary = str(llm_response)
+        summarized = False
+        try:
+            llm_response = await self._complete(ctx, "summarize", summary_prompt, budget.step_timeout("summarize"))
+            final_summary = str(llm_response)
+            budget.record(summary_prompt, final_summary)
+            summarized = True
+        except asyncio.TimeoutError:
+            budget.degrade("summary_timeout")
+            self.workflow_steps.append("  Summary deadline reached; returning research findings as is")
+            final_summary = self._partial_summary(ev.results, ev.nodes, calculations)
+        
+        if validated_results.get("fact_verification") == "deferred_to_summary":
+            await self._verify_summary(final_summary if summarized else "", ev.nodes, validated_results, budget)
         
         self.workflow_steps.append("Summary complete")
+        if self.checkpoints is not None:
+            self.checkpoints.set_latest_key(await ctx.get("session_id", default=None), await ctx.get("checkpoint_key", default=None))
+        degradation_text = f" (degraded: {', '.join(budget.degradations)})" if budget.partial else ""
+        self.workflow_steps.append(
+            f"Budget {budget.profile}: {budget.elapsed_seconds:.1f}s of {budget.deadline_seconds:.0f}s, "
+            f"~{budget.tokens_used} tokens, ${budget.cost_usd:.3f}{degradation_text}"
+        )
         
         return StopEvent(result={
             "summary": final_summary,
             "workflow_steps": self.workflow_steps.copy(),
             "validation": validated_results,
-            "confidence": validated_results.get("confidence", 0.0)
+            "calculations": validated_results.get("calculations", {}),
+            "confidence": validated_results.get("confidence", 0.0),
+            "partial": budget.partial,
+            "budget": budget.summary(),
+            "resumed_from": await ctx.get("resumed_step", default=None),
+            "source_nodes": [
+                {"node_id": node["node_id"], "text": node["text"], "score": node["score"]}
+                for node in (ev.nodes or await ctx.get("source_nodes", default=[]))
+            ]
         })
+    
+    async def _verify_summary(
+        self,
+        summary: str,
+        nodes: List[Dict[str, Any]],
+        validated_results: Dict[str, Any],
+        budget: QueryBudget
+    ):
+        """Fact-check the final answer's figures when research produced no answers to check
+        
+        Claims are scored against the indexed nodes (semantic verification) or
+        matched against the retrieved sources. When neither is possible the
+        result records validation["fact_verification"] = "skipped".
+        """
+        from tools.fact_verifier import FactVerifier, extract_numeric_claims
+        claims = extract_numeric_claims([summary])
+        claim_verifier = self.claim_verifier
+        fact_verification_results = []
+        if claims and claim_verifier is not None and budget.remaining_seconds > 0:
+            try:
+                fact_verification_results = await asyncio.wait_for(claim_verifier.averify(claims), budget.remaining_seconds)
+            except asyncio.TimeoutError:
+                fact_verification_results = []
+        elif claims and nodes:
+            sources = "\n".join(node["text"] for node in nodes)
+            fact_verification_results = [FactVerifier().verify_claim(claim, sources) for claim in claims]
+        
+        if not fact_verification_results:
+            validated_results["fact_verification"] = "skipped"
+            self.workflow_steps.append("  Fact verification skipped: no figures in the summary or no time left to check them")
+            return
+        for fact_verification_result in fact_verification_results:
+            fact_verification_result["source"] = "PDF"
+        validated_results["fact_verification"] = "summary"
+        validated_results["fact_verifications"] = validated_results.get("fact_verifications", []) + fact_verification_results
+        supported_count = sum(1 for result in fact_verification_results if result["verified"])
+        self.workflow_steps.append(f"  Summary verification: {supported_count}/{len(fact_verification_results)} claims supported")
+    
+    @staticmethod
+    def _partial_summary(research_results: List[Dict[str, Any]], nodes: List[Dict[str, Any]], calculations: str) -> str:
+        """Answer assembled without an LLM call when the summary misses its deadline"""
+        answers = [result["answer"] for result in research_results if result.get("answer")]
+        if answers:
+            return "Partial answer (time budget reached): " + " ".join(answers)[:800]
+        if nodes:
+            return f"Partial answer (time budget reached). Computed figures: {calculations}\n\nMost relevant excerpt: {nodes[0]['text'][:400]}"
+        return "I couldn't finish researching that within the time budget."
+    
+    def _log_routing(self, retriever):
+        routed_shards = getattr(retriever, "last_routed", None)
+        if routed_shards is not None:
+            self.workflow_steps.append(f"    Routed to shards: {', '.join(routed_shards) or 'none'}")
+    
+    def _verify_online(
+        self,
+        fact_verifier,
+        sentence: str,
+        query_plan: Dict[str, Any],
+        fact_verification_results: List[Dict[str, Any]],
+        budget: QueryBudget
+    ):
+        """Internet check for a revenue/profit claim, when Tavily is configured and the budget allows"""
+        if not (fact_verifier.tavily_client and ("revenue" in sentence.lower() or "profit" in sentence.lower())):
+            return
+        if not (budget.external_verification and budget.can_afford(["validate", "summarize"])):
+            budget.degrade("skipped_external_verification")
+            self.workflow_steps.append("  Skipping internet verification to stay within budget")
+            return
+        try:
+            internet_verification_result = fact_verifier.verify_with_search(
+                sentence.strip()[:50],
+                self._company_for(query_plan)
+            )
+            internet_verification_result["source"] = "Internet"
+            fact_verification_results.append(internet_verification_result)
+            
+            if internet_verification_result.get("verified"):
+                confidence_score = internet_verification_result.get('confidence', 0)
+                self.workflow_steps.append(f"  Internet verification: {confidence_score:.2f}")
+        except Exception as search_error:
+            error_message = str(search_error)[:50]
+            self.workflow_steps.append(f"  Search unavailable: {error_message}")
+    
+    def _company_for(self, query_plan: Dict[str, Any]) -> str:
+        """Company the plan is about, for internet verification"""
+        from tools.financial_extractor import FinancialMetricsExtractor
+        plan_text = " ".join([query_plan.get("objective", "")] + list(query_plan.get("sub_queries", [])))
+        for mention in FinancialMetricsExtractor.find_entity_mentions(plan_text, self.companies):
+            if mention["type"] == "company":
+                return mention["value"]
+        return config.DEFAULT_COMPANY
+    
+    def _format_sources(self, nodes: List[Dict[str, Any]]) -> str:
+        """Source excerpts for single-pass synthesis, highest scoring first"""
+        sources = []
+        remaining_chars = config.RETRIEVE_ONLY_CONTEXT_CHARS
+        for source_number, node in enumerate(nodes, start=1):
+            sub_query_numbers = ", ".join(str(i + 1) for i in node["sub_queries"])
+            source = f"[{source_number}] (sub-queries {sub_query_numbers}) {node['text']}"
+            if len(source) > remaining_chars:
+                source = source[:remaining_chars]
+            sources.append(source)
+            remaining_chars -= len(source)
+            if remaining_chars <= 0:
+                break
+        return "\n\n".join(sources)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+IVF approximate search vs brute force across corpus sizes
+
+    python -m benchmarks.bench_ann --sizes 10000 50000 200000 --nprobe 4 8 16
+"""
+
+import argparse
+import time
+import numpy as np
+from indexing.ann import IVFVectorBackend
+from indexing.vector_backends import DenseVectorBackend, normalize_rows
+from benchmarks.bench_quantization import synthetic_embeddings
+
+def timed_search(backend, queries: np.ndarray, top_k: int, **search_kwargs):
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([node_id for node_id, _ in backend.search(query, top_k, **search_kwargs)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+def run(num_vectors: int, dim: int, num_queries: int, top_k: int, nprobes, insert_fraction: float):
+    rng = np.random.default_rng(1)
+    embeddings = synthetic_embeddings(num_vectors, dim)
+    node_ids = [str(i) for i in range(num_vectors)]
+    queries = normalize_rows(
+        embeddings[rng.integers(0, num_vectors, num_queries)]
+        + 0.3 * rng.normal(size=(num_queries, dim)).astype(np.float32)
+    )
+    
+    exact = DenseVectorBackend(node_ids, embeddings)
+    truth, exact_latencies = timed_search(exact, queries, top_k)
+    
+    # Build on most of the corpus, then insert the rest incrementally
+    num_initial = num_vectors - int(num_vectors * insert_fraction)
+    build_start = time.perf_counter()
+    ivf = IVFVectorBackend(node_ids[:num_initial], embeddings[:num_initial])
+    build_seconds = time.perf_counter() - build_start
+    insert_start = time.perf_counter()
+    if num_initial < num_vectors:
+        ivf.add(node_ids[num_initial:], embeddings[num_initial:])
+    insert_seconds = time.perf_counter() - insert_start
+    
+    print(f"\n{num_vectors} vectors x {dim} dims, {ivf.num_lists} lists, build {build_seconds:.1f}s, "
+          f"incremental insert of {num_vectors - num_initial} vectors {insert_seconds:.2f}s")
+    print(f"{'search':<14}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    print(f"{'brute force':<14}{1.0:>10.3f}{np.percentile(exact_latencies, 50):>9.2f}{np.percentile(exact_latencies, 95):>9.2f}")
+    for nprobe in nprobes:
+        found, latencies = timed_search(ivf, queries, top_k, nprobe=nprobe)
+        recall = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(found, truth)])
+        print(f"{f'ivf nprobe={nprobe}':<14}{recall:>10.3f}{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--insert-fraction", type=float, default=0.1, help="share of vectors added after the build")
+    args = parser.parse_args()
+    
+    for num_vectors in args.sizes:
+        run(num_vectors, args.dim, args.queries, args.top_k, args.nprobe, args.insert_fraction)
+    print()
+
+if __name__ == "__main__":
+    main()
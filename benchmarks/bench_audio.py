@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Per-core audio frame throughput: telephony μ-law in, VAD, PCM -> μ-law out
+
+    python -m benchmarks.bench_audio --seconds 60 --frames-per-chunk 1 5 25
+
+Each 20 ms telephony frame (160 μ-law bytes at 8 kHz) goes through the ring
+buffer, is decoded, resampled to the STT rate and fed to the VAD; TTS PCM is
+resampled back and μ-law encoded. A call needs 50 frames/s each way, so
+frames/s / 50 is the number of concurrent calls one core can carry.
+"""
+
+import argparse
+import time
+import numpy as np
+from voice.audio_buffer import AudioRingBuffer
+from voice.codecs import TELEPHONY_SAMPLE_RATE, mulaw_decode, mulaw_encode, mulaw_to_pcm, pcm_to_mulaw, resample
+from voice.vad import VoiceActivityDetector
+
+FRAME_MS = 20
+FRAMES_PER_SECOND_PER_CALL = 1000 // FRAME_MS
+
+def synthetic_call_audio(seconds: float, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """Alternating speech-like bursts and background noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    talking = (np.sin(2 * np.pi * 0.25 * t) > 0).astype(np.float64)
+    voice = (3000 * np.sin(2 * np.pi * 180 * t) + 1500 * np.sin(2 * np.pi * 360 * t)) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (talking * voice + rng.normal(0, 30, len(t))).clip(-32768, 32767).astype(np.int16)
+
+def python_mulaw_decode(data: bytes) -> bytes:
+    """Per-sample G.711 decode, the pure-Python baseline"""
+    out = bytearray()
+    for code in data:
+        code = ~code & 0xFF
+        magnitude = ((((code & 0x0F) << 3) + 0x84) << ((code >> 4) & 0x07)) - 0x84
+        out += (-magnitude if code & 0x80 else magnitude).to_bytes(2, "little", signed=True)
+    return bytes(out)
+
+def inbound_vectorized(mulaw: bytes, chunk_bytes: int, stt_rate: int) -> float:
+    ring = AudioRingBuffer(chunk_bytes * 8)
+    vad = VoiceActivityDetector(sample_rate=stt_rate)
+    start = time.perf_counter()
+    for offset in range(0, len(mulaw), chunk_bytes):
+        ring.write(mulaw[offset:offset + chunk_bytes])
+        vad.process(mulaw_to_pcm(ring.read(chunk_bytes), stt_rate))
+    return time.perf_counter() - start
+
+def inbound_baseline(mulaw: bytes, chunk_bytes: int, stt_rate: int) -> float:
+    """bytes concatenation, per-sample decode and per-sample sample-doubling, then the same VAD"""
+    vad = VoiceActivityDetector(sample_rate=stt_rate)
+    pending = b""
+    start = time.perf_counter()
+    for offset in range(0, len(mulaw), chunk_bytes):
+        pending = pending + mulaw[offset:offset + chunk_bytes]
+        pcm = python_mulaw_decode(pending)
+        pending = b""
+        upsampled = b"".join(pcm[i:i + 2] * (stt_rate // TELEPHONY_SAMPLE_RATE) for i in range(0, len(pcm), 2))
+        vad.process(upsampled)
+    return time.perf_counter() - start
+
+def outbound_vectorized(pcm: bytes, chunk_bytes: int, tts_rate: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(pcm), chunk_bytes):
+        pcm_to_mulaw(pcm[offset:offset + chunk_bytes], tts_rate)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="seconds of call audio per run")
+    parser.add_argument("--frames-per-chunk", type=int, nargs="+", default=[1, 5, 25])
+    parser.add_argument("--stt-rate", type=int, default=16000)
+    parser.add_argument("--baseline-seconds", type=float, default=10.0, help="shorter run for the slow baseline")
+    args = parser.parse_args()
+    
+    telephony = synthetic_call_audio(args.seconds, TELEPHONY_SAMPLE_RATE)
+    mulaw = mulaw_encode(telephony)
+    tts_pcm = resample(mulaw_decode(mulaw), TELEPHONY_SAMPLE_RATE, args.stt_rate).tobytes()
+    frame_bytes = TELEPHONY_SAMPLE_RATE * FRAME_MS // 1000
+    num_frames = len(mulaw) // frame_bytes
+    
+    print(f"\n{args.seconds:.0f}s of call audio, {num_frames} frames of {FRAME_MS} ms, STT/TTS at {args.stt_rate} Hz")
+    print(f"{'path':<34}{'frames/s':>12}{'calls/core':>12}")
+    
+    def report(label: str, frames: int, seconds: float):
+        frames_per_second = frames / seconds
+        print(f"{label:<34}{frames_per_second:>12,.0f}{frames_per_second / FRAMES_PER_SECOND_PER_CALL:>12,.0f}")
+    
+    baseline_frames = int(min(args.baseline_seconds, args.seconds) * FRAMES_PER_SECOND_PER_CALL)
+    report("inbound baseline (1 frame)", baseline_frames, inbound_baseline(mulaw[:baseline_frames * frame_bytes], frame_bytes, args.stt_rate))
+    for frames_per_chunk in args.frames_per_chunk:
+        report(f"inbound vectorized ({frames_per_chunk} frames)", num_frames, inbound_vectorized(mulaw, frame_bytes * frames_per_chunk, args.stt_rate))
+    tts_frame_bytes = args.stt_rate * FRAME_MS // 1000 * 2
+    for frames_per_chunk in args.frames_per_chunk:
+        report(f"outbound vectorized ({frames_per_chunk} frames)", num_frames, outbound_vectorized(tts_pcm, tts_frame_bytes * frames_per_chunk, args.stt_rate))
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Recall vs memory benchmark for quantized embedding storage
+
+    python -m benchmarks.bench_quantization --vectors 50000 --dim 1536
+    python -m benchmarks.bench_quantization --storage storage   # embeddings of the real index
+"""
+
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+from indexing.vector_backends import DenseVectorBackend, normalize_rows
+from indexing.quantization import QuantizedVectorBackend
+
+def synthetic_embeddings(num_vectors: int, dim: int, num_topics: int = 200, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, roughly shaped like chunk embeddings of related filings"""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(num_topics, dim)).astype(np.float32)
+    vectors = topics[rng.integers(0, num_topics, num_vectors)] + 0.6 * rng.normal(size=(num_vectors, dim)).astype(np.float32)
+    return normalize_rows(vectors)
+
+def run(embeddings: np.ndarray, num_queries: int, top_k: int, num_subspaces: int, rerank_candidates: int):
+    rng = np.random.default_rng(1)
+    node_ids = [str(i) for i in range(len(embeddings))]
+    queries = normalize_rows(
+        embeddings[rng.integers(0, len(embeddings), num_queries)]
+        + 0.3 * rng.normal(size=(num_queries, embeddings.shape[1])).astype(np.float32)
+    )
+    
+    exact = DenseVectorBackend(node_ids, embeddings)
+    truth = [[node_id for node_id, _ in exact.search(query, top_k)] for query in queries]
+    
+    backends = [("float32", exact, embeddings.nbytes, 0.0)]
+    for mode in ["int8", "pq"]:
+        build_start = time.perf_counter()
+        backend = QuantizedVectorBackend(
+            node_ids,
+            embeddings,
+            mode=mode,
+            rerank_candidates=rerank_candidates,
+            num_subspaces=num_subspaces
+        )
+        backends.append((mode, backend, backend.memory_bytes, time.perf_counter() - build_start))
+    
+    print(f"\n{len(embeddings)} vectors x {embeddings.shape[1]} dims, {num_queries} queries, top-{top_k}, "
+          f"re-rank {rerank_candidates}\n")
+    print(f"{'storage':<10}{'memory MB':>12}{'reduction':>11}{'recall@k':>10}{'exact top-k':>13}{'p50 ms':>9}{'p95 ms':>9}{'build s':>9}")
+    for name, backend, memory_bytes, build_seconds in backends:
+        latencies = []
+        recalls = []
+        exact_matches = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = [node_id for node_id, _ in backend.search(query, top_k)]
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(set(found) & set(expected)) / top_k)
+            exact_matches += found == expected
+        print(
+            f"{name:<10}{memory_bytes / 1e6:>12.1f}{embeddings.nbytes / memory_bytes:>10.1f}x"
+            f"{np.mean(recalls):>10.3f}{exact_matches / num_queries:>13.3f}"
+            f"{np.percentile(latencies, 50):>9.2f}{np.percentile(latencies, 95):>9.2f}{build_seconds:>9.1f}"
+        )
+    print("\nMemory counts the in-RAM representation; the quantized modes re-rank against the memory-mapped float32 file.\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--subspaces", type=int, default=96)
+    parser.add_argument("--rerank", type=int, default=100)
+    parser.add_argument("--storage", help="persist dir of an index to benchmark its real embeddings")
+    args = parser.parse_args()
+    
+    if args.storage:
+        from llama_index.core import StorageContext, load_index_from_storage
+        from indexing.vector_backends import export_embeddings
+        index = load_index_from_storage(StorageContext.from_defaults(persist_dir=str(Path(args.storage))))
+        _, embeddings = export_embeddings(index)
+    else:
+        embeddings = synthetic_embeddings(args.vectors, args.dim)
+    
+    run(embeddings, args.queries, args.top_k, args.subspaces, args.rerank)
+
+if __name__ == "__main__":
+    main()
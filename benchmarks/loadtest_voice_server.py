@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Load test for the Twilio voice server: per-worker call capacity
+
+    python -m benchmarks.loadtest_voice_server --rates 0.5 1 2 4 --duration 60
+    python -m benchmarks.loadtest_voice_server --target localhost --rates 2
+    python -m benchmarks.loadtest_voice_server --target http://10.0.0.5:8000 --rates 1 2
+
+Calls arrive as a Poisson process at each rate (calls/s). Every call replays
+the webhook sequence Twilio sends: POST /voice, then --turns POST
+/process-speech forms with a SpeechResult, separated by think time (the
+caller talking plus playback of the previous answer).
+
+The in-process and localhost targets run twilio_simple_call.app in this
+event loop with stand-in LLM and embedding models whose latency is set by
+--llm-ms/--embed-ms. The stand-ins block in their sync methods, like the
+real clients, so the blocking query_engine.query on the call path shows up
+as event-loop lag. Against an external URL the server keeps its own models,
+and loop lag only measures this client.
+
+A rate is sustained when webhook p95 stays under --slo-ms and errors plus
+timeouts stay under --max-error-rate; the highest such rate is the capacity
+of one worker (one event loop).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+import httpx
+import config
+from voice import prompt_library
+
+TWILIO_WEBHOOK_TIMEOUT = 15.0
+
+QUESTIONS = [
+    "What was Aerospace segment profit in 2023?",
+    "How did Building Automation revenue change from 2022 to 2023?",
+    "What was the operating cash flow?",
+    "What about its margin?",
+    "How much did Honeywell spend on research and development?",
+    "What are the main risk factors?",
+    "What was my last question?",
+    "Compare Performance Materials and Industrial Automation sales.",
+]
+
+# Fallback prompts the server speaks when it could not answer
+DEGRADED_PROMPTS = (
+    prompt_library.QUERY_FAILED,
+    prompt_library.GENERIC_ERROR,
+    prompt_library.TIMED_OUT,
+    prompt_library.RATE_LIMITED,
+)
+
+def degraded_markers() -> List[str]:
+    """Fallback prompts as spoken text, or as the audio key the server plays them from
+    
+    Keys are computed with this process's TTS settings, which match the
+    stand-in server; a remote server is matched on them only if it uses the
+    same provider, voice and model.
+    """
+    from voice.tts_handler import TTSHandler
+    tts = TTSHandler()
+    return [*DEGRADED_PROMPTS, *(tts.cache_key(prompt) for prompt in DEGRADED_PROMPTS)]
+
+STAND_IN_PLAN = {
+    "objective": "Answer the caller's financial question",
+    "sub_queries": ["Aerospace segment profit 2023", "Aerospace revenue 2023", "Aerospace segment margin 2022"],
+    "data_points": ["Aerospace segment margin 2023"],
+    "analysis_steps": ["compare years"],
+}
+STAND_IN_VALIDATION = {"is_valid": True, "confidence": 0.9, "issues": [], "validated_data": {}}
+STAND_IN_ANSWER = (
+    "Aerospace segment profit was $3,658 million in 2023 compared to $3,228 million in 2022, "
+    "on revenue of $13,624 million versus $11,827 million."
+)
+
+def synthetic_corpus(num_documents: int = 40) -> List[str]:
+    segments = ["Aerospace", "Building Automation", "Industrial Automation", "Energy and Sustainability Solutions"]
+    metrics = ["segment profit", "net sales", "segment margin", "operating cash flow", "research and development"]
+    rng = random.Random(0)
+    return [
+        f"{rng.choice(segments)} {rng.choice(metrics)} was ${rng.randint(500, 14000):,} million in "
+        f"{rng.choice([2022, 2023])}, {rng.choice(['up', 'down'])} {rng.randint(1, 20)}% year over year."
+        for _ in range(num_documents)
+    ]
+
+def install_stand_ins(llm_ms: float, embed_ms: float, workdir: str):
+    """Build the server's assistant on stand-in models and a synthetic index, without the startup hook"""
+    from llama_index.core import Document, Settings, VectorStoreIndex
+    from llama_index.core.embeddings import BaseEmbedding
+    from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata
+    from llama_index.core.llms.callbacks import llm_completion_callback
+    import twilio_simple_call
+    from main import ResearchAssistant
+    from voice.audio_cache import AudioCache
+    
+    def stand_in_text(prompt: str) -> str:
+        if "Query Planner" in prompt:
+            return json.dumps(STAND_IN_PLAN)
+        if "Validator Agent" in prompt:
+            return json.dumps(STAND_IN_VALIDATION)
+        return STAND_IN_ANSWER
+    
+    class StandInLLM(CustomLLM):
+        """Canned completions after a fixed latency; sync calls block like the real client"""
+        latency: float = 0.0
+        
+        @property
+        def metadata(self) -> LLMMetadata:
+            return LLMMetadata()
+        
+        @llm_completion_callback()
+        def complete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponse:
+            time.sleep(self.latency)
+            return CompletionResponse(text=stand_in_text(prompt))
+        
+        @llm_completion_callback()
+        def stream_complete(self, prompt: str, formatted: bool = False, **kwargs):
+            text = self.complete(prompt).text
+            return iter([CompletionResponse(text=text, delta=text)])
+        
+        async def acomplete(self, prompt: str, formatted: bool = False, **kwargs) -> CompletionResponse:
+            await asyncio.sleep(self.latency)
+            return CompletionResponse(text=stand_in_text(prompt))
+        
+        async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs):
+            await asyncio.sleep(self.latency)
+            text = stand_in_text(prompt)
+            
+            async def gen():
+                accumulated = ""
+                for start in range(0, len(text), 40):
+                    accumulated += text[start:start + 40]
+                    yield CompletionResponse(text=accumulated, delta=text[start:start + 40])
+            return gen()
+    
+    class StandInEmbedding(BaseEmbedding):
+        """Hashed bag-of-words vectors after a fixed latency"""
+        latency: float = 0.0
+        dim: int = 256
+        
+        def _vector(self, text: str) -> List[float]:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for word in re.findall(r"\w+", text.lower()):
+                vector[hash(word) % self.dim] += 1.0
+            norm = np.linalg.norm(vector)
+            return (vector / norm if norm else vector).tolist()
+        
+        def _get_query_embedding(self, query: str) -> List[float]:
+            time.sleep(self.latency)
+            return self._vector(query)
+        
+        def _get_text_embedding(self, text: str) -> List[float]:
+            return self._vector(text)
+        
+        async def _aget_query_embedding(self, query: str) -> List[float]:
+            await asyncio.sleep(self.latency)
+            return self._vector(query)
+    
+    # Keep the run's memory, indexes and audio out of the real stores
+    config.MEMORY_DIR = f"{workdir}/memory"
+    config.STORAGE_DIR = f"{workdir}/storage"
+    config.CORPUS_DIR = f"{workdir}/corpus"
+    config.VECTOR_BACKEND = "simple"
+    config.STT_PROVIDER = "offline"
+    config.TTS_PROVIDER = "offline"
+    
+    llm = StandInLLM(latency=llm_ms / 1000)
+    embed_model = StandInEmbedding(latency=embed_ms / 1000)
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+    
+    assistant = ResearchAssistant()
+    assistant._llm = llm
+    assistant._embed_model = embed_model
+    assistant._document_index = VectorStoreIndex.from_documents(
+        [Document(text=text) for text in synthetic_corpus()],
+        embed_model=embed_model
+    )
+    assistant.preload("memory", "workflow")
+    assistant.voice_interface.tts._cache = AudioCache(cache_dir=f"{workdir}/tts_cache")
+    twilio_simple_call.assistant = assistant
+    twilio_simple_call.worker_pool = None
+    return twilio_simple_call.app
+
+class LoopLagMonitor:
+    """How late a periodic timer fires: the time the loop spent unable to run ready tasks"""
+    
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - expected, 0.0) * 1000)
+    
+    def start(self):
+        self.lags = []
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> List[float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.lags
+
+class CallSimulator:
+    """Replays Twilio webhook sequences and records per-request outcomes"""
+    
+    def __init__(self, client: httpx.AsyncClient, turns: int, think_seconds: float, timeout: float):
+        self.client = client
+        self.turns = turns
+        self.think_seconds = think_seconds
+        self.timeout = timeout
+        self.samples: List[Dict[str, Any]] = []
+        self.active_calls = 0
+        self.peak_active_calls = 0
+        self.degraded_markers = degraded_markers()
+    
+    async def _post(self, path: str, form: Dict[str, str]):
+        start = time.perf_counter()
+        sample = {"path": path, "outcome": "ok"}
+        try:
+            response = await asyncio.wait_for(self.client.post(path, data=form), self.timeout)
+            if response.status_code != 200:
+                sample["outcome"] = "error"
+            elif any(marker in response.text for marker in self.degraded_markers):
+                sample["outcome"] = "degraded"
+        except asyncio.TimeoutError:
+            sample["outcome"] = "timeout"
+        except httpx.HTTPError:
+            sample["outcome"] = "error"
+        sample["ms"] = (time.perf_counter() - start) * 1000
+        self.samples.append(sample)
+    
+    async def call(self, call_number: int, rng: random.Random):
+        self.active_calls += 1
+        self.peak_active_calls = max(self.peak_active_calls, self.active_calls)
+        call_sid = f"CA{call_number:032x}"
+        try:
+            await self._post("/voice", {"CallSid": call_sid, "CallStatus": "in-progress", "From": "+15550100", "To": "+15550199"})
+            for _ in range(self.turns):
+                await asyncio.sleep(rng.expovariate(1 / self.think_seconds) if self.think_seconds else 0)
+                await self._post("/process-speech", {
+                    "CallSid": call_sid,
+                    "SpeechResult": rng.choice(QUESTIONS),
+                    "Confidence": f"{rng.uniform(0.7, 0.98):.2f}"
+                })
+        finally:
+            self.active_calls -= 1
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+async def run_rate(client: httpx.AsyncClient, rate: float, args, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    simulator = CallSimulator(client, args.turns, args.think_seconds, args.timeout)
+    monitor = LoopLagMonitor()
+    existing_tasks = asyncio.all_tasks()
+    
+    monitor.start()
+    calls = []
+    started = time.perf_counter()
+    call_number = 0
+    while time.perf_counter() - started < args.duration:
+        calls.append(asyncio.create_task(simulator.call(call_number, rng)))
+        call_number += 1
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - started
+    lags = await monitor.stop()
+    
+    # Background research spawned by the server outlives the webhooks; let it finish before the next rate
+    background = asyncio.all_tasks() - existing_tasks - {asyncio.current_task()}
+    if background:
+        _, still_running = await asyncio.wait(background, timeout=args.drain_seconds)
+    else:
+        still_running = set()
+    
+    speech = [sample for sample in simulator.samples if sample["path"] == "/process-speech"]
+    latencies = [sample["ms"] for sample in speech]
+    count = lambda outcome: sum(sample["outcome"] == outcome for sample in simulator.samples)
+    total = len(simulator.samples) or 1
+    return {
+        "rate": rate,
+        "calls": call_number,
+        "requests": len(simulator.samples),
+        "throughput": len(simulator.samples) / elapsed,
+        "peak_active_calls": simulator.peak_active_calls,
+        "voice_p50_ms": percentile([sample["ms"] for sample in simulator.samples if sample["path"] == "/voice"], 50),
+        "speech_p50_ms": percentile(latencies, 50),
+        "speech_p95_ms": percentile(latencies, 95),
+        "speech_p99_ms": percentile(latencies, 99),
+        "error_rate": count("error") / total,
+        "timeout_rate": count("timeout") / total,
+        "degraded_rate": count("degraded") / total,
+        "loop_lag_p50_ms": percentile(lags, 50),
+        "loop_lag_p99_ms": percentile(lags, 99),
+        "loop_lag_max_ms": max(lags, default=0.0),
+        "background_still_running": len(still_running),
+    }
+
+def print_report(results: List[Dict[str, Any]], args):
+    print(f"\n{'calls/s':>8}{'calls':>7}{'peak':>6}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'err %':>7}{'t/o %':>7}{'degr %':>8}{'lag p99':>9}{'lag max':>9}{'bg left':>8}")
+    for r in results:
+        print(f"{r['rate']:>8g}{r['calls']:>7}{r['peak_active_calls']:>6}{r['throughput']:>8.1f}"
+              f"{r['speech_p50_ms']:>9.0f}{r['speech_p95_ms']:>9.0f}{r['speech_p99_ms']:>9.0f}"
+              f"{r['error_rate'] * 100:>7.1f}{r['timeout_rate'] * 100:>7.1f}{r['degraded_rate'] * 100:>8.1f}"
+              f"{r['loop_lag_p99_ms']:>9.0f}{r['loop_lag_max_ms']:>9.0f}{r['background_still_running']:>8}")
+    
+    sustained = [
+        r for r in results
+        if r["speech_p95_ms"] <= args.slo_ms and r["error_rate"] + r["timeout_rate"] <= args.max_error_rate
+    ]
+    print(f"\n/process-speech latency; SLO p95 <= {args.slo_ms:.0f} ms with errors + timeouts <= {args.max_error_rate:.0%}")
+    if sustained:
+        best = max(sustained, key=lambda r: r["rate"])
+        print(f"Capacity per worker: {best['rate']:g} calls/s ({best['peak_active_calls']} concurrent calls at peak)\n")
+    else:
+        print("No tested rate met the SLO\n")
+
+async def run(args):
+    monitor_note = ""
+    server_task = None
+    if args.target in ("inprocess", "localhost"):
+        workdir = tempfile.mkdtemp(prefix="loadtest_")
+        app = install_stand_ins(args.llm_ms, args.embed_ms, workdir)
+        if args.target == "inprocess":
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://loadtest"
+        else:
+            import uvicorn
+            # lifespan off: the startup hook would replace the stand-ins with real models
+            server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="off"))
+            server_task = asyncio.create_task(server.serve())
+            while not server.started:
+                await asyncio.sleep(0.05)
+            transport = None
+            base_url = f"http://127.0.0.1:{args.port}"
+    else:
+        transport = None
+        base_url = args.target
+        monitor_note = " (client loop only)"
+    
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=None) as client:
+        for seed, rate in enumerate(args.rates):
+            print(f"{rate:g} calls/s for {args.duration:.0f}s ...", file=sys.stderr, flush=True)
+            # The server prints every turn; keep that out of the report unless asked for
+            with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+                results.append(await run_rate(client, rate, args, seed))
+    
+    if server_task is not None:
+        server.should_exit = True
+        await server_task
+    
+    print(f"\ntarget {base_url}, {args.turns} turns/call, {args.think_seconds:.1f}s mean think time, "
+          f"LLM {args.llm_ms:.0f} ms, embedding {args.embed_ms:.0f} ms{monitor_note}")
+    print_report(results, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help="inprocess, localhost, or a server URL")
+    parser.add_argument("--port", type=int, default=8765, help="port for --target localhost")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.5, 1, 2, 4], help="call arrival rates (calls/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals per rate")
+    parser.add_argument("--turns", type=int, default=3, help="/process-speech requests per call")
+    parser.add_argument("--think-seconds", type=float, default=4.0, help="mean gap between turns")
+    parser.add_argument("--llm-ms", type=float, default=800.0, help="stand-in LLM latency per completion")
+    parser.add_argument("--embed-ms", type=float, default=60.0, help="stand-in query embedding latency")
+    parser.add_argument("--timeout", type=float, default=TWILIO_WEBHOOK_TIMEOUT, help="per-request timeout (Twilio gives up at 15s)")
+    parser.add_argument("--slo-ms", type=float, default=3000.0, help="p95 target for /process-speech")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--drain-seconds", type=float, default=30.0, help="wait for background research between rates")
+    parser.add_argument("--json", help="also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="show the server's per-turn output")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
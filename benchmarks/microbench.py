@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the per-query and per-node pure-Python hot paths
+
+    python -m benchmarks.microbench                     # compare against the stored baselines
+    python -m benchmarks.microbench --corpus report     # text from the annual report instead of generated
+    python -m benchmarks.microbench --update-baselines  # record the current numbers as the baselines
+
+Each case runs at increasing input sizes and reports ops/s, the peak memory
+traced while one op runs, and the scaling exponent (slope of log time over
+log size: 1.0 is linear). Throughput is compared in calibrated units: ops
+per million iterations of a fixed pure-Python loop, timed just before each
+run, so baselines recorded on one machine hold on another. The best of
+--runs runs is kept to ride out noise from other load.
+
+The run fails when a case drops below its baseline by more than the stored
+tolerance, its peak memory grows by more than the memory tolerance, or its
+scaling exponent rises by more than the exponent tolerance.
+"""
+
+import argparse
+import json
+import math
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+import config
+
+BASELINES_PATH = Path(__file__).with_name("microbench_baselines.json")
+DEFAULT_TOLERANCE = 0.40
+DEFAULT_MEMORY_TOLERANCE = 0.50
+# A case whose time grows faster with input size than it used to has an algorithmic regression
+DEFAULT_EXPONENT_TOLERANCE = 0.25
+
+SEGMENTS = ["Aerospace", "Honeywell Building Technologies", "Performance Materials and Technologies", "Safety and Productivity Solutions"]
+METRICS = ["segment profit", "net sales", "segment margin", "operating income", "free cash flow", "revenue"]
+
+def generated_corpus(num_chars: int, seed: int = 0) -> str:
+    """Annual-report-like prose with dollar amounts, percentages and YoY changes"""
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < num_chars:
+        sentence = (
+            f"{rng.choice(SEGMENTS)} {rng.choice(METRICS)} was ${rng.randint(100, 15000):,} million in "
+            f"{rng.choice([2021, 2022, 2023])}, {rng.choice(['increased', 'decreased'])} by {rng.uniform(0.5, 25):.1f}% "
+            f"year-over-year, with a margin of {rng.uniform(10, 30):.1f}%. "
+        )
+        sentences.append(sentence)
+        length += len(sentence)
+    return "".join(sentences)[:num_chars]
+
+@lru_cache(maxsize=1)
+def _report_text(max_chars: int = 100_000) -> str:
+    from pypdf import PdfReader
+    reader = PdfReader(config.PDF_PATH)
+    text = ""
+    for page in reader.pages:
+        text += (page.extract_text() or "") + "\n"
+        if len(text) >= max_chars:
+            break
+    return text
+
+def report_corpus(num_chars: int) -> str:
+    """The first num_chars of extracted annual report text"""
+    return _report_text()[:num_chars]
+
+def calibrate(iterations: int = 1_000_000) -> float:
+    """Seconds per million iterations of a fixed loop, the machine's pure-Python speed"""
+    best = math.inf
+    for _ in range(3):
+        start = time.perf_counter()
+        total = 0
+        for i in range(iterations):
+            total += i & 7
+        best = min(best, time.perf_counter() - start)
+    return best * 1_000_000 / iterations
+
+def measure(operation: Callable[[], object], min_seconds: float) -> Tuple[float, float]:
+    """(best seconds per op over 5 timed batches, peak KiB traced during one op)"""
+    operation()
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            operation()
+        if time.perf_counter() - start >= min_seconds / 5 or batch >= 1 << 20:
+            break
+        batch *= 2
+    best = math.inf
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(batch):
+            operation()
+        best = min(best, (time.perf_counter() - start) / batch)
+    
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024
+
+def scaling_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """Least-squares slope of log(seconds) against log(size)"""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(value) for value in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator if denominator else 0.0
+
+def build_cases(corpus: Callable[[int], str], workdir: str) -> Dict[str, Tuple[str, List[int], Callable[[int], Callable[[], object]]]]:
+    """name -> (size unit, sizes, size -> zero-argument operation)"""
+    from tools.financial_extractor import FinancialMetricsExtractor
+    from tools.fact_verifier import FactVerifier
+    from memory.memory_manager import MemoryManager
+    from main import ResearchAssistant
+    
+    texts = {size: corpus(size) for size in (1_000, 10_000, 100_000)}
+    verifier = FactVerifier(tavily_api_key="")
+    claim = "Aerospace segment profit was $3,658 million in 2023, an increase of 13.3% year-over-year."
+    assistant = ResearchAssistant()
+    questions = [
+        "What was Aerospace segment profit in 2023?",
+        "Compare HBT and PMT margins year over year",
+        "How much free cash flow did the company generate?",
+        "Summarize the main risk factors in the annual report",
+    ]
+    
+    def extract_metrics(size):
+        return lambda: FinancialMetricsExtractor.extract_metrics(texts[size])
+    
+    def verify_claim(size):
+        return lambda: verifier.verify_claim(claim, texts[size])
+    
+    def memory_persistence(size):
+        # Behavioral memory keeps every query pattern; each turn rewrites all three files
+        directory = Path(workdir) / f"memory_{size}"
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+        memory = MemoryManager(str(directory))
+        memory.behavioral_memory["query_patterns"] = [
+            {"query": questions[i % len(questions)], "topic": "financial", "timestamp": "2024-01-01T00:00:00"}
+            for i in range(size)
+        ]
+        memory.behavioral_memory["interaction_count"] = size
+        return lambda: memory.add_to_short_term("user", questions[0])
+    
+    def topic_extraction(size):
+        batch = [questions[i % len(questions)] for i in range(size)]
+        return lambda: [assistant._extract_topic_from_query(question) for question in batch]
+    
+    def validator_prompt(size):
+        # The validator and summarizer serialize every sub-query result, then keep the first 2000 characters
+        research_results = [
+            {"sub_query": f"sub-query {i}", "answer": corpus(1_500 + i), "sources": 3}
+            for i in range(size)
+        ]
+        return lambda: config.VALIDATOR_PROMPT.format(
+            objective="Compare segment margins",
+            results=json.dumps(research_results, indent=2)[:2000],
+            calculations="",
+            fact_verifications="No fact verifications performed"
+        )
+    
+    return {
+        "extract_metrics": ("chars", sorted(texts), extract_metrics),
+        "verify_claim": ("context chars", sorted(texts), verify_claim),
+        "memory_persistence": ("history entries", [100, 1_000, 10_000], memory_persistence),
+        "topic_extraction": ("queries", [10, 100, 1_000], topic_extraction),
+        "validator_prompt": ("sub-queries", [3, 10, 30], validator_prompt),
+    }
+
+def run(args) -> Dict[str, Dict[str, object]]:
+    corpus = report_corpus if args.corpus == "report" else generated_corpus
+    workdir = tempfile.mkdtemp(prefix="microbench_")
+    try:
+        cases = build_cases(corpus, workdir)
+        selected = args.cases or list(cases)
+        print(f"\nCorpus: {args.corpus}; best of {args.runs} runs, each calibrated against the loop speed measured just before it")
+        print(f"{'case':<22}{'size':>9}{'ops/s':>13}{'calibrated':>12}{'peak KiB':>10}")
+        
+        results = {"corpus": args.corpus, "cases": {}}
+        for name in selected:
+            unit, sizes, make_operation = cases[name]
+            points = {}
+            for size in sizes:
+                operation = make_operation(size)
+                best = None
+                for _ in range(args.runs):
+                    # Recalibrating per run follows CPU frequency and neighbour load on shared machines
+                    calibration = calibrate(200_000)
+                    seconds, peak_kib = measure(operation, args.min_seconds)
+                    if best is None or calibration / seconds > best["calibrated_ops"]:
+                        best = {"ops_per_second": 1 / seconds, "calibrated_ops": calibration / seconds, "peak_kib": peak_kib}
+                points[str(size)] = best
+                print(f"{name:<22}{size:>9,}{best['ops_per_second']:>13,.1f}{best['calibrated_ops']:>12,.3f}{best['peak_kib']:>10,.1f}")
+            exponent = scaling_exponent(sizes, [1 / points[str(size)]["ops_per_second"] for size in sizes])
+            print(f"{'':<22}scaling exponent {exponent:.2f} over {unit}")
+            results["cases"][name] = {"unit": unit, "points": points, "scaling_exponent": exponent}
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def compare(results: Dict[str, object], baselines: Dict[str, object]) -> List[str]:
+    """Threshold violations, as messages"""
+    regressions = []
+    corpus_baselines = baselines.get("corpora", {}).get(results["corpus"], {})
+    for name, case in results["cases"].items():
+        baseline_case = corpus_baselines.get(name)
+        if baseline_case is None:
+            continue
+        tolerance = baseline_case.get("tolerance", DEFAULT_TOLERANCE)
+        memory_tolerance = baseline_case.get("memory_tolerance", DEFAULT_MEMORY_TOLERANCE)
+        exponent_ceiling = baseline_case["scaling_exponent"] + baseline_case.get("exponent_tolerance", DEFAULT_EXPONENT_TOLERANCE)
+        if case["scaling_exponent"] > exponent_ceiling and set(case["points"]) == set(baseline_case["points"]):
+            regressions.append(f"{name}: scaling exponent {case['scaling_exponent']:.2f} > {exponent_ceiling:.2f}")
+        for size, point in case["points"].items():
+            baseline = baseline_case["points"].get(size)
+            if baseline is None:
+                continue
+            floor = baseline["calibrated_ops"] * (1 - tolerance)
+            if point["calibrated_ops"] < floor:
+                regressions.append(
+                    f"{name} @ {size}: {point['calibrated_ops']:.3f} calibrated ops "
+                    f"< {floor:.3f} ({baseline['calibrated_ops']:.3f} - {tolerance:.0%})"
+                )
+            ceiling = baseline["peak_kib"] * (1 + memory_tolerance) + 16
+            if point["peak_kib"] > ceiling:
+                regressions.append(f"{name} @ {size}: peak {point['peak_kib']:.1f} KiB > {ceiling:.1f} KiB")
+    return regressions
+
+def update_baselines(results: Dict[str, object], baselines: Dict[str, object]):
+    """Record this run's numbers, keeping any per-case tolerances already set"""
+    corpus_baselines = baselines.setdefault("corpora", {}).setdefault(results["corpus"], {})
+    for name, case in results["cases"].items():
+        previous = corpus_baselines.get(name, {})
+        corpus_baselines[name] = {
+            "tolerance": previous.get("tolerance", DEFAULT_TOLERANCE),
+            "memory_tolerance": previous.get("memory_tolerance", DEFAULT_MEMORY_TOLERANCE),
+            "exponent_tolerance": previous.get("exponent_tolerance", DEFAULT_EXPONENT_TOLERANCE),
+            "unit": case["unit"],
+            "scaling_exponent": round(case["scaling_exponent"], 3),
+            "points": {
+                size: {"calibrated_ops": round(point["calibrated_ops"], 4), "peak_kib": round(point["peak_kib"], 1)}
+                for size, point in case["points"].items()
+            }
+        }
+    with open(BASELINES_PATH, 'w') as f:
+        json.dump(baselines, f, indent=2)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["generated", "report"], default="generated")
+    parser.add_argument("--cases", nargs="+", help="run only these cases")
+    parser.add_argument("--min-seconds", type=float, default=0.3, help="timed duration per case, size and run")
+    parser.add_argument("--runs", type=int, default=3, help="keep the best of this many calibrated runs")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args()
+    
+    results = run(args)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    if args.update_baselines:
+        update_baselines(results, baselines)
+        print(f"\nBaselines written to {BASELINES_PATH}\n")
+        return
+    regressions = compare(results, baselines)
+    if regressions:
+        print("\nRegressions against stored baselines:")
+        for regression in regressions:
+            print(f"  {regression}")
+        print()
+        sys.exit(1)
+    print("\nNo regressions against stored baselines\n")
+
+if __name__ == "__main__":
+    main()
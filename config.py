@@ -14,15 +14,177 @@ ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
 PDF_PATH = "Honeywell-2023-Annual-Report.pdf"
 STORAGE_DIR = "storage"
 MEMORY_DIR = "memory_store"
+# Per-session semantic conversation index: earlier turns relevant to a question are put
+# in its context (within CONVERSATION_CONTEXT_TOKENS), and follow-ups reuse their research nodes
+CONVERSATION_MAX_TURNS = 20
+CONVERSATION_MAX_NODES_PER_TURN = 15
+CONVERSATION_TOP_K = 3
+CONVERSATION_RECENCY_WEIGHT = 0.1
+CONVERSATION_CONTEXT_TOKENS = int(os.getenv("CONVERSATION_CONTEXT_TOKENS", "400"))
+CONVERSATION_FOLLOW_UP_SIMILARITY = 0.85
+CONVERSATION_FOLLOW_UP_MAX_WORDS = 12
+# A short question with a pronoun only counts as a follow-up when this similar to the latest turn
+CONVERSATION_ANAPHORA_MIN_SIMILARITY = 0.4
+# Conversation indexes kept at once, one per session (e.g. per phone call), least recently used dropped
+CONVERSATION_MAX_SESSIONS = 256
+CONVERSATION_REUSE_TURNS = 2
+CONVERSATION_REUSE_MAX_NODES = 15
+# Fresh nodes retrieved for a follow-up on top of the reused ones
+FOLLOW_UP_TOP_UP_K = 3
+# Precomputed answers: `main.py precompute` clusters the behavioral query history and runs the
+# full workflow for the heaviest clusters off-peak; close matches are answered from that index
+PRECOMPUTED_ANSWERS_DIR = os.getenv("PRECOMPUTED_ANSWERS_DIR", "precomputed_answers")
+PRECOMPUTE_TOP_CLUSTERS = int(os.getenv("PRECOMPUTE_TOP_CLUSTERS", "20"))
+PRECOMPUTE_MIN_CLUSTER_WEIGHT = 2.0  # recency-weighted asks
+PRECOMPUTE_CLUSTER_SIMILARITY = 0.85
+PRECOMPUTE_HISTORY_HALF_LIFE_DAYS = 14.0
+PRECOMPUTE_MIN_CONFIDENCE = 0.6
+PRECOMPUTE_CONCURRENCY = 2
+PRECOMPUTE_OFF_PEAK_HOURS = os.getenv("PRECOMPUTE_OFF_PEAK_HOURS", "1-6")  # local time, end exclusive
+PRECOMPUTED_MATCH_SIMILARITY = float(os.getenv("PRECOMPUTED_MATCH_SIMILARITY", "0.92"))
+
+# Companies recognized as entity slots in queries (shard catalog companies are added at runtime)
+KNOWN_COMPANIES = ["Honeywell"]
+DEFAULT_COMPANY = "Honeywell"
+
+# Sharded corpus: one index shard per company and fiscal year under CORPUS_DIR.
+# When CORPUS_DIR/catalog.json exists, queries are routed to the relevant shards
+# instead of the single index in STORAGE_DIR.
+CORPUS_DIR = os.getenv("CORPUS_DIR", "corpus")
+FILING_YEARS_COVERED = 3  # an annual report carries comparatives for the two prior years
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "8"))
+SHARD_CACHE_MAX_NODES = int(os.getenv("SHARD_CACHE_MAX_NODES", "200000"))
 
 # Model Configuration
 LLM_MODEL = "gpt-4-turbo-preview"
 EMBEDDING_MODEL = "text-embedding-3-small"
 TEMPERATURE = 0.1
 
+# Ingestion Configuration
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))  # 0 = one per CPU core
+INGEST_PAGES_PER_TASK = 4
+INGEST_EMBED_BATCH_SIZE = 64
+
+# Retrieval Configuration
+# "simple" scores the index's own vector store; "dense" uses a memory-mapped
+# NumPy matrix persisted beside the docstore; "int8" and "pq" keep quantized
+# embeddings in memory and re-rank a shortlist against the memory-mapped matrix;
+# "ivf" only scores the inverted lists of the IVF_NPROBE closest centroids
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "simple")
+QUANTIZATION_RERANK_CANDIDATES = 100
+PQ_SUBSPACES = 96
+IVF_NUM_LISTS = 0  # 0 = about 4 * sqrt(number of nodes)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# Pre-filter each sub-query's candidates by the segments, years and tables it mentions
+METADATA_FILTERING = os.getenv("METADATA_FILTERING", "true").lower() == "true"
+METADATA_FILTER_MIN_CANDIDATES = 20
+# Adaptive retrieval depth: retrieve up to RETRIEVAL_MAX_K nodes per sub-query, then keep those
+# scoring within RETRIEVAL_RELATIVE_CUTOFF of the best and before the largest score drop (the knee).
+# The ceiling is the old fixed k, so flat score curves never send more context than before
+ADAPTIVE_RETRIEVAL = os.getenv("ADAPTIVE_RETRIEVAL", "true").lower() == "true"
+RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "5"))
+RETRIEVAL_MIN_K = 2
+RETRIEVAL_RELATIVE_CUTOFF = 0.85
+RETRIEVAL_KNEE_MIN_DROP = 0.05
+# Voice answers are synthesized on the call path, so they retrieve less
+VOICE_RETRIEVAL_MAX_K = 2
+VOICE_RETRIEVAL_MIN_K = 1
+# Stop researching once every data point in the plan has a figure in the results so far
+EARLY_TERMINATION = os.getenv("EARLY_TERMINATION", "true").lower() == "true"
+# Hierarchical summary tree, built at ingest beside the docstore: chunk clusters within each
+# section are summarized and rolled up to section and document summaries. Overview questions
+# are answered from SUMMARY_TREE_TOP_K of these; only sub-queries naming a metric retrieve chunks
+SUMMARY_TREE = os.getenv("SUMMARY_TREE", "true").lower() == "true"
+SUMMARY_TREE_TOP_K = int(os.getenv("SUMMARY_TREE_TOP_K", "4"))
+SUMMARY_TREE_CLUSTER_SIZE = 8  # chunks per cluster summary
+SUMMARY_TREE_MIN_SECTION_CHUNKS = 3  # smaller sections are merged into the next one
+SUMMARY_TREE_FANOUT = 8  # section summaries per higher-level summary
+SUMMARY_TREE_INPUT_CHARS = 12000
+SUMMARY_TREE_CONCURRENCY = 4
+
+# Fact Verification Configuration
+# "semantic" checks every numeric claim against the stored node embeddings in one
+# batch; "keyword" only checks the first answer's opening sentences by word overlap
+CLAIM_VERIFICATION = os.getenv("CLAIM_VERIFICATION", "semantic")
+MAX_VERIFIED_CLAIMS = 50
+
+# Research Configuration
+# "query_engine" synthesizes an answer per sub-query; "retrieve_only" retrieves
+# nodes for all sub-queries, merges them and synthesizes once in the summarizer
+RESEARCH_MODE = os.getenv("RESEARCH_MODE", "query_engine")
+RETRIEVE_ONLY_CONTEXT_CHARS = 12000
+
+# Planner Configuration
+# Maximum number of query templates kept by the planner's plan cache (0 disables it)
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "256"))
+# Step outputs (plan, research, calculations, validation) of recent runs, so retries and
+# refinements ("elaborate on that", "just the Aerospace part") resume without re-running research
+CHECKPOINT_MAX_RUNS = 32
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(20 * 1024 * 1024)))
+# Stream the planner output and start researching each sub-query as soon as it is complete
+PLAN_STREAMING = os.getenv("PLAN_STREAMING", "true").lower() == "true"
+
+# Budget Configuration
+# Per-query deadline (seconds), token and cost limits; when a budget runs low the
+# workflow degrades (fewer sub-queries, no internet verification, one merged
+# validate+summarize call) and flags the result as partial
+QUERY_BUDGETS = {
+    "voice": {"deadline_seconds": 3.0, "max_tokens": 6000, "max_cost_usd": 0.10, "max_sub_queries": 1, "external_verification": False},
+    "batch": {"deadline_seconds": 60.0, "max_tokens": 60000, "max_cost_usd": 1.00, "max_sub_queries": 5, "external_verification": True}
+}
+DEFAULT_QUERY_BUDGET = os.getenv("QUERY_BUDGET", "batch")
+# Share of the deadline by which each step should be done (cumulative in workflow order)
+BUDGET_STEP_SHARES = {"plan": 0.15, "research": 0.45, "validate": 0.15, "summarize": 0.25}
+# Rough token cost of one synthesized sub-query (retrieved context + answer)
+SUB_QUERY_TOKEN_ESTIMATE = 2500
+LLM_INPUT_COST_PER_1K_TOKENS = float(os.getenv("LLM_INPUT_COST_PER_1K_TOKENS", "0.01"))
+LLM_OUTPUT_COST_PER_1K_TOKENS = float(os.getenv("LLM_OUTPUT_COST_PER_1K_TOKENS", "0.03"))
+
+# Serving Configuration
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+WORKER_HEARTBEAT_INTERVAL = 1.0
+WORKER_HEARTBEAT_TIMEOUT = 15.0
+WORKER_REQUEST_TIMEOUT = 60.0
+
 # Voice Configuration
 STT_PROVIDER = os.getenv("STT_PROVIDER", "deepgram")
 TTS_PROVIDER = os.getenv("TTS_PROVIDER", "elevenlabs")
+# Provider adapters share one pooled keepalive HTTP client each ("offline" providers
+# return canned transcripts / synthetic audio for load tests without outside services)
+PROVIDER_MAX_CONNECTIONS = 20
+PROVIDER_MAX_KEEPALIVE_CONNECTIONS = 10
+PROVIDER_KEEPALIVE_SECONDS = 60.0
+PROVIDER_CONNECT_TIMEOUT = 5.0
+STT_TIMEOUT_SECONDS = float(os.getenv("STT_TIMEOUT_SECONDS", "15"))
+TTS_TIMEOUT_SECONDS = float(os.getenv("TTS_TIMEOUT_SECONDS", "15"))
+OFFLINE_STT_LATENCY = float(os.getenv("OFFLINE_STT_LATENCY", "0.15"))
+OFFLINE_TTS_FIRST_CHUNK_LATENCY = float(os.getenv("OFFLINE_TTS_FIRST_CHUNK_LATENCY", "0.2"))
+OFFLINE_TRANSCRIPTS = [
+    "What was Honeywell's revenue in 2023?",
+    "Which segment had the highest operating margin last year?",
+    "How did Aerospace segment profit change from 2022 to 2023?",
+    "Summarize the main risk factors in the latest annual report."
+]
+# Streamed caller audio: 16-bit mono PCM. Local voice activity detection sends only
+# complete utterances to STT and ends the turn after VAD_HANGOVER_MS of silence
+STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", "16000"))
+VAD_FRAME_MS = 20
+VAD_ENERGY_MARGIN_DB = 12.0
+VAD_MIN_ENERGY_DBFS = -50.0
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "500"))
+VAD_MIN_SPEECH_MS = 100
+VAD_PRE_ROLL_MS = 200
+VAD_MIN_UTTERANCE_MS = 250
+VAD_MAX_UTTERANCE_SECONDS = 15.0
+# Capacity of the preallocated ring that streamed audio is framed from
+AUDIO_BUFFER_SECONDS = 2.0
+TTS_MODEL_ID = "eleven_turbo_v2"
+# Content-addressed cache of synthesized audio (0 bytes disables it)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+TTS_CACHE_CHUNK_BYTES = 4096
+# Pre-render the fixed voice prompts (greeting, acknowledgments, errors) at server startup
+TTS_CACHE_WARMUP = os.getenv("TTS_CACHE_WARMUP", "true").lower() == "true"
 
 # ============================================================================
 # AGENT PROMPTS
@@ -30,8 +192,12 @@ TTS_PROVIDER = os.getenv("TTS_PROVIDER", "elevenlabs")
 # Edit these prompts to customize agent behavior.
 # Available placeholders:
 # - QUERY_PLANNER_PROMPT: {context}, {query}
-# - VALIDATOR_PROMPT: {objective}, {results}, {fact_verifications}
-# - SUMMARIZER_PROMPT: {validated_results}
+# - VALIDATOR_PROMPT: {objective}, {results}, {calculations}, {fact_verifications}
+# - SUMMARIZER_PROMPT: {validated_results}, {calculations}
+# - RETRIEVAL_SUMMARIZER_PROMPT: {validated_results}, {calculations}, {sources}
+# - REFINEMENT_FOCUS_PROMPT: {focus}
+# - VALIDATE_AND_SUMMARIZE_PROMPT: {objective}, {results}, {calculations}, {fact_verifications}
+# - SUMMARY_TREE_PROMPT: {scope}, {text}
 # ============================================================================
 
 QUERY_PLANNER_PROMPT = """You are a Query Planner Agent specialized in financial document analysis.
@@ -72,11 +238,14 @@ OBJECTIVE: {objective}
 RESEARCH RESULTS:
 {results}
 
+COMPUTED FIGURES (deterministic calculations from the extracted numbers):
+{calculations}
+
 FACT VERIFICATIONS:
 {fact_verifications}
 
 VALIDATION CRITERIA:
-1. ACCURACY: Are numerical values and facts correct based on source documents?
+1. ACCURACY: Are numerical values and facts correct based on source documents? Do they agree with the computed figures?
 2. COMPLETENESS: Are all sub-queries adequately answered?
 3. CONSISTENCY: Do answers align without contradictions?
 4. CONFIDENCE: Calculate overall confidence (0.0 to 1.0)
@@ -112,6 +281,9 @@ ROLE: Generate clear, accurate, and actionable summaries from validated research
 VALIDATED RESULTS:
 {validated_results}
 
+COMPUTED FIGURES (exact; use these margins, changes and residuals rather than recalculating):
+{calculations}
+
 SUMMARY REQUIREMENTS:
 1. DIRECT ANSWER: Address the original question immediately
 2. KEY FINDINGS: Highlight the most important insights
@@ -138,3 +310,83 @@ Plain text summary (NOT JSON). 2-4 paragraphs maximum.
 - Final paragraph: Limitations or caveats (if any)
 
 IMPORTANT: Provide ONLY the final summary. Do not show your reasoning process or thinking steps."""
+
+RETRIEVAL_SUMMARIZER_PROMPT = """You are a Summarizer Agent specialized in financial analysis communication.
+
+ROLE: Answer the research objective in one pass from retrieved source excerpts.
+
+VALIDATED RESULTS:
+{validated_results}
+
+COMPUTED FIGURES (exact; use these margins, changes and residuals rather than recalculating):
+{calculations}
+
+SOURCE EXCERPTS (numbered, with the sub-queries that retrieved each one):
+{sources}
+
+SUMMARY REQUIREMENTS:
+1. DIRECT ANSWER: Address the original question immediately
+2. KEY FINDINGS: Highlight the most important insights
+3. SPECIFIC DATA: Include exact numbers, percentages, and comparisons
+4. CONTEXT: Provide relevant context for understanding
+5. LIMITATIONS: Note any caveats or uncertainties
+
+ANTI-HALLUCINATION RULES:
+- Use ONLY information from the source excerpts and validated results
+- Do not infer or extrapolate beyond provided data
+- Clearly state when a sub-query is not answered by any excerpt
+- Cite specific numbers from source documents
+
+OUTPUT FORMAT:
+Plain text summary (NOT JSON). 2-4 paragraphs maximum.
+- First paragraph: Direct answer with key metrics
+- Middle paragraphs: Supporting details and comparisons
+- Final paragraph: Limitations or caveats (if any)
+
+IMPORTANT: Provide ONLY the final summary. Do not show your reasoning process or thinking steps."""
+
+REFINEMENT_FOCUS_PROMPT = """
+
+FOLLOW-UP: The user has already seen an answer based on these results and now asks: "{focus}"
+Answer that request using only the results above: narrow to what it names, or expand where it asks for detail."""
+
+VALIDATE_AND_SUMMARIZE_PROMPT = """You are a Validator and Summarizer Agent for financial analysis, answering under a tight time budget.
+
+ROLE: Check the research results against the fact verifications and computed figures, then answer in one pass.
+
+RESEARCH OBJECTIVE: {objective}
+
+RESEARCH RESULTS:
+{results}
+
+COMPUTED FIGURES (exact; use these margins, changes and residuals rather than recalculating):
+{calculations}
+
+FACT VERIFICATIONS:
+{fact_verifications}
+
+REQUIREMENTS:
+1. DIRECT ANSWER: Address the original question immediately with the key numbers
+2. Use only figures that appear in the research results or computed figures
+3. Leave out or clearly qualify any figure whose fact verification did not support it
+4. Say briefly what could not be checked
+
+OUTPUT FORMAT:
+Plain text summary (NOT JSON). 1-2 short paragraphs.
+
+IMPORTANT: Provide ONLY the final summary. Do not show your reasoning process or thinking steps."""
+
+SUMMARY_TREE_PROMPT = """You are summarizing part of a company's annual report for an index that answers overview questions.
+
+SCOPE: {scope}
+
+TEXT:
+{text}
+
+REQUIREMENTS:
+1. State the main points: results, drivers, strategy, risks and outlook as applicable
+2. Keep the key figures with their fiscal years, segments and units exactly as written
+3. Do not add information that is not in the text
+4. At most 200 words of plain prose (NOT JSON, no headings)
+
+IMPORTANT: Provide ONLY the summary."""
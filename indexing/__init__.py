@@ -0,0 +1,26 @@
+from .ann import IVFVectorBackend
+from .metadata import MetadataIndex, load_or_build_metadata_index, tag_nodes
+from .shards import ShardCatalog, ShardManager, ShardedRetriever, ingest_shard
+from .summary_tree import SummaryTree, build_summary_tree, load_summary_tree
+from .vector_backends import (
+    DenseVectorBackend,
+    VectorBackendRetriever,
+    load_or_build_vector_backend
+)
+
+__all__ = [
+    'DenseVectorBackend',
+    'IVFVectorBackend',
+    'MetadataIndex',
+    'ShardCatalog',
+    'ShardManager',
+    'ShardedRetriever',
+    'SummaryTree',
+    'VectorBackendRetriever',
+    'load_or_build_vector_backend',
+    'load_or_build_metadata_index',
+    'build_summary_tree',
+    'load_summary_tree',
+    'ingest_shard',
+    'tag_nodes'
+]
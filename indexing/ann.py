@@ -0,0 +1,131 @@
+import math
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .clustering import assign_clusters, kmeans
+from .vector_backends import (
+    DenseVectorBackend,
+    _read_manifest,
+    _write_manifest,
+    normalize_rows,
+    save_array,
+    top_k_indices
+)
+import config
+
+class IVFVectorBackend(DenseVectorBackend):
+    """Inverted-file (IVF) approximate nearest-neighbour search
+    
+    Nodes are clustered with k-means into num_lists inverted lists. A query is
+    compared against the centroids first and only the rows of the nprobe closest
+    lists are scored exactly, so per-query work grows with n / num_lists * nprobe
+    instead of n. Raising nprobe trades latency for recall; nprobe == num_lists
+    is exact search.
+    """
+    
+    name = "ivf"
+    
+    def __init__(
+        self,
+        node_ids: Sequence[str],
+        embeddings: np.ndarray,
+        num_lists: int = config.IVF_NUM_LISTS,
+        nprobe: int = config.IVF_NPROBE,
+        centroids: Optional[np.ndarray] = None,
+        assignments: Optional[np.ndarray] = None
+    ):
+        super().__init__(node_ids, embeddings)
+        self.nprobe = nprobe
+        self.centroids = centroids
+        self.assignments = assignments
+        if centroids is None and len(node_ids):
+            num_lists = num_lists or max(1, int(4 * math.sqrt(len(node_ids))))
+            self.train(num_lists)
+        self._build_lists()
+    
+    @property
+    def num_lists(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+    
+    def train(self, num_lists: int):
+        embeddings = np.asarray(self.embeddings)
+        centroids, _ = kmeans(embeddings, num_lists, iterations=15, sample_size=50000)
+        # Probing ranks centroids by dot product, so assign rows by the normalized centroids too
+        self.centroids = normalize_rows(centroids).astype(np.float32)
+        self.assignments = assign_clusters(embeddings, self.centroids)
+    
+    def _build_lists(self):
+        """Group rows by list (CSR layout): rows of list i are list_rows[offsets[i]:offsets[i + 1]]"""
+        if self.assignments is None:
+            self.list_rows = np.empty(0, dtype=np.int64)
+            self.list_offsets = np.zeros(1, dtype=np.int64)
+            return
+        self.list_rows = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=self.num_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)])
+    
+    def add(self, node_ids: Sequence[str], embeddings: np.ndarray):
+        """Append new nodes to their nearest existing lists (centroids are not retrained)"""
+        embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        super().add(node_ids, embeddings)
+        if self.centroids is None:
+            self.train(max(1, int(4 * math.sqrt(len(self.node_ids)))))
+        else:
+            self.assignments = np.concatenate([self.assignments, assign_clusters(embeddings, self.centroids)])
+        self._build_lists()
+    
+    def probe_rows(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Rows of the nprobe lists whose centroids are closest to the query"""
+        lists = top_k_indices(self.centroids @ query, nprobe or self.nprobe)
+        return np.concatenate([
+            self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists
+        ])
+    
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        candidate_rows: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        if not len(self.node_ids):
+            return []
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        rows = self.probe_rows(query, nprobe)
+        if candidate_rows is not None:
+            rows = np.intersect1d(rows, candidate_rows)
+            # Narrow filters may miss the probed lists entirely; score the filter exactly then
+            if len(rows) < top_k:
+                rows = candidate_rows
+        
+        rows = np.sort(rows)
+        scores = np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+        best = top_k_indices(scores, top_k)
+        return [(self.node_ids[rows[i]], float(scores[i])) for i in best]
+    
+    def save(self, persist_dir: str):
+        persist_path = Path(persist_dir)
+        persist_path.mkdir(parents=True, exist_ok=True)
+        save_array(persist_path / "embeddings.npy", self.embeddings)
+        if self.centroids is not None:
+            save_array(persist_path / "ivf_centroids.npy", self.centroids)
+            save_array(persist_path / "ivf_assignments.npy", self.assignments)
+        _write_manifest(persist_path, self.name, self.node_ids, {
+            "num_lists": self.num_lists,
+            "nprobe": self.nprobe
+        })
+    
+    @classmethod
+    def load(cls, persist_dir: str, mmap: bool = True) -> "IVFVectorBackend":
+        persist_path = Path(persist_dir)
+        manifest = _read_manifest(persist_path)
+        centroids_path = persist_path / "ivf_centroids.npy"
+        has_lists = centroids_path.exists()
+        return cls(
+            manifest["node_ids"],
+            np.load(persist_path / "embeddings.npy", mmap_mode="r" if mmap else None),
+            num_lists=manifest["params"]["num_lists"],
+            nprobe=config.IVF_NPROBE,
+            centroids=np.load(centroids_path) if has_lists else None,
+            assignments=np.load(persist_path / "ivf_assignments.npy") if has_lists else None
+        )
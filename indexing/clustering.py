@@ -0,0 +1,51 @@
+from typing import Optional, Tuple
+import numpy as np
+
+def squared_distances(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise squared Euclidean distances, shape (len(data), len(centroids))"""
+    data_norms = np.einsum("ij,ij->i", data, data)[:, None]
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)[None, :]
+    return np.maximum(data_norms - 2.0 * data @ centroids.T + centroid_norms, 0.0)
+
+def assign_clusters(data: np.ndarray, centroids: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """Nearest centroid for each row, computed in blocks to bound temporary memory"""
+    assignments = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start:start + block_size], dtype=np.float32)
+        assignments[start:start + block_size] = squared_distances(block, centroids).argmin(axis=1)
+    return assignments
+
+def kmeans(
+    data: np.ndarray,
+    num_clusters: int,
+    iterations: int = 20,
+    seed: int = 0,
+    sample_size: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Lloyd's k-means; returns (centroids, assignments for every row of data)"""
+    rng = np.random.default_rng(seed)
+    num_clusters = max(1, min(num_clusters, len(data)))
+    
+    training = data
+    if sample_size and len(data) > sample_size:
+        training = data[np.sort(rng.choice(len(data), sample_size, replace=False))]
+    training = np.asarray(training, dtype=np.float32)
+    
+    centroids = training[rng.choice(len(training), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = squared_distances(training, centroids).argmin(axis=1)
+        counts = np.bincount(assignments, minlength=num_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, training)
+        non_empty = counts > 0
+        updated = centroids.copy()
+        updated[non_empty] = sums[non_empty] / counts[non_empty, None]
+        # Re-seed empty clusters with random training points
+        if not non_empty.all():
+            updated[~non_empty] = training[rng.choice(len(training), int((~non_empty).sum()))]
+        if np.allclose(updated, centroids):
+            centroids = updated
+            break
+        centroids = updated
+    
+    return centroids, assign_clusters(data, centroids)
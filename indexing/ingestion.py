@@ -0,0 +1,196 @@
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from llama_index.core import Document, Settings, StorageContext, VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, MetadataMode
+import config
+
+def _count_pages(file_path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(file_path).pages)
+
+def _parse_page_range(file_path: str, start: int, end: int) -> Tuple[str, List[Tuple[int, str, str]]]:
+    """Extract (page_number, page_label, text) for pages [start, end) in a worker process"""
+    import pypdf
+    reader = pypdf.PdfReader(file_path)
+    page_labels = reader.page_labels
+    pages = []
+    for page_number in range(start, min(end, len(reader.pages))):
+        page_label = page_labels[page_number] if page_number < len(page_labels) else str(page_number + 1)
+        pages.append((page_number, page_label, reader.pages[page_number].extract_text() or ""))
+    return file_path, pages
+
+def file_sha256(file_path: str) -> str:
+    """Content hash recorded on every node, so a re-ingested file is recognized wherever it lives"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def expand_pdf_paths(paths: Sequence[str]) -> List[str]:
+    """Expand directories into the PDFs they contain"""
+    pdf_paths = []
+    for path in paths:
+        if Path(path).is_dir():
+            pdf_paths.extend(sorted(str(p) for p in Path(path).glob("*.pdf")))
+        else:
+            pdf_paths.append(str(path))
+    return pdf_paths
+
+class StreamingPDFIngestor:
+    """Parallel PDF ingestion that streams pages through chunking and embedding
+    
+    Page ranges are parsed in a process pool. At most max_pending_tasks ranges are
+    in flight, and new ranges are only submitted once parsed pages have been
+    chunked, embedded and inserted, so buffered pages stay bounded by
+    max_pending_tasks * pages_per_task regardless of document size. Streaming
+    only bounds the parse and embed stage: nodes accumulate in the in-memory
+    vector store, which is persisted once at the end (a full rewrite of the
+    store, so never per batch). PDFs whose content is already in the index are
+    skipped, so re-running an ingest never duplicates their nodes.
+    """
+    
+    def __init__(
+        self,
+        index: Optional[VectorStoreIndex] = None,
+        persist_dir: str = config.STORAGE_DIR,
+        num_workers: Optional[int] = None,
+        pages_per_task: int = config.INGEST_PAGES_PER_TASK,
+        max_pending_tasks: Optional[int] = None,
+        embed_batch_size: int = config.INGEST_EMBED_BATCH_SIZE,
+        node_transforms: Optional[List[Callable[[List[BaseNode]], List[BaseNode]]]] = None
+    ):
+        self.index = index
+        self.persist_dir = persist_dir
+        self.num_workers = num_workers or config.INGEST_WORKERS or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_pending_tasks = max_pending_tasks or 2 * self.num_workers
+        self.embed_batch_size = embed_batch_size
+        self.node_transforms = node_transforms or []
+        self.node_parser = SentenceSplitter()
+        self.stats = {"pages": 0, "nodes": 0, "batches": 0, "persists": 0, "first_nodes_seconds": None, "skipped_files": []}
+        self._pending_nodes: List[BaseNode] = []
+        self._started_at = 0.0
+        self._file_hashes: Dict[str, str] = {}
+    
+    def _page_tasks(self, file_paths: List[str]) -> Iterator[Tuple[str, int, int]]:
+        for file_path in file_paths:
+            num_pages = _count_pages(file_path)
+            for start in range(0, num_pages, self.pages_per_task):
+                yield file_path, start, start + self.pages_per_task
+    
+    def ingest(
+        self,
+        paths: Sequence[str],
+        on_batch: Optional[Callable[[List[BaseNode]], None]] = None
+    ) -> VectorStoreIndex:
+        """Ingest PDFs (or directories of PDFs) not yet in the index and persist it"""
+        self._started_at = time.perf_counter()
+        if self.index is None:
+            self.index = VectorStoreIndex(nodes=[], storage_context=StorageContext.from_defaults())
+        
+        nodes = self.index.docstore.docs.values()
+        indexed_hashes = {node.metadata["file_sha256"] for node in nodes if "file_sha256" in node.metadata}
+        # Nodes ingested before content hashes were recorded are matched by resolved path
+        indexed_paths = {str(Path(node.metadata["file_path"]).resolve()) for node in nodes if "file_path" in node.metadata}
+        file_paths = []
+        self._file_hashes = {}
+        for file_path in expand_pdf_paths(paths):
+            content_hash = file_sha256(file_path)
+            if content_hash in indexed_hashes or str(Path(file_path).resolve()) in indexed_paths:
+                self.stats["skipped_files"].append(file_path)
+            elif content_hash not in self._file_hashes.values():
+                self._file_hashes[file_path] = content_hash
+                file_paths.append(file_path)
+        if not file_paths:
+            return self.index
+        
+        tasks = self._page_tasks(file_paths)
+        with ProcessPoolExecutor(max_workers=self.num_workers) as pool:
+            pending = set()
+            
+            def submit_next() -> bool:
+                task = next(tasks, None)
+                if task is None:
+                    return False
+                pending.add(pool.submit(_parse_page_range, *task))
+                return True
+            
+            while len(pending) < self.max_pending_tasks and submit_next():
+                pass
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, pages = future.result()
+                    self._add_pages(file_path, pages, on_batch)
+                    submit_next()
+        
+        self._flush(on_batch)
+        self._persist()
+        return self.index
+    
+    def _add_pages(self, file_path: str, pages: List[Tuple[int, str, str]], on_batch):
+        documents = [
+            Document(
+                text=text,
+                metadata={
+                    "page_label": page_label,
+                    "file_name": Path(file_path).name,
+                    "file_path": file_path,
+                    "file_sha256": self._file_hashes[file_path]
+                },
+                excluded_embed_metadata_keys=["file_sha256"],
+                excluded_llm_metadata_keys=["file_sha256"]
+            )
+            for page_number, page_label, text in pages
+            if text.strip()
+        ]
+        self.stats["pages"] += len(pages)
+        self._pending_nodes.extend(self.node_parser.get_nodes_from_documents(documents))
+        
+        while len(self._pending_nodes) >= self.embed_batch_size:
+            batch = self._pending_nodes[:self.embed_batch_size]
+            self._pending_nodes = self._pending_nodes[self.embed_batch_size:]
+            self._insert_batch(batch, on_batch)
+    
+    def _flush(self, on_batch):
+        if self._pending_nodes:
+            batch, self._pending_nodes = self._pending_nodes, []
+            self._insert_batch(batch, on_batch)
+    
+    def _insert_batch(self, nodes: List[BaseNode], on_batch):
+        for transform in self.node_transforms:
+            nodes = transform(nodes)
+        
+        embeddings = Settings.embed_model.get_text_embedding_batch(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        )
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        self.index.insert_nodes(nodes)
+        
+        self.stats["nodes"] += len(nodes)
+        self.stats["batches"] += 1
+        if self.stats["batches"] == 1:
+            self.stats["first_nodes_seconds"] = round(time.perf_counter() - self._started_at, 3)
+        
+        if on_batch:
+            on_batch(nodes)
+    
+    def _persist(self):
+        embedding_dict = self.index.vector_store.data.embedding_dict
+        if len(embedding_dict) < len(self.index.docstore.docs):
+            # A serving copy whose float lists were dropped for a vector backend
+            raise RuntimeError(
+                f"Refusing to persist {len(self.index.docstore.docs)} nodes with only "
+                f"{len(embedding_dict)} embeddings; ingest into a freshly loaded index"
+            )
+        Path(self.persist_dir).mkdir(parents=True, exist_ok=True)
+        self.index.storage_context.persist(persist_dir=self.persist_dir)
+        self.stats["persists"] += 1
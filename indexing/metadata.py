@@ -0,0 +1,158 @@
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from llama_index.core.schema import BaseNode
+from tools.financial_extractor import FinancialMetricsExtractor
+import config
+
+METADATA_INDEX_FILE = "metadata_index.json"
+INDEXED_FIELDS = ("segments", "fiscal_years", "content_type", "section", "page_label")
+# Query-derived filters, relaxed from the end of the list when too few nodes match
+QUERY_FILTER_FIELDS = ("segments", "fiscal_years", "content_type")
+
+HEADING_PATTERN = re.compile(r"^(?:ITEM\s+\d+[A-Z]?\.?\s+\S.*|NOTE\s+\d+\.?\s+\S.*|[A-Z][A-Z0-9&,'\-\. ]{3,79})$")
+NUMERIC_TOKEN_PATTERN = re.compile(r"^[\$\(\-]*\d[\d,\.]*%?\)?$")
+
+def find_section_heading(text: str) -> Optional[str]:
+    """First heading-like line: 10-K item/note titles or short all-caps lines"""
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) <= 80 and HEADING_PATTERN.match(line) and sum(c.isalpha() for c in line) >= 4:
+            return line
+    return None
+
+def classify_content(text: str) -> str:
+    tokens = text.split()
+    if not tokens:
+        return "narrative"
+    numeric = sum(1 for token in tokens if NUMERIC_TOKEN_PATTERN.match(token))
+    return "table" if numeric / len(tokens) >= 0.3 else "narrative"
+
+def tag_nodes(nodes: List[BaseNode]) -> List[BaseNode]:
+    """Ingest-time node transform adding section, fiscal_years, segments and content_type
+    
+    Nodes without a heading of their own inherit the last heading seen on the
+    same page of the same file.
+    """
+    last_heading: Dict[tuple, str] = {}
+    for node in nodes:
+        text = node.get_content()
+        page_key = (node.metadata.get("file_name"), node.metadata.get("page_label"))
+        heading = find_section_heading(text) or last_heading.get(page_key, "")
+        last_heading[page_key] = heading
+        
+        mentions = FinancialMetricsExtractor.find_entity_mentions(text)
+        node.metadata["section"] = heading
+        node.metadata["segments"] = sorted({m["value"] for m in mentions if m["type"] == "segment"})
+        node.metadata["fiscal_years"] = sorted({m["value"] for m in mentions if m["type"] == "year"})
+        node.metadata["content_type"] = classify_content(text)
+        
+        # Tags drive filtering only; keep them out of the embedded and LLM-visible text
+        for key in ("segments", "fiscal_years", "content_type"):
+            if key not in node.excluded_llm_metadata_keys:
+                node.excluded_llm_metadata_keys.append(key)
+        for key in ("section", "segments", "fiscal_years", "content_type"):
+            if key not in node.excluded_embed_metadata_keys:
+                node.excluded_embed_metadata_keys.append(key)
+    return nodes
+
+class MetadataIndex:
+    """Inverted index from node metadata values to node IDs
+    
+    Used to shrink the candidate set before vector scoring: filters are AND
+    across fields and OR within a field.
+    """
+    
+    def __init__(self, postings: Optional[Dict[str, Dict[str, List[str]]]] = None, num_nodes: int = 0):
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        for field, values in (postings or {}).items():
+            self.postings[field] = {value: set(node_ids) for value, node_ids in values.items()}
+        self.num_nodes = num_nodes
+    
+    def add_nodes(self, nodes: Iterable[BaseNode]):
+        for node in nodes:
+            self.num_nodes += 1
+            for field in INDEXED_FIELDS:
+                values = node.metadata.get(field)
+                if values in (None, ""):
+                    continue
+                for value in values if isinstance(values, list) else [values]:
+                    self.postings[field].setdefault(str(value), set()).add(node.node_id)
+    
+    @classmethod
+    def from_docstore(cls, docstore) -> "MetadataIndex":
+        """Index every docstore node, tagging nodes ingested before tagging existed"""
+        nodes = list(docstore.docs.values())
+        tag_nodes([node for node in nodes if "content_type" not in node.metadata])
+        metadata_index = cls()
+        metadata_index.add_nodes(nodes)
+        return metadata_index
+    
+    def match(self, filters: Dict[str, List[str]]) -> Optional[Set[str]]:
+        """Node IDs matching every field filter, or None when there are no filters"""
+        matched = None
+        for field, values in filters.items():
+            field_postings = self.postings.get(field, {})
+            node_ids = set().union(*(field_postings.get(value, set()) for value in values))
+            matched = node_ids if matched is None else matched & node_ids
+        return matched
+    
+    def filters_for_query(self, query: str) -> Dict[str, List[str]]:
+        mentions = FinancialMetricsExtractor.find_entity_mentions(query)
+        filters = {
+            "segments": sorted({m["value"] for m in mentions if m["type"] == "segment"}),
+            "fiscal_years": sorted({m["value"] for m in mentions if m["type"] == "year"}),
+            "content_type": ["table"] if re.search(r"\btables?\b", query, re.IGNORECASE) else []
+        }
+        return {field: filters[field] for field in QUERY_FILTER_FIELDS if filters[field]}
+    
+    def candidate_node_ids(
+        self,
+        query: str,
+        min_candidates: int = config.METADATA_FILTER_MIN_CANDIDATES
+    ) -> Optional[Dict[str, Any]]:
+        """Pre-filter for a sub-query: {"node_ids", "filters"}, or None to search everything
+        
+        When fewer than min_candidates nodes match, the last filter field is
+        dropped and the match retried, so over-specific queries still retrieve.
+        """
+        filters = self.filters_for_query(query)
+        while filters:
+            matched = self.match(filters)
+            if len(matched) >= min_candidates:
+                if len(matched) >= self.num_nodes:
+                    return None
+                return {"node_ids": sorted(matched), "filters": filters}
+            filters.pop(list(filters)[-1])
+        return None
+    
+    def save(self, persist_dir: str):
+        persist_path = Path(persist_dir)
+        persist_path.mkdir(parents=True, exist_ok=True)
+        with open(persist_path / METADATA_INDEX_FILE, 'w') as f:
+            json.dump({
+                "num_nodes": self.num_nodes,
+                "postings": {
+                    field: {value: sorted(node_ids) for value, node_ids in values.items()}
+                    for field, values in self.postings.items()
+                }
+            }, f)
+    
+    @classmethod
+    def load(cls, persist_dir: str) -> "MetadataIndex":
+        with open(Path(persist_dir) / METADATA_INDEX_FILE, 'r') as f:
+            data = json.load(f)
+        return cls(data["postings"], data["num_nodes"])
+
+def load_or_build_metadata_index(docstore, persist_dir: str) -> MetadataIndex:
+    """Load the persisted metadata index, rebuilding it if missing or stale"""
+    index_path = Path(persist_dir) / METADATA_INDEX_FILE
+    if index_path.exists():
+        metadata_index = MetadataIndex.load(persist_dir)
+        if metadata_index.num_nodes == len(docstore.docs):
+            return metadata_index
+    
+    metadata_index = MetadataIndex.from_docstore(docstore)
+    metadata_index.save(persist_dir)
+    return metadata_index
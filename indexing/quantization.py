@@ -0,0 +1,202 @@
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .clustering import assign_clusters, kmeans
+from .vector_backends import (
+    DenseVectorBackend,
+    _read_manifest,
+    _write_manifest,
+    export_embeddings,
+    normalize_rows,
+    save_array,
+    top_k_indices
+)
+import config
+
+SCORING_BLOCK_ROWS = 1024
+
+class Int8Quantizer:
+    """Symmetric per-vector int8 scalar quantization (4x smaller than float32)"""
+    
+    def encode(self, embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.clip(np.rint(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    
+    def scores(self, codes: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Approximate dot products, decoding SCORING_BLOCK_ROWS rows at a time"""
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORING_BLOCK_ROWS):
+            block = codes[start:start + SCORING_BLOCK_ROWS].astype(np.float32)
+            scores[start:start + SCORING_BLOCK_ROWS] = (block @ query) * scales[start:start + SCORING_BLOCK_ROWS]
+        return scores
+
+class ProductQuantizer:
+    """Product quantization: each vector becomes num_subspaces one-byte centroid IDs"""
+    
+    def __init__(self, num_subspaces: int = config.PQ_SUBSPACES, num_centroids: int = 256):
+        self.num_subspaces = num_subspaces
+        self.num_centroids = num_centroids
+        self.codebooks: Optional[np.ndarray] = None
+    
+    def _split(self, dim: int) -> List[Tuple[int, int]]:
+        bounds = np.linspace(0, dim, self.num_subspaces + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+    
+    def train(self, embeddings: np.ndarray, sample_size: int = 20000) -> "ProductQuantizer":
+        self.num_subspaces = min(self.num_subspaces, embeddings.shape[1])
+        subspaces = self._split(embeddings.shape[1])
+        sub_dim = max(end - start for start, end in subspaces)
+        num_centroids = min(self.num_centroids, len(embeddings))
+        self.codebooks = np.zeros((len(subspaces), num_centroids, sub_dim), dtype=np.float32)
+        for subspace, (start, end) in enumerate(subspaces):
+            centroids, _ = kmeans(embeddings[:, start:end], num_centroids, iterations=15, seed=subspace, sample_size=sample_size)
+            self.codebooks[subspace, :len(centroids), :end - start] = centroids
+        return self
+    
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(embeddings), len(self.codebooks)), dtype=np.uint8)
+        for subspace, (start, end) in enumerate(self._split(embeddings.shape[1])):
+            codebook = self.codebooks[subspace, :, :end - start]
+            codes[:, subspace] = assign_clusters(embeddings[:, start:end], codebook)
+        return codes
+    
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Asymmetric scoring: one (subspaces x centroids) lookup table per query"""
+        lookup = np.stack([
+            self.codebooks[subspace, :, :end - start] @ query[start:end]
+            for subspace, (start, end) in enumerate(self._split(len(query)))
+        ])
+        subspace_index = np.arange(len(lookup))
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORING_BLOCK_ROWS):
+            block = codes[start:start + SCORING_BLOCK_ROWS]
+            scores[start:start + SCORING_BLOCK_ROWS] = lookup[subspace_index, block].sum(axis=1)
+        return scores
+
+class QuantizedVectorBackend(DenseVectorBackend):
+    """Shortlist candidates on compressed vectors, then re-rank them exactly
+    
+    Only the compressed codes are held in memory. The full-precision matrix is
+    memory-mapped from disk and just the shortlisted rows are read for the
+    exact re-ranking.
+    """
+    
+    def __init__(
+        self,
+        node_ids: Sequence[str],
+        embeddings: np.ndarray,
+        mode: str = "int8",
+        rerank_candidates: int = config.QUANTIZATION_RERANK_CANDIDATES,
+        codes: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        codebooks: Optional[np.ndarray] = None,
+        num_subspaces: int = config.PQ_SUBSPACES
+    ):
+        super().__init__(node_ids, embeddings)
+        self.name = mode
+        self.mode = mode
+        self.rerank_candidates = rerank_candidates
+        self.scales = scales
+        
+        if mode == "int8":
+            self.quantizer = Int8Quantizer()
+            if codes is None and len(embeddings):
+                codes, self.scales = self.quantizer.encode(np.asarray(embeddings))
+        else:
+            self.quantizer = ProductQuantizer(num_subspaces=num_subspaces)
+            if codebooks is not None:
+                self.quantizer.codebooks = codebooks
+            elif len(embeddings):
+                self.quantizer.train(np.asarray(embeddings))
+            if codes is None and len(embeddings):
+                codes = self.quantizer.encode(np.asarray(embeddings))
+        self.codes = codes
+    
+    @property
+    def memory_bytes(self) -> int:
+        """In-memory footprint of the compressed representation"""
+        total = self.codes.nbytes if self.codes is not None else 0
+        if self.scales is not None:
+            total += self.scales.nbytes
+        if self.mode == "pq" and self.quantizer.codebooks is not None:
+            total += self.quantizer.codebooks.nbytes
+        return total
+    
+    def approximate_scores(self, query: np.ndarray, candidate_rows: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = self.codes if candidate_rows is None else self.codes[candidate_rows]
+        if self.mode == "int8":
+            scales = self.scales if candidate_rows is None else self.scales[candidate_rows]
+            return self.quantizer.scores(codes, scales, query)
+        return self.quantizer.scores(codes, query)
+    
+    def add(self, node_ids: Sequence[str], embeddings: np.ndarray):
+        """Append new nodes, encoding them with the existing quantizer"""
+        embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if self.mode == "int8":
+            codes, scales = self.quantizer.encode(embeddings)
+            self.scales = np.concatenate([self.scales, scales]) if self.scales is not None else scales
+        else:
+            if self.quantizer.codebooks is None:
+                self.quantizer.train(embeddings)
+            codes = self.quantizer.encode(embeddings)
+        self.codes = np.concatenate([self.codes, codes]) if self.codes is not None else codes
+        super().add(node_ids, embeddings)
+    
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        candidate_rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        if not len(self.node_ids):
+            return []
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        approximate = self.approximate_scores(query, candidate_rows)
+        shortlist = top_k_indices(approximate, max(top_k, self.rerank_candidates))
+        rows = shortlist if candidate_rows is None else candidate_rows[shortlist]
+        
+        # Sorted row order keeps the reads from the memory-mapped matrix sequential
+        rows = np.sort(rows)
+        exact = np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+        best = top_k_indices(exact, top_k)
+        return [(self.node_ids[rows[i]], float(exact[i])) for i in best]
+    
+    @classmethod
+    def from_index(cls, index, mode: str = "int8", **params) -> "QuantizedVectorBackend":
+        node_ids, embeddings = export_embeddings(index)
+        return cls(node_ids, embeddings, mode=mode, **params)
+    
+    def save(self, persist_dir: str):
+        persist_path = Path(persist_dir)
+        persist_path.mkdir(parents=True, exist_ok=True)
+        save_array(persist_path / "embeddings.npy", self.embeddings)
+        save_array(persist_path / "quantized_codes.npy", self.codes)
+        if self.scales is not None:
+            save_array(persist_path / "quantized_scales.npy", self.scales)
+        if self.mode == "pq":
+            save_array(persist_path / "pq_codebooks.npy", self.quantizer.codebooks)
+        _write_manifest(persist_path, self.name, self.node_ids, {
+            "mode": self.mode,
+            "rerank_candidates": self.rerank_candidates,
+            "num_subspaces": self.quantizer.num_subspaces if self.mode == "pq" else None
+        })
+    
+    @classmethod
+    def load(cls, persist_dir: str, mmap: bool = True) -> "QuantizedVectorBackend":
+        persist_path = Path(persist_dir)
+        manifest = _read_manifest(persist_path)
+        params = manifest["params"]
+        mode = params["mode"]
+        scales_path = persist_path / "quantized_scales.npy"
+        return cls(
+            manifest["node_ids"],
+            np.load(persist_path / "embeddings.npy", mmap_mode="r" if mmap else None),
+            mode=mode,
+            rerank_candidates=params["rerank_candidates"],
+            codes=np.load(persist_path / "quantized_codes.npy"),
+            scales=np.load(scales_path) if scales_path.exists() else None,
+            codebooks=np.load(persist_path / "pq_codebooks.npy") if mode == "pq" else None,
+            num_subspaces=params.get("num_subspaces") or config.PQ_SUBSPACES
+        )
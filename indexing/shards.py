@@ -0,0 +1,267 @@
+import asyncio
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from llama_index.core import Settings
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle
+from tools.financial_extractor import FinancialMetricsExtractor
+import config
+
+CATALOG_FILE = "catalog.json"
+
+def shard_id_for(company: str, fiscal_year: int) -> str:
+    return f"{re.sub(r'[^a-z0-9]+', '_', company.lower()).strip('_')}_{fiscal_year}"
+
+class ShardCatalog:
+    """Shards of the corpus (one per company and fiscal year) and the entities they cover
+    
+    Each entry records the shard's persist directory, company, fiscal year,
+    the range of years its filing reports on and the segments it mentions.
+    """
+    
+    def __init__(self, corpus_dir: str = config.CORPUS_DIR):
+        self.corpus_dir = Path(corpus_dir)
+        self.shards: Dict[str, Dict[str, Any]] = {}
+        catalog_path = self.corpus_dir / CATALOG_FILE
+        if catalog_path.exists():
+            with open(catalog_path, 'r') as f:
+                self.shards = {shard["shard_id"]: shard for shard in json.load(f)["shards"]}
+    
+    @property
+    def companies(self) -> List[str]:
+        return sorted({shard["company"] for shard in self.shards.values()})
+    
+    def register(self, company: str, fiscal_year: int, num_nodes: int, segments: List[str], source_paths: List[str]) -> Dict[str, Any]:
+        shard_id = shard_id_for(company, fiscal_year)
+        previous = self.shards.get(shard_id, {})
+        self.shards[shard_id] = {
+            "shard_id": shard_id,
+            "company": company,
+            "fiscal_year": fiscal_year,
+            "years": [fiscal_year - config.FILING_YEARS_COVERED + 1, fiscal_year],
+            "persist_dir": str(self.corpus_dir / shard_id),
+            "num_nodes": num_nodes,
+            "segments": sorted(set(previous.get("segments", [])) | set(segments)),
+            "source_paths": sorted(set(previous.get("source_paths", [])) | set(source_paths))
+        }
+        return self.shards[shard_id]
+    
+    def save(self):
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.corpus_dir / CATALOG_FILE, 'w') as f:
+            json.dump({"shards": sorted(self.shards.values(), key=lambda shard: shard["shard_id"])}, f, indent=2)
+    
+    def companies_in(self, text: str) -> List[str]:
+        mentions = FinancialMetricsExtractor.find_entity_mentions(text, self.companies)
+        return sorted({m["value"] for m in mentions if m["type"] == "company"})
+    
+    def route(self, query: str, default_companies: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Shards relevant to a query
+        
+        Companies named in the query narrow the shards to those issuers, falling
+        back to default_companies (e.g. those named in the user's original
+        question) and then to every issuer. For each requested year the shard of that fiscal year
+        is used, or else the earliest filing that reports on it; without years
+        only each company's latest filing is searched.
+        """
+        mentions = FinancialMetricsExtractor.find_entity_mentions(query, self.companies)
+        companies = {m["value"] for m in mentions if m["type"] == "company"} or set(default_companies or self.companies)
+        years = {int(m["value"]) for m in mentions if m["type"] == "year"}
+        
+        selected = {}
+        for company in companies:
+            company_shards = sorted(
+                (shard for shard in self.shards.values() if shard["company"] == company),
+                key=lambda shard: shard["fiscal_year"]
+            )
+            if not company_shards:
+                continue
+            if not years:
+                selected[company_shards[-1]["shard_id"]] = company_shards[-1]
+                continue
+            for year in years:
+                covering = [shard for shard in company_shards if shard["years"][0] <= year <= shard["years"][1]]
+                exact = [shard for shard in covering if shard["fiscal_year"] == year]
+                for shard in (exact or covering)[:1]:
+                    selected[shard["shard_id"]] = shard
+        return sorted(selected.values(), key=lambda shard: shard["shard_id"])
+
+class LoadedShard:
+    def __init__(self, entry: Dict[str, Any]):
+        from llama_index.core import StorageContext, load_index_from_storage
+        from .metadata import load_or_build_metadata_index
+        
+        self.entry = entry
+        persist_dir = entry["persist_dir"]
+        self.index = load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir))
+        self.metadata_index = load_or_build_metadata_index(self.index.docstore, persist_dir) if config.METADATA_FILTERING else None
+        self.vector_backend = None
+        if config.VECTOR_BACKEND != "simple":
+            from .vector_backends import load_or_build_vector_backend
+            self.vector_backend = load_or_build_vector_backend(config.VECTOR_BACKEND, self.index, persist_dir)
+            self.index.vector_store.data.embedding_dict.clear()
+    
+    @property
+    def num_nodes(self) -> int:
+        return self.entry["num_nodes"]
+    
+    def create_retriever(self, similarity_top_k: int, query: str):
+        candidates = self.metadata_index.candidate_node_ids(query) if self.metadata_index else None
+        node_ids = candidates["node_ids"] if candidates else None
+        if self.vector_backend is not None:
+            from .vector_backends import VectorBackendRetriever
+            return VectorBackendRetriever(self.vector_backend, self.index.docstore, similarity_top_k, node_ids=node_ids)
+        from llama_index.core.indices.vector_store.retrievers import VectorIndexRetriever
+        return VectorIndexRetriever(self.index, similarity_top_k=similarity_top_k, node_ids=node_ids)
+
+class ShardManager:
+    """Loads shards on first use and evicts the least recently used ones
+    
+    At most max_loaded_shards shards (and max_loaded_nodes nodes across them)
+    stay in memory; the shard being loaded is never evicted.
+    """
+    
+    def __init__(
+        self,
+        catalog: ShardCatalog,
+        max_loaded_shards: int = config.SHARD_CACHE_SIZE,
+        max_loaded_nodes: int = config.SHARD_CACHE_MAX_NODES
+    ):
+        self.catalog = catalog
+        self.max_loaded_shards = max_loaded_shards
+        self.max_loaded_nodes = max_loaded_nodes
+        self._loaded: "OrderedDict[str, LoadedShard]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+    
+    def get(self, shard_id: str) -> LoadedShard:
+        with self._lock:
+            shard = self._loaded.get(shard_id)
+            if shard is not None:
+                self._loaded.move_to_end(shard_id)
+                return shard
+            
+            shard = LoadedShard(self.catalog.shards[shard_id])
+            self._loaded[shard_id] = shard
+            self.loads += 1
+            while len(self._loaded) > 1 and (
+                len(self._loaded) > self.max_loaded_shards
+                or sum(loaded.num_nodes for loaded in self._loaded.values()) > self.max_loaded_nodes
+            ):
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+            return shard
+    
+    def evict(self, shard_id: str):
+        with self._lock:
+            self._loaded.pop(shard_id, None)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": len(self.catalog.shards),
+            "loaded": list(self._loaded),
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+    
+    def as_retriever(self, similarity_top_k: int = 5, route_context: str = "") -> "ShardedRetriever":
+        return ShardedRetriever(self, similarity_top_k, route_context=route_context)
+
+class ShardedRetriever(BaseRetriever):
+    """Routes a query to the relevant shards, searches them in parallel and merges by score
+    
+    route_context supplies the companies to use when a (sub-)query names none.
+    """
+    
+    def __init__(
+        self,
+        shard_manager: ShardManager,
+        similarity_top_k: int = 5,
+        route_context: str = "",
+        embed_model=None,
+        **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self._shard_manager = shard_manager
+        self._similarity_top_k = similarity_top_k
+        self._default_companies = shard_manager.catalog.companies_in(route_context) if route_context else None
+        self._embed_model = embed_model or Settings.embed_model
+        self.last_routed: List[str] = []
+    
+    def _route(self, query_bundle: QueryBundle) -> List[LoadedShard]:
+        entries = self._shard_manager.catalog.route(query_bundle.query_str, self._default_companies)
+        self.last_routed = [entry["shard_id"] for entry in entries]
+        return [self._shard_manager.get(entry["shard_id"]) for entry in entries]
+    
+    def _merge(self, per_shard: List[List[NodeWithScore]]) -> List[NodeWithScore]:
+        merged = [node for nodes in per_shard for node in nodes]
+        merged.sort(key=lambda node: node.score or 0.0, reverse=True)
+        return merged[:self._similarity_top_k]
+    
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        shards = self._route(query_bundle)
+        if not shards:
+            return []
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            per_shard = list(pool.map(
+                lambda shard: shard.create_retriever(self._similarity_top_k, query_bundle.query_str).retrieve(query_bundle),
+                shards
+            ))
+        return self._merge(per_shard)
+    
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        shards = await asyncio.to_thread(self._route, query_bundle)
+        per_shard = await asyncio.gather(*[
+            shard.create_retriever(self._similarity_top_k, query_bundle.query_str).aretrieve(query_bundle)
+            for shard in shards
+        ])
+        return self._merge(per_shard)
+
+def ingest_shard(
+    catalog: ShardCatalog,
+    company: str,
+    fiscal_year: int,
+    paths: List[str],
+    on_batch=None
+) -> Dict[str, Any]:
+    """Stream filings into the company/year shard and record it in the catalog"""
+    from llama_index.core import StorageContext, load_index_from_storage
+    from .ingestion import StreamingPDFIngestor
+    from .metadata import load_or_build_metadata_index, tag_nodes
+    
+    persist_dir = catalog.corpus_dir / shard_id_for(company, fiscal_year)
+    index = None
+    if (persist_dir / "docstore.json").exists():
+        index = load_index_from_storage(StorageContext.from_defaults(persist_dir=str(persist_dir)))
+    
+    def tag_company(nodes: List[BaseNode]) -> List[BaseNode]:
+        for node in nodes:
+            node.metadata["company"] = company
+            node.metadata["fiscal_year"] = fiscal_year
+            if "fiscal_year" not in node.excluded_embed_metadata_keys:
+                node.excluded_embed_metadata_keys.append("fiscal_year")
+        return nodes
+    
+    ingestor = StreamingPDFIngestor(index=index, persist_dir=str(persist_dir), node_transforms=[tag_nodes, tag_company])
+    index = ingestor.ingest(paths, on_batch=on_batch)
+    
+    metadata_index = load_or_build_metadata_index(index.docstore, str(persist_dir))
+    entry = catalog.register(
+        company,
+        fiscal_year,
+        num_nodes=len(index.docstore.docs),
+        segments=list(metadata_index.postings["segments"]),
+        source_paths=[str(path) for path in paths]
+    )
+    catalog.save()
+    return {**ingestor.stats, "shard_id": entry["shard_id"]}
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from llama_index.core.schema import BaseNode
+from tools.financial_extractor import FinancialMetricsExtractor
+from .clustering import kmeans
+from .vector_backends import export_embeddings, normalize_rows, save_array
+import config
+
+SUMMARY_TREE_FILE = "summary_tree.json"
+SUMMARY_EMBEDDINGS_FILE = "summary_tree_embeddings.npy"
+OVERVIEW_PATTERN = re.compile(
+    r"\b(?:overview|overall|summar(?:y|ize|ise)|highlights?|big picture|key (?:themes|takeaways|points)"
+    r"|performance|outlook|strategy|how did \w+(?:'s)? (?:do|perform))\b",
+    re.IGNORECASE
+)
+
+def is_broad_query(query: str) -> bool:
+    """Overview-style question naming no metric: answerable from summaries rather than figures"""
+    if not OVERVIEW_PATTERN.search(query):
+        return False
+    return not names_metric(query)
+
+def names_metric(text: str) -> bool:
+    return any(m["type"] == "metric" for m in FinancialMetricsExtractor.find_entity_mentions(text))
+
+def summary_key(kind: str, child_keys: Sequence[str]) -> str:
+    """Content key of a summary: the same children always give the same key, so rebuilds reuse it"""
+    return hashlib.sha1("\n".join([kind, *child_keys]).encode()).hexdigest()[:16]
+
+def section_groups(nodes: List[BaseNode], min_chunks: int = config.SUMMARY_TREE_MIN_SECTION_CHUNKS) -> List[Dict[str, Any]]:
+    """Consecutive nodes of one file grouped by the section they were tagged with
+    
+    Nodes without a section continue the previous group (tag_nodes only carries
+    headings within a page), and groups of fewer than min_chunks nodes are
+    merged into the next group of the same file.
+    """
+    groups: List[Dict[str, Any]] = []
+    for node in nodes:
+        file_name = node.metadata.get("file_name", "")
+        section = node.metadata.get("section", "")
+        previous = groups[-1] if groups else None
+        if previous and previous["file_name"] == file_name and (not section or section == previous["headings"][-1]):
+            previous["nodes"].append(node)
+        elif previous and previous["file_name"] == file_name and len(previous["nodes"]) < min_chunks:
+            previous["nodes"].append(node)
+            previous["headings"].append(section)
+        else:
+            groups.append({"file_name": file_name, "headings": [section], "nodes": [node]})
+    for group in groups:
+        group["section"] = " / ".join(heading for heading in dict.fromkeys(group["headings"]) if heading)[:120]
+    return groups
+
+class SummaryTree:
+    """Hierarchical summaries over the indexed chunks, persisted beside the docstore
+    
+    Chunks are grouped by section and clustered by embedding within each
+    section; every cluster is summarized, the cluster summaries of a section
+    are rolled up into a section summary, and section summaries are rolled up
+    SUMMARY_TREE_FANOUT at a time until one document summary per file remains.
+    Summaries are keyed by their children, so a rebuild after ingesting more
+    pages only summarizes what changed.
+    """
+    
+    def __init__(self, nodes: Optional[List[Dict[str, Any]]] = None, embeddings: Optional[np.ndarray] = None, num_leaves: int = 0):
+        self.nodes = nodes or []
+        self.embeddings = embeddings if embeddings is not None else np.zeros((0, 0), dtype=np.float32)
+        self.num_leaves = num_leaves
+        self._parent = {child: node["id"] for node in self.nodes for child in node["children"]}
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    @property
+    def levels(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for node in self.nodes:
+            counts[node["kind"]] = counts.get(node["kind"], 0) + 1
+        return counts
+    
+    @classmethod
+    def build(
+        cls,
+        index,
+        llm,
+        embed_model,
+        vector_backend=None,
+        previous: Optional["SummaryTree"] = None
+    ) -> "SummaryTree":
+        """Summarize the index's nodes, reusing summaries from a previous tree whose children are unchanged"""
+        docstore = index.docstore
+        if vector_backend is not None:
+            leaf_ids, leaf_embeddings = vector_backend.node_ids, vector_backend.embeddings
+        else:
+            leaf_ids, leaf_embeddings = export_embeddings(index)
+        row_by_id = {node_id: row for row, node_id in enumerate(leaf_ids)}
+        leaves = [node for node in docstore.docs.values() if node.node_id in row_by_id]
+        
+        reusable = {node["key"]: (node, previous.embeddings[row]) for row, node in enumerate(previous.nodes)} if previous else {}
+        builder = _TreeBuilder(llm, reusable)
+        
+        sections = []
+        for group in section_groups(leaves):
+            members = group["nodes"]
+            num_clusters = math.ceil(len(members) / config.SUMMARY_TREE_CLUSTER_SIZE)
+            if num_clusters > 1:
+                _, assignments = kmeans(np.asarray(leaf_embeddings[[row_by_id[node.node_id] for node in members]]), num_clusters)
+                clusters = [[node for node, cluster in zip(members, assignments) if cluster == label] for label in dict.fromkeys(assignments)]
+            else:
+                clusters = [members]
+            kind = "cluster" if len(clusters) > 1 else "section"
+            children = [
+                builder.add(kind, group["file_name"], group["section"], [node.node_id for node in cluster], [node.get_content() for node in cluster])
+                for cluster in clusters
+            ]
+            sections.append((group, children))
+        builder.summarize_pending()
+        
+        rollups = []
+        for group, children in sections:
+            if len(children) > 1:
+                children = [builder.add("section", group["file_name"], group["section"], children)]
+            rollups.extend(children)
+        builder.summarize_pending()
+        
+        for file_name in dict.fromkeys(builder.nodes[key]["file_name"] for key in rollups):
+            level = [key for key in rollups if builder.nodes[key]["file_name"] == file_name]
+            while len(level) > 1:
+                kind = "document" if len(level) <= config.SUMMARY_TREE_FANOUT else "rollup"
+                level = [
+                    builder.add(kind, file_name, "", level[start:start + config.SUMMARY_TREE_FANOUT])
+                    for start in range(0, len(level), config.SUMMARY_TREE_FANOUT)
+                ]
+                builder.summarize_pending()
+            if builder.nodes[level[0]]["kind"] != "document":
+                # A file with a single section: its section summary is the document summary
+                builder.nodes[level[0]]["kind"] = "document"
+        
+        nodes = list(builder.nodes.values())
+        embeddings = builder.embed(embed_model, nodes)
+        return cls(nodes, embeddings, num_leaves=len(docstore.docs))
+    
+    def search(self, query_embedding, top_k: int = config.SUMMARY_TREE_TOP_K) -> List[Dict[str, Any]]:
+        """The best matching document summary plus the best section/cluster summaries below it
+        
+        A summary is skipped when an ancestor or descendant (other than the
+        document summary) was already picked, so the results do not restate
+        each other.
+        """
+        if not self.nodes or top_k <= 0:
+            return []
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        scores = np.asarray(self.embeddings, dtype=np.float32) @ (vector / (np.linalg.norm(vector) or 1.0))
+        order = np.argsort(-scores, kind="stable")
+        
+        selected: List[int] = []
+        blocked = set()
+        root = next((row for row in order if self.nodes[row]["kind"] == "document"), None)
+        if root is not None:
+            selected.append(int(root))
+        for row in order:
+            if len(selected) >= top_k:
+                break
+            node = self.nodes[row]
+            if node["kind"] == "document" or node["id"] in blocked:
+                continue
+            ancestors = self._ancestors(node["id"])
+            if blocked & set(ancestors):
+                continue
+            selected.append(int(row))
+            blocked.add(node["id"])
+            blocked.update(ancestors)
+        
+        return [
+            {
+                "node_id": self.nodes[row]["id"],
+                "text": self.nodes[row]["text"],
+                "score": float(scores[row]),
+                "kind": self.nodes[row]["kind"],
+                "section": self.nodes[row]["section"]
+            }
+            for row in selected
+        ]
+    
+    def _ancestors(self, node_id: str) -> List[str]:
+        """Summaries above node_id, stopping below the document summary"""
+        ancestors = []
+        parent = self._parent.get(node_id)
+        while parent is not None and parent in self._parent:
+            ancestors.append(parent)
+            parent = self._parent.get(parent)
+        return ancestors
+    
+    def save(self, persist_dir: str):
+        persist_path = Path(persist_dir)
+        persist_path.mkdir(parents=True, exist_ok=True)
+        save_array(persist_path / SUMMARY_EMBEDDINGS_FILE, np.asarray(self.embeddings, dtype=np.float32))
+        with open(persist_path / SUMMARY_TREE_FILE, 'w') as f:
+            json.dump({"num_leaves": self.num_leaves, "built_at": datetime.now().isoformat(), "nodes": self.nodes}, f)
+    
+    @classmethod
+    def load(cls, persist_dir: str) -> "SummaryTree":
+        persist_path = Path(persist_dir)
+        with open(persist_path / SUMMARY_TREE_FILE, 'r') as f:
+            data = json.load(f)
+        embeddings = np.load(persist_path / SUMMARY_EMBEDDINGS_FILE, mmap_mode="r")
+        return cls(data["nodes"], embeddings, data["num_leaves"])
+
+class _TreeBuilder:
+    """Collects summary nodes level by level and fills in their text with concurrent LLM calls"""
+    
+    def __init__(self, llm, reusable: Dict[str, tuple]):
+        self.llm = llm
+        self.reusable = reusable
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.reused_embeddings: Dict[str, np.ndarray] = {}
+        self._pending: List[tuple] = []
+    
+    def add(self, kind: str, file_name: str, section: str, children: List[str], texts: Optional[List[str]] = None) -> str:
+        """Register a summary of leaf texts (texts given) or of already added summaries; returns its key"""
+        key = summary_key(kind, children)
+        self.nodes[key] = {
+            "id": f"summary-{key}",
+            "key": key,
+            "kind": kind,
+            "file_name": file_name,
+            "section": section,
+            "children": children if texts is not None else [self.nodes[child]["id"] for child in children],
+            "text": ""
+        }
+        if key in self.reusable:
+            previous, embedding = self.reusable[key]
+            self.nodes[key]["text"] = previous["text"]
+            self.reused_embeddings[key] = embedding
+        else:
+            source_texts = texts if texts is not None else [self.nodes[child]["text"] for child in children]
+            self._pending.append((key, source_texts))
+        return key
+    
+    def summarize_pending(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        
+        def summarize(item):
+            key, source_texts = item
+            node = self.nodes[key]
+            scope = f"{node['kind']} summary of {node['file_name']}" + (f", section: {node['section']}" if node["section"] else "")
+            prompt = config.SUMMARY_TREE_PROMPT.format(
+                scope=scope,
+                text="\n\n".join(source_texts)[:config.SUMMARY_TREE_INPUT_CHARS]
+            )
+            return key, str(self.llm.complete(prompt)).strip()
+        
+        with ThreadPoolExecutor(max_workers=config.SUMMARY_TREE_CONCURRENCY) as executor:
+            for key, text in executor.map(summarize, pending):
+                self.nodes[key]["text"] = text
+    
+    def embed(self, embed_model, nodes: List[Dict[str, Any]]) -> np.ndarray:
+        """Normalized embeddings for nodes in order, embedding only summaries that were not reused"""
+        new_nodes = [node for node in nodes if node["key"] not in self.reused_embeddings]
+        new_embeddings = embed_model.get_text_embedding_batch([node["text"] for node in new_nodes]) if new_nodes else []
+        by_key = dict(self.reused_embeddings)
+        by_key.update({node["key"]: np.asarray(embedding, dtype=np.float32) for node, embedding in zip(new_nodes, new_embeddings)})
+        if not nodes:
+            return np.zeros((0, 0), dtype=np.float32)
+        return normalize_rows(np.stack([np.asarray(by_key[node["key"]], dtype=np.float32) for node in nodes]))
+
+def load_summary_tree(docstore, persist_dir: str) -> Optional[SummaryTree]:
+    """The persisted summary tree, or None when it is missing or older than the docstore"""
+    if not (Path(persist_dir) / SUMMARY_TREE_FILE).exists():
+        return None
+    summary_tree = SummaryTree.load(persist_dir)
+    return summary_tree if summary_tree.num_leaves == len(docstore.docs) else None
+
+def build_summary_tree(index, persist_dir: str, llm, embed_model, vector_backend=None) -> SummaryTree:
+    """Build and persist the summary tree, reusing unchanged summaries of the persisted one"""
+    previous = SummaryTree.load(persist_dir) if (Path(persist_dir) / SUMMARY_TREE_FILE).exists() else None
+    summary_tree = SummaryTree.build(index, llm, embed_model, vector_backend=vector_backend, previous=previous)
+    summary_tree.save(persist_dir)
+    return summary_tree
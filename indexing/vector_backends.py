@@ -0,0 +1,168 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from llama_index.core import Settings
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+BACKEND_MANIFEST = "vector_backend.json"
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first"""
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def save_array(path: Path, array: np.ndarray):
+    """Write via a temporary file so processes mapping the old file keep a consistent view"""
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(temporary_path, path)
+
+def export_embeddings(index, node_ids: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """Copy the embeddings of a simple-store VectorStoreIndex into a float32 matrix"""
+    embedding_dict = index.vector_store.data.embedding_dict
+    node_ids = list(embedding_dict.keys()) if node_ids is None else list(node_ids)
+    if not node_ids:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    matrix = np.asarray([embedding_dict[node_id] for node_id in node_ids], dtype=np.float32)
+    return node_ids, normalize_rows(matrix)
+
+class DenseVectorBackend:
+    """Brute-force cosine search over a (possibly memory-mapped) float32 matrix"""
+    
+    name = "dense"
+    
+    def __init__(self, node_ids: Sequence[str], embeddings: np.ndarray):
+        self.node_ids = list(node_ids)
+        self.embeddings = embeddings
+        self._row_by_id = {node_id: row for row, node_id in enumerate(self.node_ids)}
+    
+    def __len__(self) -> int:
+        return len(self.node_ids)
+    
+    @classmethod
+    def from_index(cls, index, **params) -> "DenseVectorBackend":
+        node_ids, embeddings = export_embeddings(index)
+        return cls(node_ids, embeddings, **params)
+    
+    def rows_for(self, node_ids: Sequence[str]) -> np.ndarray:
+        return np.fromiter(
+            (self._row_by_id[node_id] for node_id in node_ids if node_id in self._row_by_id),
+            dtype=np.int64
+        )
+    
+    def add(self, node_ids: Sequence[str], embeddings: np.ndarray):
+        """Append new nodes (incremental ingestion)"""
+        embeddings = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        first_row = len(self.node_ids)
+        self.embeddings = np.concatenate([np.asarray(self.embeddings), embeddings]) if first_row else embeddings
+        self.node_ids.extend(node_ids)
+        for offset, node_id in enumerate(node_ids):
+            self._row_by_id[node_id] = first_row + offset
+    
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int,
+        candidate_rows: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32))
+        matrix = self.embeddings if candidate_rows is None else self.embeddings[candidate_rows]
+        scores = matrix @ query
+        best = top_k_indices(scores, top_k)
+        rows = best if candidate_rows is None else candidate_rows[best]
+        return [(self.node_ids[row], float(score)) for row, score in zip(rows, scores[best])]
+    
+    def save(self, persist_dir: str):
+        persist_path = Path(persist_dir)
+        persist_path.mkdir(parents=True, exist_ok=True)
+        save_array(persist_path / "embeddings.npy", self.embeddings)
+        _write_manifest(persist_path, self.name, self.node_ids, {})
+    
+    @classmethod
+    def load(cls, persist_dir: str, mmap: bool = True) -> "DenseVectorBackend":
+        persist_path = Path(persist_dir)
+        manifest = _read_manifest(persist_path)
+        embeddings = np.load(persist_path / "embeddings.npy", mmap_mode="r" if mmap else None)
+        return cls(manifest["node_ids"], embeddings)
+
+def _write_manifest(persist_path: Path, name: str, node_ids: List[str], params: Dict[str, Any]):
+    with open(persist_path / BACKEND_MANIFEST, 'w') as f:
+        json.dump({"backend": name, "node_ids": node_ids, "params": params}, f)
+
+def _read_manifest(persist_path: Path) -> Dict[str, Any]:
+    with open(persist_path / BACKEND_MANIFEST, 'r') as f:
+        return json.load(f)
+
+# name -> (module, class, default build params); modules are imported on use
+VECTOR_BACKENDS = {
+    "dense": ("indexing.vector_backends", "DenseVectorBackend", {}),
+    "int8": ("indexing.quantization", "QuantizedVectorBackend", {"mode": "int8"}),
+    "pq": ("indexing.quantization", "QuantizedVectorBackend", {"mode": "pq"}),
+    "ivf": ("indexing.ann", "IVFVectorBackend", {})
+}
+
+def load_or_build_vector_backend(name: str, index, persist_dir: str, **params):
+    """Load the persisted backend beside the docstore, rebuilding it if missing or stale"""
+    from importlib import import_module
+    module_name, class_name, default_params = VECTOR_BACKENDS[name]
+    backend_cls = getattr(import_module(module_name), class_name)
+    params = {**default_params, **params}
+    persist_path = Path(persist_dir)
+    manifest_path = persist_path / BACKEND_MANIFEST
+    
+    if manifest_path.exists():
+        manifest = _read_manifest(persist_path)
+        if manifest.get("backend") == name and len(manifest.get("node_ids", [])) == len(index.index_struct.nodes_dict):
+            return backend_cls.load(persist_dir)
+    
+    backend = backend_cls.from_index(index, **params)
+    backend.save(persist_dir)
+    return backend_cls.load(persist_dir)
+
+class VectorBackendRetriever(BaseRetriever):
+    """Retriever that scores nodes with a vector backend and reads them from the docstore"""
+    
+    def __init__(
+        self,
+        backend,
+        docstore,
+        similarity_top_k: int = 5,
+        node_ids: Optional[List[str]] = None,
+        embed_model=None,
+        **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self._backend = backend
+        self._docstore = docstore
+        self._similarity_top_k = similarity_top_k
+        self._candidate_rows = backend.rows_for(node_ids) if node_ids is not None else None
+        self._embed_model = embed_model or Settings.embed_model
+    
+    def _to_nodes(self, hits: List[Tuple[str, float]]) -> List[NodeWithScore]:
+        return [
+            NodeWithScore(node=self._docstore.get_node(node_id), score=score)
+            for node_id, score in hits
+        ]
+    
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_query_embedding(query_bundle.query_str)
+        hits = self._backend.search(query_bundle.embedding, self._similarity_top_k, self._candidate_rows)
+        return self._to_nodes(hits)
+    
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = await self._embed_model.aget_query_embedding(query_bundle.query_str)
+        hits = self._backend.search(query_bundle.embedding, self._similarity_top_k, self._candidate_rows)
+        return self._to_nodes(hits)
@@ -1,64 +1,416 @@
 import asyncio
-import os
+from collections import OrderedDict
 from pathlib import Path
-from llama_index.core import VectorStoreIndex, SimpleDirectoryReader, Settings
-from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
-from agents.workflow import ResearchWorkflow
-from memory.memory_manager import MemoryManager
-from tools.financial_extractor import create_financial_extractor_tool
-from tools.fact_verifier import create_fact_verifier_tool
-from voice.voice_interface import VoiceInterface
+from typing import Optional
+from profiling import StartupProfiler, startup_profiler
 import config
 
 class ResearchAssistant:
-    """Voice-enabled research assistant with multi-agent workflow"""
+    """Voice-enabled research assistant with multi-agent workflow
+
+    Subsystems (LLM, embeddings, memory, voice, document index, workflow, tools)
+    are built on first use so that e.g. a text-only query never loads voice SDKs.
+    """
     
-    def __init__(self):
-        Settings.llm = OpenAI(
-            model=config.LLM_MODEL,
-            temperature=config.TEMPERATURE,
-            api_key=config.OPENAI_API_KEY
-        )
-        Settings.embed_model = OpenAIEmbedding(
-            model=config.EMBEDDING_MODEL,
-            api_key=config.OPENAI_API_KEY
+    def __init__(self, profiler: Optional[StartupProfiler] = None):
+        self.profiler = profiler or startup_profiler
+        self._llm = None
+        self._embed_model = None
+        self._memory = None
+        self._conversations = OrderedDict()
+        self._precomputed_answers = None
+        self._voice_interface = None
+        self._document_index = None
+        self._vector_backend = None
+        self._metadata_index = None
+        self._summary_tree = None
+        self._shard_manager = None
+        self._workflow = None
+        self._tools = None
+    
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self.profiler.track("subsystem", "llm"):
+                Settings = self.profiler.import_module("llama_index.core").Settings
+                OpenAI = self.profiler.import_module("llama_index.llms.openai").OpenAI
+                self._llm = OpenAI(
+                    model=config.LLM_MODEL,
+                    temperature=config.TEMPERATURE,
+                    api_key=config.OPENAI_API_KEY
+                )
+                Settings.llm = self._llm
+        return self._llm
+    
+    @property
+    def embed_model(self):
+        if self._embed_model is None:
+            with self.profiler.track("subsystem", "embed_model"):
+                Settings = self.profiler.import_module("llama_index.core").Settings
+                OpenAIEmbedding = self.profiler.import_module("llama_index.embeddings.openai").OpenAIEmbedding
+                self._embed_model = OpenAIEmbedding(
+                    model=config.EMBEDDING_MODEL,
+                    api_key=config.OPENAI_API_KEY
+                )
+                Settings.embed_model = self._embed_model
+        return self._embed_model
+    
+    @property
+    def memory(self):
+        if self._memory is None:
+            with self.profiler.track("subsystem", "memory"):
+                MemoryManager = self.profiler.import_module("memory.memory_manager").MemoryManager
+                self._memory = MemoryManager(config.MEMORY_DIR)
+        return self._memory
+    
+    @property
+    def conversation(self):
+        """Semantic index of earlier question/answer turns of the default (local) session"""
+        return self.conversation_for(None)
+    
+    def conversation_for(self, session_id: Optional[str]):
+        """Conversation index of one session (e.g. a phone call's CallSid), created on first use"""
+        conversation = self._conversations.get(session_id)
+        if conversation is None:
+            self.preload("embed_model")
+            with self.profiler.track("subsystem", "conversation"):
+                ConversationIndex = self.profiler.import_module("memory.conversation_index").ConversationIndex
+                conversation = ConversationIndex(self.embed_model)
+            self._conversations[session_id] = conversation
+            while len(self._conversations) > config.CONVERSATION_MAX_SESSIONS:
+                self._conversations.popitem(last=False)
+        self._conversations.move_to_end(session_id)
+        return conversation
+    
+    @property
+    def precomputed_answers(self):
+        """Answers published by `main.py precompute` for recurring questions"""
+        if self._precomputed_answers is None:
+            with self.profiler.track("subsystem", "precomputed_answers"):
+                PrecomputedAnswerIndex = self.profiler.import_module("memory.answer_index").PrecomputedAnswerIndex
+                self._precomputed_answers = PrecomputedAnswerIndex(config.PRECOMPUTED_ANSWERS_DIR)
+        return self._precomputed_answers
+    
+    @property
+    def voice_interface(self):
+        if self._voice_interface is None:
+            with self.profiler.track("subsystem", "voice_interface"):
+                VoiceInterface = self.profiler.import_module("voice.voice_interface").VoiceInterface
+                self._voice_interface = VoiceInterface()
+        return self._voice_interface
+    
+    @property
+    def document_index(self):
+        if self._document_index is None:
+            # Settings.embed_model must be configured before the index is loaded
+            self.preload("embed_model")
+            with self.profiler.track("subsystem", "document_index"):
+                self._document_index = self._load_or_create_document_index()
+        return self._document_index
+    
+    @property
+    def vector_backend(self):
+        """NumPy vector backend persisted beside the docstore, or None for the simple store"""
+        if self._vector_backend is None and config.VECTOR_BACKEND != "simple":
+            document_index = self.document_index
+            with self.profiler.track("subsystem", f"vector_backend ({config.VECTOR_BACKEND})"):
+                vector_backends = self.profiler.import_module("indexing.vector_backends")
+                self._vector_backend = vector_backends.load_or_build_vector_backend(
+                    config.VECTOR_BACKEND,
+                    document_index,
+                    config.STORAGE_DIR
+                )
+                # Retrieval now scores the backend, so drop the vector store's float lists.
+                # This copy must never be persisted again: ingest() loads its own
+                document_index.vector_store.data.embedding_dict.clear()
+        return self._vector_backend
+    
+    @property
+    def metadata_index(self):
+        """Segment/year/section index used to pre-filter retrieval, or None when disabled"""
+        if self._metadata_index is None and config.METADATA_FILTERING:
+            document_index = self.document_index
+            with self.profiler.track("subsystem", "metadata_index"):
+                metadata = self.profiler.import_module("indexing.metadata")
+                self._metadata_index = metadata.load_or_build_metadata_index(
+                    document_index.docstore,
+                    config.STORAGE_DIR
+                )
+        return self._metadata_index
+    
+    @property
+    def summary_tree(self):
+        """Section and document summaries built at ingest, or None when disabled, missing or stale
+        
+        Never built here: summarizing is an LLM call per cluster, so only ingest
+        and `main.py summary-tree` build it. Without one, queries retrieve chunks.
+        """
+        if self._summary_tree is None and config.SUMMARY_TREE:
+            document_index = self.document_index
+            with self.profiler.track("subsystem", "summary_tree"):
+                summary_tree = self.profiler.import_module("indexing.summary_tree")
+                self._summary_tree = summary_tree.load_summary_tree(document_index.docstore, config.STORAGE_DIR)
+        return self._summary_tree
+    
+    @property
+    def shard_manager(self):
+        """Lazy loader for the sharded corpus, or None when CORPUS_DIR has no catalog"""
+        if self._shard_manager is None and (Path(config.CORPUS_DIR) / "catalog.json").exists():
+            with self.profiler.track("subsystem", "shard_manager"):
+                shards = self.profiler.import_module("indexing.shards")
+                self._shard_manager = shards.ShardManager(shards.ShardCatalog(config.CORPUS_DIR))
+        return self._shard_manager
+    
+    def use_vector_backend(self, vector_backend):
+        """Route retrieval through the given backend (e.g. a shared memory-mapped one)"""
+        self._vector_backend = vector_backend
+        self._workflow = None
+    
+    @property
+    def workflow(self):
+        if self._workflow is None:
+            shard_manager = self.shard_manager
+            if shard_manager is None:
+                document_index = self.document_index
+                vector_backend = self.vector_backend
+                metadata_index = self.metadata_index
+                summary_tree = self.summary_tree
+            else:
+                # Shards load on first routed query
+                self.preload("embed_model")
+                document_index = vector_backend = metadata_index = summary_tree = None
+            llm = self.llm
+            with self.profiler.track("subsystem", "workflow"):
+                ResearchWorkflow = self.profiler.import_module("agents.workflow").ResearchWorkflow
+                self._workflow = ResearchWorkflow(
+                    index=document_index,
+                    llm=llm,
+                    vector_backend=vector_backend,
+                    metadata_index=metadata_index,
+                    summary_tree=summary_tree,
+                    shard_manager=shard_manager,
+                    timeout=120
+                )
+        return self._workflow
+    
+    @property
+    def tools(self) -> dict:
+        if self._tools is None:
+            with self.profiler.track("subsystem", "tools"):
+                financial_extractor = self.profiler.import_module("tools.financial_extractor")
+                fact_verifier = self.profiler.import_module("tools.fact_verifier")
+                self._tools = {
+                    "financial_extractor": financial_extractor.create_financial_extractor_tool(),
+                    "fact_verifier": fact_verifier.create_fact_verifier_tool(config.TAVILY_API_KEY)
+                }
+        return self._tools
+    
+    def preload(self, *subsystems: str):
+        """Eagerly build the named subsystems, e.g. at server startup"""
+        for subsystem in subsystems:
+            getattr(self, subsystem)
+    
+    def _load_or_create_document_index(self):
+        """Load existing document index from storage or create new one from PDF"""
+        storage_path = Path(config.STORAGE_DIR)
+        
+        if storage_path.exists() and (storage_path / "docstore.json").exists():
+            llama_index_core = self.profiler.import_module("llama_index.core")
+            storage_context = llama_index_core.StorageContext.from_defaults(persist_dir=str(storage_path))
+            return llama_index_core.load_index_from_storage(storage_context)
+        
+        return self._build_document_index([config.PDF_PATH])[0]
+    
+    def _build_document_index(self, paths: list) -> tuple:
+        """Create the persisted index from PDFs; returns the index and the ingestion stats"""
+        ingestion = self.profiler.import_module("indexing.ingestion")
+        metadata = self.profiler.import_module("indexing.metadata")
+        ingestor = ingestion.StreamingPDFIngestor(persist_dir=config.STORAGE_DIR, node_transforms=[metadata.tag_nodes])
+        document_index = ingestor.ingest(paths)
+        return document_index, ingestor.stats
+    
+    def ingest(self, paths: list) -> dict:
+        """Stream additional PDFs (or folders of PDFs) into the persisted index
+        
+        Ingests into a freshly loaded copy of the index: the serving copy drops
+        its vector store's float lists once a vector backend is loaded, and
+        persisting it would erase the stored embeddings. On fresh storage the
+        paths build the index instead of PDF_PATH, and files already in the
+        index are skipped.
+        """
+        ingestion = self.profiler.import_module("indexing.ingestion")
+        metadata = self.profiler.import_module("indexing.metadata")
+        vector_backends = self.profiler.import_module("indexing.vector_backends")
+        self.preload("embed_model")
+        # Release the serving copies; the ingested ones replace them below
+        self._document_index = self._vector_backend = self._metadata_index = self._workflow = None
+        if not (Path(config.STORAGE_DIR) / "docstore.json").exists():
+            document_index, ingest_stats = self._build_document_index(paths)
+            if config.SUMMARY_TREE:
+                summary_tree = self.build_summary_tree(document_index)
+                print(f"  Summary tree: {summary_tree.levels}")
+            self._document_index = document_index
+            return ingest_stats
+        document_index = self._load_or_create_document_index()
+        vector_backend = None
+        if config.VECTOR_BACKEND != "simple":
+            vector_backend = vector_backends.load_or_build_vector_backend(config.VECTOR_BACKEND, document_index, config.STORAGE_DIR)
+        metadata_index = None
+        if config.METADATA_FILTERING:
+            metadata_index = metadata.load_or_build_metadata_index(document_index.docstore, config.STORAGE_DIR)
+        ingestor = ingestion.StreamingPDFIngestor(
+            index=document_index,
+            persist_dir=config.STORAGE_DIR,
+            node_transforms=[metadata.tag_nodes]
         )
         
-        self.memory = MemoryManager(config.MEMORY_DIR)
-        self.voice_interface = VoiceInterface()
-        self.document_index = self._load_or_create_document_index()
+        def on_batch(nodes):
+            if metadata_index is not None:
+                metadata_index.add_nodes(nodes)
+            if vector_backend is not None:
+                # Insert incrementally instead of rebuilding the backend from the whole store
+                vector_backend.add([node.node_id for node in nodes], [node.embedding for node in nodes])
+            print(f"  Indexed {ingestor.stats['nodes']} nodes from {ingestor.stats['pages']} pages")
+        
+        ingestor.ingest(paths, on_batch=on_batch)
+        if metadata_index is not None:
+            metadata_index.save(config.STORAGE_DIR)
+        if vector_backend is not None:
+            vector_backend.save(config.STORAGE_DIR)
+        if config.SUMMARY_TREE and ingestor.stats["nodes"]:
+            summary_tree = self.build_summary_tree(document_index, vector_backend)
+            print(f"  Summary tree: {summary_tree.levels}")
         
-        self.workflow = ResearchWorkflow(
-            index=self.document_index,
-            llm=Settings.llm,
-            timeout=120
+        self._document_index = document_index
+        self._metadata_index = metadata_index
+        if vector_backend is not None:
+            self.use_vector_backend(vector_backend)
+            # Everything is persisted, so the serving copy can drop its float lists now
+            document_index.vector_store.data.embedding_dict.clear()
+        return ingestor.stats
+    
+    def build_summary_tree(self, document_index=None, vector_backend=None):
+        """Summarize the indexed chunks into the persisted section/document summary tree"""
+        if document_index is None:
+            document_index = self.document_index
+        summary_tree = self.profiler.import_module("indexing.summary_tree")
+        self._summary_tree = summary_tree.build_summary_tree(
+            document_index,
+            config.STORAGE_DIR,
+            self.llm,
+            self.embed_model,
+            vector_backend=vector_backend
         )
+        self._workflow = None
+        return self._summary_tree
+    
+    def ingest_shard(self, company: str, fiscal_year: int, paths: list) -> dict:
+        """Stream filings into the corpus shard for one company and fiscal year"""
+        self.preload("embed_model")
+        shards = self.profiler.import_module("indexing.shards")
+        catalog = self.shard_manager.catalog if self.shard_manager else shards.ShardCatalog(config.CORPUS_DIR)
+        ingest_stats = shards.ingest_shard(catalog, company, fiscal_year, paths)
+        if self._shard_manager is not None:
+            self._shard_manager.evict(ingest_stats["shard_id"])
+        self._workflow = None
+        return ingest_stats
+    
+    async def lookup_precomputed(self, user_query: str) -> Optional[dict]:
+        """Precomputed answer for a close match of a recurring question, or None
         
-        self.tools = {
-            "financial_extractor": create_financial_extractor_tool(),
-            "fact_verifier": create_fact_verifier_tool(config.TAVILY_API_KEY)
-        }
+        Questions that lean on the conversation (follow-ups, refinements) are
+        never matched. Nothing is embedded while the index is empty or was
+        built against another version of the document index.
+        """
+        from agents.checkpoints import is_refinement
+        answer_index = self.profiler.import_module("memory.answer_index")
+        ConversationIndex = self.profiler.import_module("memory.conversation_index").ConversationIndex
+        if ConversationIndex.is_anaphoric(user_query) or is_refinement(user_query):
+            return None
+        document_version = answer_index.document_index_version()
+        if not self.precomputed_answers.is_current(document_version):
+            return None
+        query_embedding = await self.embed_model.aget_query_embedding(user_query)
+        return self.precomputed_answers.lookup(user_query, query_embedding, document_version)
     
-    def _load_or_create_document_index(self) -> VectorStoreIndex:
-        """Load existing document index from storage or create new one from PDF"""
-        storage_path = Path(config.STORAGE_DIR)
+    async def precompute_answers(self, top_clusters: int = config.PRECOMPUTE_TOP_CLUSTERS) -> dict:
+        """Cluster the behavioral query history and publish full-workflow answers for the heaviest clusters"""
+        from agents.checkpoints import is_refinement
+        import numpy as np
+        answer_index = self.profiler.import_module("memory.answer_index")
+        ConversationIndex = self.profiler.import_module("memory.conversation_index").ConversationIndex
         
-        if storage_path.exists() and (storage_path / "docstore.json").exists():
-            from llama_index.core import StorageContext, load_index_from_storage
-            storage_context = StorageContext.from_defaults(persist_dir=str(storage_path))
-            return load_index_from_storage(storage_context)
+        # Only self-contained questions can be answered without their conversation
+        patterns = [
+            pattern for pattern in self.memory.behavioral_memory["query_patterns"]
+            if not ConversationIndex.is_anaphoric(pattern["query"]) and not is_refinement(pattern["query"])
+        ]
+        queries, weights = answer_index.weigh_query_history(patterns)
+        if not queries:
+            return {"history": 0, "clusters": 0, "published": 0}
+        embeddings = np.asarray(await self.embed_model.aget_text_embedding_batch(queries), dtype=np.float32)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        clusters = answer_index.cluster_queries(queries, embeddings, weights)
+        selected = [cluster for cluster in clusters if cluster["weight"] >= config.PRECOMPUTE_MIN_CLUSTER_WEIGHT][:top_clusters]
         
-        documents = SimpleDirectoryReader(input_files=[config.PDF_PATH]).load_data()
-        document_index = VectorStoreIndex.from_documents(documents)
+        document_version = answer_index.document_index_version()
+        workflow = self.workflow
+        semaphore = asyncio.Semaphore(config.PRECOMPUTE_CONCURRENCY)
         
-        storage_path.mkdir(exist_ok=True)
-        document_index.storage_context.persist(persist_dir=str(storage_path))
+        async def answer(cluster):
+            async with semaphore:
+                try:
+                    return cluster, await workflow.run(query=cluster["representative"], context="", budget="batch")
+                except Exception as error:
+                    print(f"  Failed: {cluster['representative'][:60]} ({error})")
+                    return cluster, None
         
-        return document_index
+        entries = []
+        rows = []
+        for cluster, result in await asyncio.gather(*(answer(cluster) for cluster in selected)):
+            if result is None or result.get("partial") or result.get("confidence", 0.0) < config.PRECOMPUTE_MIN_CONFIDENCE:
+                continue
+            entries.append({
+                "question": cluster["representative"],
+                "cluster_queries": cluster["queries"][:10],
+                "weight": round(cluster["weight"], 2),
+                "summary": result["summary"],
+                "confidence": result["confidence"],
+                "source_nodes": result.get("source_nodes", [])[:config.CONVERSATION_MAX_NODES_PER_TURN]
+            })
+            rows.append(cluster["centroid"] / max(np.linalg.norm(cluster["centroid"]), 1e-12))
+            print(f"  [{cluster['weight']:.1f}] {cluster['representative'][:70]} (confidence {result['confidence']:.2f})")
+        
+        self.precomputed_answers.publish(
+            entries,
+            np.vstack(rows) if rows else np.zeros((0, embeddings.shape[1]), dtype=np.float32),
+            document_version
+        )
+        return {
+            "history": len(patterns),
+            "distinct_queries": len(queries),
+            "clusters": len(clusters),
+            "answered": len(selected),
+            "published": len(entries),
+            "document_version": document_version
+        }
     
-    async def process_query(self, user_query: str, show_workflow_steps: bool = True) -> dict:
-        """Process user query through multi-agent workflow"""
+    async def process_query(
+        self,
+        user_query: str,
+        show_workflow_steps: bool = True,
+        budget=None,
+        session_id: Optional[str] = None
+    ) -> dict:
+        """Process user query through multi-agent workflow
+        
+        budget is a QueryBudget or a profile name from config.QUERY_BUDGETS
+        ("voice", "batch"); defaults to config.DEFAULT_QUERY_BUDGET.
+        session_id keeps concurrent conversations (e.g. phone calls) apart for
+        follow-ups; None is the local session.
+        """
+        from agents.checkpoints import is_refinement
+        
         normalized_query = user_query.lower()
         memory_related_keywords = ["previous question", "what did i ask", "last question", "earlier", "before"]
         
@@ -78,14 +430,48 @@ class ResearchAssistant:
                 "is_memory_query": True
             }
         
+        precomputed = await self.lookup_precomputed(user_query)
+        if precomputed is not None:
+            return await self._answer_from_precomputed(user_query, precomputed, show_workflow_steps, session_id)
+        
+        # Earlier turns relevant to this question, within a token budget; a follow-up also reuses their nodes
+        conversation = self.conversation_for(session_id)
+        recall = await conversation.recall(user_query)
         self.memory.add_to_short_term("user", user_query)
-        conversation_context = self.memory.get_context_summary()
+        conversation_context = self.memory.get_context_summary(recall["context"])
+        
+        # A refinement of the last answer resumes that run from its checkpoints instead
+        checkpoints = self.workflow.checkpoints
+        resume = None
+        latest_key = checkpoints.latest_key(session_id) if checkpoints is not None else None
+        latest_turn = conversation.turns[-1] if conversation.turns else None
+        # Only when the question brings up nothing the last answer did not cover
+        if latest_key and latest_turn and is_refinement(user_query, f"{latest_turn['question']} {latest_turn['answer']}"):
+            resume = {"key": latest_key, "focus": user_query}
         
         query_topic = self._extract_topic_from_query(user_query)
         self.memory.track_behavior(user_query, query_topic)
         self._extract_and_store_user_preferences(user_query)
         
-        workflow_result = await self.workflow.run(query=user_query, context=conversation_context)
+        handler = self.workflow.run(
+            query=user_query,
+            context=conversation_context,
+            budget=budget,
+            follow_up=recall if recall["follow_up"] and resume is None else None,
+            resume=resume,
+            session_id=session_id,
+            conversation_turns=recall["turns"]
+        )
+        try:
+            # Shielded so a cancelled caller (e.g. voice barge-in) can still stop the run cleanly
+            workflow_result = await asyncio.shield(handler)
+        except asyncio.CancelledError:
+            abandoned = await self.workflow.cancel_run(handler)
+            from voice.barge_in import current_turn
+            turn = current_turn.get()
+            if turn is not None:
+                turn.record(abandoned)
+            raise
         
         if show_workflow_steps:
             print("\nWorkflow steps:")
@@ -94,9 +480,49 @@ class ResearchAssistant:
         
         response_summary = workflow_result.get("summary", "")
         self.memory.add_to_short_term("assistant", response_summary)
+        await conversation.add_turn(user_query, response_summary, workflow_result.get("source_nodes", []))
+        workflow_result["follow_up"] = recall["follow_up"] and resume is None
         
         return workflow_result
     
+    async def _answer_from_precomputed(
+        self,
+        user_query: str,
+        precomputed: dict,
+        show_workflow_steps: bool,
+        session_id: Optional[str] = None
+    ) -> dict:
+        """Serve a precomputed answer as this turn, recorded like a workflow answer so follow-ups work"""
+        workflow_steps = [
+            f"Answered from precomputed index: \"{precomputed['question']}\" "
+            f"(similarity {precomputed['similarity']:.2f}, built {self.precomputed_answers.built_at})"
+        ]
+        if show_workflow_steps:
+            print("\nWorkflow steps:")
+            for step in workflow_steps:
+                print(f"  {step}")
+        
+        self.memory.add_to_short_term("user", user_query)
+        self.memory.track_behavior(user_query, self._extract_topic_from_query(user_query))
+        self._extract_and_store_user_preferences(user_query)
+        self.memory.add_to_short_term("assistant", precomputed["summary"])
+        if self._workflow is not None and self._workflow.checkpoints is not None:
+            # The last answer no longer comes from a checkpointed run
+            self._workflow.checkpoints.set_latest_key(session_id, None)
+        await self.conversation_for(session_id).add_turn(user_query, precomputed["summary"], precomputed["source_nodes"])
+        return {
+            "summary": precomputed["summary"],
+            "confidence": precomputed["confidence"],
+            "workflow_steps": workflow_steps,
+            "source_nodes": precomputed["source_nodes"],
+            "precomputed": {
+                "question": precomputed["question"],
+                "similarity": precomputed["similarity"],
+                "document_version": self.precomputed_answers.document_version
+            },
+            "follow_up": False
+        }
+    
     def _extract_topic_from_query(self, user_query: str) -> str:
         topic_keywords = {
             "financial": ["profit", "revenue", "margin", "income", "financial"],
@@ -132,7 +558,7 @@ class ResearchAssistant:
     async def process_voice_query(self, audio_data: bytes) -> dict:
         return await self.voice_interface.process_voice_query(
             audio_data,
-            query_handler=lambda q: self.process_query(q, show_workflow_steps=False)
+            query_handler=lambda q: self.process_query(q, show_workflow_steps=False, budget="voice")
         )
     
     def start_interactive_mode(self):
@@ -172,19 +598,60 @@ class ResearchAssistant:
         return result
 
 def main():
+    import sys
+    
+    cli_args = sys.argv[1:]
+    show_startup_profile = "--startup-profile" in cli_args
+    if show_startup_profile:
+        cli_args.remove("--startup-profile")
+    
     assistant = ResearchAssistant()
     
-    import sys
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
+    if cli_args:
+        command = cli_args[0]
         if command == "test":
             assistant.run_test_case()
+        elif command == "ingest":
+            ingest_args = cli_args[1:]
+            if "--company" in ingest_args:
+                # ingest --company NAME --year YYYY paths...: add filings to a corpus shard
+                option_positions = {ingest_args.index("--company"), ingest_args.index("--year")}
+                company = ingest_args[ingest_args.index("--company") + 1]
+                fiscal_year = int(ingest_args[ingest_args.index("--year") + 1])
+                paths = [
+                    arg for position, arg in enumerate(ingest_args)
+                    if position not in option_positions and position - 1 not in option_positions
+                ]
+                ingest_stats = assistant.ingest_shard(company, fiscal_year, paths)
+            elif ingest_args:
+                ingest_stats = assistant.ingest(ingest_args)
+            else:
+                print("Usage: python main.py ingest PATH [PATH ...]")
+                return
+            print(f"Ingestion complete: {ingest_stats}")
+        elif command == "summary-tree":
+            # summary-tree: (re)build the summary tree for an index ingested without one
+            summary_tree = assistant.build_summary_tree(vector_backend=assistant.vector_backend)
+            print(f"Summary tree complete: {summary_tree.levels}")
+        elif command == "precompute":
+            # precompute [--top N] [--force]: run outside PRECOMPUTE_OFF_PEAK_HOURS only with --force
+            from memory.answer_index import in_off_peak_hours
+            precompute_args = cli_args[1:]
+            top_clusters = int(precompute_args[precompute_args.index("--top") + 1]) if "--top" in precompute_args else config.PRECOMPUTE_TOP_CLUSTERS
+            if not in_off_peak_hours() and "--force" not in precompute_args:
+                print(f"Outside off-peak hours ({config.PRECOMPUTE_OFF_PEAK_HOURS}); pass --force to run anyway")
+                return
+            precompute_stats = asyncio.run(assistant.precompute_answers(top_clusters))
+            print(f"Precompute complete: {precompute_stats}")
         elif command == "query":
-            user_query = " ".join(sys.argv[2:])
+            user_query = " ".join(cli_args[1:])
             query_result = asyncio.run(assistant.process_query(user_query))
             print("\n" + query_result.get("summary", ""))
     else:
         assistant.start_interactive_mode()
+    
+    if show_startup_profile:
+        print(assistant.profiler.report())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import config
+
+ANSWER_INDEX_FILE = "answers.json"
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+def document_index_version() -> str:
+    """Stamp of the document index answers were computed against; changes whenever it is re-ingested"""
+    catalog_path = Path(config.CORPUS_DIR) / "catalog.json"
+    if catalog_path.exists():
+        return "corpus-" + hashlib.sha1(catalog_path.read_bytes()).hexdigest()[:16]
+    docstore_path = Path(config.STORAGE_DIR) / "docstore.json"
+    if docstore_path.exists():
+        stat = docstore_path.stat()
+        return "storage-" + hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return "none"
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+def numbers_in(text: str) -> frozenset:
+    """Years and figures a question is pinned to; questions differing only in these are different questions"""
+    return frozenset(NUMBER_PATTERN.findall(text))
+
+def weigh_query_history(
+    query_patterns: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+    half_life_days: float = config.PRECOMPUTE_HISTORY_HALF_LIFE_DAYS
+) -> Tuple[List[str], np.ndarray]:
+    """Distinct historical queries and their recency-weighted frequency (each ask halves in weight every half-life)"""
+    now = now or datetime.now()
+    weights: Dict[str, float] = {}
+    originals: Dict[str, str] = {}
+    for pattern in query_patterns:
+        key = normalize_query(pattern["query"])
+        if not key:
+            continue
+        age_days = max((now - datetime.fromisoformat(pattern["timestamp"])).total_seconds() / 86400, 0.0)
+        weights[key] = weights.get(key, 0.0) + 0.5 ** (age_days / half_life_days)
+        originals.setdefault(key, pattern["query"])
+    keys = list(weights)
+    return [originals[key] for key in keys], np.asarray([weights[key] for key in keys], dtype=np.float32)
+
+def cluster_queries(
+    queries: List[str],
+    embeddings: np.ndarray,
+    weights: np.ndarray,
+    similarity: float = config.PRECOMPUTE_CLUSTER_SIMILARITY
+) -> List[Dict[str, Any]]:
+    """Greedy leader clustering, heaviest clusters first
+    
+    The heaviest unassigned query leads a cluster and takes every unassigned
+    query within similarity of it that mentions the same numbers. Rows of
+    embeddings must be normalized.
+    """
+    order = np.argsort(-weights, kind="stable")
+    assigned = np.zeros(len(queries), dtype=bool)
+    numbers = [numbers_in(query) for query in queries]
+    clusters = []
+    for leader in order:
+        if assigned[leader]:
+            continue
+        candidates = np.flatnonzero(~assigned & (embeddings @ embeddings[leader] >= similarity))
+        members = [int(i) for i in candidates if numbers[i] == numbers[leader]]
+        if leader not in members:
+            members.append(int(leader))
+        assigned[members] = True
+        clusters.append({
+            "representative": queries[leader],
+            "queries": [queries[i] for i in members],
+            "weight": float(weights[members].sum()),
+            "centroid": embeddings[members].mean(axis=0)
+        })
+    return sorted(clusters, key=lambda cluster: cluster["weight"], reverse=True)
+
+def in_off_peak_hours(now: Optional[datetime] = None, hours: str = config.PRECOMPUTE_OFF_PEAK_HOURS) -> bool:
+    """hours is "start-end" in local time, end exclusive; it may wrap past midnight ("22-5")"""
+    start, end = (int(hour) for hour in hours.split("-"))
+    hour = (now or datetime.now()).hour
+    return start <= hour < end if start <= end else hour >= start or hour < end
+
+class PrecomputedAnswerIndex:
+    """Read-optimized store of answers computed offline for recurring questions
+    
+    Published as a JSON manifest plus a normalized float32 matrix of question
+    embeddings (memory-mapped on load). Each publish writes a new matrix file
+    and then atomically replaces the manifest, so serving processes pick up the
+    new version on their next lookup without ever seeing half of one. Answers
+    are only served while the manifest's document version matches the live
+    document index.
+    """
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or config.PRECOMPUTED_ANSWERS_DIR)
+        self.entries: List[Dict[str, Any]] = []
+        self.embeddings: Optional[np.ndarray] = None
+        self.document_version: Optional[str] = None
+        self.built_at: Optional[str] = None
+        self._manifest_mtime: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / ANSWER_INDEX_FILE
+    
+    def refresh(self):
+        """Reload when a newer index has been published"""
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        with open(self.manifest_path, 'r') as f:
+            manifest = json.load(f)
+        try:
+            embeddings = np.load(self.directory / manifest["embeddings_file"], mmap_mode="r") if manifest["entries"] else None
+        except FileNotFoundError:
+            # Superseded by a publish between the two reads; the next lookup loads the new version
+            return
+        self.embeddings = embeddings
+        self.entries = manifest["entries"]
+        self.document_version = manifest["document_version"]
+        self.built_at = manifest["built_at"]
+        self._manifest_mtime = mtime
+    
+    def is_current(self, document_version: str) -> bool:
+        self.refresh()
+        return bool(self.entries) and self.document_version == document_version
+    
+    def lookup(self, query: str, query_embedding, document_version: str) -> Optional[Dict[str, Any]]:
+        """Entry whose question is close enough to answer this one, with its similarity, or None"""
+        if not self.is_current(document_version):
+            return None
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        similarities = self.embeddings @ vector
+        best = int(np.argmax(similarities))
+        entry = self.entries[best]
+        if similarities[best] < config.PRECOMPUTED_MATCH_SIMILARITY or numbers_in(query) != frozenset(entry["numbers"]):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(entry, similarity=round(float(similarities[best]), 3))
+    
+    def publish(self, entries: List[Dict[str, Any]], embeddings: np.ndarray, document_version: str):
+        """Write a new version of the index; entries and embeddings rows correspond"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        previous_files = {path.name for path in self.directory.glob("embeddings-*.npy")}
+        embeddings_file = f"embeddings-{uuid.uuid4().hex[:12]}.npy"
+        with open(self.directory / embeddings_file, 'wb') as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        
+        manifest = {
+            "document_version": document_version,
+            "built_at": datetime.now().isoformat(),
+            "embeddings_file": embeddings_file,
+            "entries": [dict(entry, numbers=sorted(numbers_in(entry["question"]))) for entry in entries]
+        }
+        temporary_path = self.manifest_path.with_name(ANSWER_INDEX_FILE + ".tmp")
+        with open(temporary_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temporary_path, self.manifest_path)
+        # Readers that mapped an older matrix keep their open mapping
+        for name in previous_files:
+            (self.directory / name).unlink(missing_ok=True)
+        self._manifest_mtime = None
+        self.refresh()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "document_version": self.document_version,
+            "built_at": self.built_at,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,177 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .tokens import estimate_tokens
+from tools.financial_extractor import FinancialMetricsExtractor
+import config
+
+# Elliptical openers only make sense against an earlier turn
+ELLIPSIS_PATTERN = re.compile(
+    r"^(?:and|also|what about|how about|and what about|same for|compare (?:that|it|this))\b",
+    re.IGNORECASE
+)
+# Pronouns may refer back, but also occur in self-contained questions ("their supply chain")
+PRONOUN_PATTERN = re.compile(r"\b(?:its|it|that|those|these|they|their|them|this one|the same)\b", re.IGNORECASE)
+TOPIC_ENTITY_TYPES = ("company", "segment", "metric")
+
+def topic_entities(text: str) -> set:
+    """Companies, segments and metrics a text is about (years are left out: "and in 2022?" still refers back)"""
+    mentions = FinancialMetricsExtractor.find_entity_mentions(text, config.KNOWN_COMPANIES)
+    return {(m["type"], m["value"]) for m in mentions if m["type"] in TOPIC_ENTITY_TYPES}
+
+class ConversationIndex:
+    """Per-session index of question/answer turns and the research nodes behind them
+    
+    Each turn is embedded (question plus the start of the answer) and kept
+    with the nodes its answer was drawn from. A new question is matched
+    against earlier turns by cosine similarity with a small recency bonus;
+    when it is a follow-up, the matched turns' nodes are handed to the
+    workflow so it can answer without planning or full retrieval.
+    """
+    
+    def __init__(
+        self,
+        embed_model=None,
+        max_turns: int = config.CONVERSATION_MAX_TURNS,
+        max_nodes_per_turn: int = config.CONVERSATION_MAX_NODES_PER_TURN
+    ):
+        self._embed_model = embed_model
+        self.max_turns = max_turns
+        self.max_nodes_per_turn = max_nodes_per_turn
+        self.turns: List[Dict[str, Any]] = []
+        self._embeddings: Optional[np.ndarray] = None
+    
+    @property
+    def embed_model(self):
+        if self._embed_model is None:
+            from llama_index.core import Settings
+            self._embed_model = Settings.embed_model
+        return self._embed_model
+    
+    def __len__(self) -> int:
+        return len(self.turns)
+    
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    async def add_turn(self, question: str, answer: str, nodes: Optional[List[Dict[str, Any]]] = None):
+        """Record a completed turn; nodes are {"node_id", "text", "score"} dicts"""
+        embedding = await self.embed_model.aget_text_embedding(f"Q: {question}\nA: {answer[:500]}")
+        kept_nodes = sorted(nodes or [], key=lambda node: node.get("score") or 0.0, reverse=True)[:self.max_nodes_per_turn]
+        self.turns.append({
+            "question": question,
+            "answer": answer,
+            "nodes": [{"node_id": node["node_id"], "text": node["text"], "score": node.get("score") or 0.0} for node in kept_nodes],
+            "timestamp": datetime.now().isoformat()
+        })
+        row = self._normalize(embedding)[None, :]
+        self._embeddings = row if self._embeddings is None else np.vstack([self._embeddings, row])
+        if len(self.turns) > self.max_turns:
+            self.turns = self.turns[-self.max_turns:]
+            self._embeddings = self._embeddings[-self.max_turns:]
+    
+    def search(self, query_embedding, top_k: int = config.CONVERSATION_TOP_K) -> List[Dict[str, Any]]:
+        """Earlier turns most relevant to a question, best first, with similarity and score"""
+        if not self.turns:
+            return []
+        similarities = self._embeddings @ self._normalize(query_embedding)
+        # Newest turn gets the full bonus, halving with each turn back
+        ages = np.arange(len(self.turns) - 1, -1, -1)
+        scores = similarities + config.CONVERSATION_RECENCY_WEIGHT * 0.5 ** ages
+        order = np.argsort(-scores)[:top_k]
+        return [
+            {"turn": self.turns[i], "similarity": float(similarities[i]), "score": float(scores[i])}
+            for i in order
+        ]
+    
+    @staticmethod
+    def is_anaphoric(query: str) -> bool:
+        """Short question that may lean on an earlier turn; longer ones say what they are about"""
+        if len(query.split()) > config.CONVERSATION_FOLLOW_UP_MAX_WORDS:
+            return False
+        return bool(ELLIPSIS_PATTERN.search(query) or PRONOUN_PATTERN.search(query))
+    
+    @staticmethod
+    def refers_back(query: str, latest: Dict[str, Any]) -> bool:
+        """Whether a short anaphoric question is about the latest turn (a match from search())
+        
+        Elliptical openers always are. A pronoun only counts when the question
+        is similar enough to the latest turn and names no company, segment or
+        metric that turn did not, so "Who are their main competitors?" after a
+        revenue question starts fresh.
+        """
+        if not ConversationIndex.is_anaphoric(query):
+            return False
+        if ELLIPSIS_PATTERN.search(query):
+            return True
+        if latest["similarity"] < config.CONVERSATION_ANAPHORA_MIN_SIMILARITY:
+            return False
+        return not topic_entities(query) - topic_entities(latest["turn"]["question"])
+    
+    @staticmethod
+    def build_context(matches: List[Dict[str, Any]], token_budget: int = config.CONVERSATION_CONTEXT_TOKENS) -> str:
+        """Relevant earlier turns, most relevant first, within token_budget"""
+        lines = []
+        remaining = token_budget
+        for match in matches:
+            turn = match["turn"]
+            question = f"User: {turn['question']}"
+            remaining -= estimate_tokens(question)
+            if remaining <= 0:
+                break
+            # The answer is cut to whatever the budget still allows
+            answer = turn["answer"][:max(remaining, 0) * 4]
+            remaining -= estimate_tokens(answer)
+            lines.append(f"{question} | Assistant: {answer}")
+            if remaining <= 0:
+                break
+        return " || ".join(lines)
+    
+    @staticmethod
+    def reusable_nodes(matches: List[Dict[str, Any]], max_nodes: int = config.CONVERSATION_REUSE_MAX_NODES) -> List[Dict[str, Any]]:
+        """Union of the matched turns' nodes by node ID, highest score first"""
+        nodes: Dict[str, Dict[str, Any]] = {}
+        for match in matches:
+            for node in match["turn"]["nodes"]:
+                if node["node_id"] not in nodes or node["score"] > nodes[node["node_id"]]["score"]:
+                    nodes[node["node_id"]] = dict(node)
+        return sorted(nodes.values(), key=lambda node: node["score"], reverse=True)[:max_nodes]
+    
+    async def recall(self, query: str) -> Dict[str, Any]:
+        """Context for a new question, and the follow-up reuse plan when it refers back
+        
+        Returns {"context", "follow_up", "turns"} and, for follow-ups, "nodes"
+        to reuse and "resolved_query" (the earlier question the follow-up
+        elaborates, prefixed to it for any top-up retrieval).
+        """
+        if not self.turns:
+            return {"context": "", "follow_up": False, "turns": 0}
+        query_embedding = await self.embed_model.aget_query_embedding(query)
+        ranked = self.search(query_embedding, top_k=len(self.turns))
+        matches = ranked[:config.CONVERSATION_TOP_K]
+        latest = next(match for match in ranked if match["turn"] is self.turns[-1])
+        anaphoric = self.refers_back(query, latest)
+        if anaphoric:
+            # Pronouns refer back to the last exchange first, whatever else is similar
+            matches = [latest] + [match for match in matches if match is not latest][:config.CONVERSATION_TOP_K - 1]
+        
+        recall = {"context": self.build_context(matches), "follow_up": False, "turns": len(matches)}
+        if not anaphoric and matches[0]["similarity"] < config.CONVERSATION_FOLLOW_UP_SIMILARITY:
+            return recall
+        nodes = self.reusable_nodes(matches[:config.CONVERSATION_REUSE_TURNS])
+        if nodes:
+            recall.update({
+                "follow_up": True,
+                "nodes": nodes,
+                "resolved_query": f"{matches[0]['turn']['question']} {query}",
+                "similarity": round(matches[0]["similarity"], 3)
+            })
+        return recall
+    
+    def clear(self):
+        self.turns = []
+        self._embeddings = None
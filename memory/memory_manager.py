@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 class MemoryManager:
@@ -88,10 +88,13 @@ class MemoryManager:
         
         self.save_all()
     
-    def get_context_summary(self) -> str:
+    def get_context_summary(self, relevant_history: Optional[str] = None) -> str:
+        """Planner context; relevant_history (e.g. from the conversation index) replaces the recent-messages line"""
         context = []
         
-        if self.short_term_memory:
+        if relevant_history:
+            context.append(f"Relevant conversation: {relevant_history}")
+        elif self.short_term_memory:
             recent = self.short_term_memory[-3:]
             history = []
             for msg in recent:
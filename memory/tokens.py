@@ -0,0 +1,3 @@
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
@@ -0,0 +1,41 @@
+import time
+from contextlib import contextmanager
+from importlib import import_module
+from typing import List, Tuple
+
+class StartupProfiler:
+    """Records per-import and per-subsystem initialization timings"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.records: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def track(self, kind: str, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append((kind, name, time.perf_counter() - start))
+
+    def import_module(self, module_name: str):
+        """Import a module, recording how long the (possibly cached) import took"""
+        with self.track("import", module_name):
+            return import_module(module_name)
+
+    def timings(self, kind: str) -> List[Tuple[str, float]]:
+        return [(name, elapsed) for record_kind, name, elapsed in self.records if record_kind == kind]
+
+    def report(self) -> str:
+        lines = ["\nStartup profile:"]
+        for kind, title in [("import", "Imports"), ("subsystem", "Subsystems")]:
+            entries = sorted(self.timings(kind), key=lambda entry: entry[1], reverse=True)
+            if not entries:
+                continue
+            lines.append(f"  {title}:")
+            for name, elapsed in entries:
+                lines.append(f"    {elapsed * 1000:9.1f} ms  {name}")
+        lines.append(f"  Total since start: {(time.perf_counter() - self.started_at) * 1000:.1f} ms")
+        return "\n".join(lines)
+
+startup_profiler = StartupProfiler()
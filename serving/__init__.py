@@ -0,0 +1,3 @@
+from .worker_pool import WorkerPool
+
+__all__ = ['WorkerPool']
@@ -0,0 +1,334 @@
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+import config
+
+# Set in the parent right before forking so workers inherit the loaded index
+# copy-on-write instead of rebuilding it
+_inherited_assistant = None
+
+def _build_worker_assistant(storage_dir: str):
+    if _inherited_assistant is not None:
+        return _inherited_assistant
+    
+    # spawn start method: reload the docstore, but map the shared embeddings file
+    from main import ResearchAssistant
+    from indexing.vector_backends import load_or_build_vector_backend
+    assistant = ResearchAssistant()
+    assistant.preload("document_index")
+    assistant.use_vector_backend(load_or_build_vector_backend(_shared_backend_name(), assistant.document_index, storage_dir))
+    return assistant
+
+def _shared_backend_name() -> str:
+    """The configured vector backend, or a dense matrix for the simple store"""
+    return config.VECTOR_BACKEND if config.VECTOR_BACKEND != "simple" else "dense"
+
+def _heartbeat_loop(heartbeat, interval: float, stop_event):
+    while not stop_event.is_set():
+        heartbeat.value = time.time()
+        stop_event.wait(interval)
+
+def _worker_main(worker_id: int, task_queue, result_queue, stop_event, heartbeat, job_started, storage_dir: str):
+    """Worker process: pull jobs from the shared queue until asked to stop
+    
+    The heartbeat thread only shows the process is alive; job_started (0 when
+    idle) lets the parent spot a job that never returns.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    assistant = _build_worker_assistant(storage_dir)
+    query_engines = {}
+    loop = asyncio.new_event_loop()
+    
+    threading.Thread(
+        target=_heartbeat_loop,
+        args=(heartbeat, config.WORKER_HEARTBEAT_INTERVAL, stop_event),
+        daemon=True
+    ).start()
+    result_queue.put(("ready", worker_id, os.getpid(), None))
+    
+    async def run_research(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await assistant.workflow.run(
+            query=payload["query"],
+            context=payload.get("context", ""),
+            budget=payload.get("budget"),
+            conversation_turns=payload.get("conversation_turns", 0)
+        )
+    
+    while not stop_event.is_set():
+        try:
+            request_id, kind, payload = task_queue.get(timeout=config.WORKER_HEARTBEAT_INTERVAL)
+        except queue.Empty:
+            continue
+        
+        result_queue.put(("started", worker_id, request_id, None))
+        job_started.value = time.time()
+        try:
+            if kind == "quick":
+                depth = (
+                    payload.get("similarity_top_k", config.VOICE_RETRIEVAL_MAX_K),
+                    payload.get("min_k", config.VOICE_RETRIEVAL_MIN_K)
+                )
+                if depth not in query_engines:
+                    query_engines[depth] = assistant.workflow.create_query_engine(
+                        similarity_top_k=depth[0],
+                        min_k=depth[1],
+                        response_mode="compact"
+                    )
+                response = query_engines[depth].query(payload["query"])
+                result = {"answer": str(response)}
+            elif kind == "research":
+                result = dict(loop.run_until_complete(run_research(payload)))
+            else:
+                result = {"error": f"Unknown job kind: {kind}"}
+        except Exception as e:
+            result = {"error": str(e)}
+        job_started.value = 0.0
+        result_queue.put(("result", worker_id, request_id, result))
+    
+    loop.close()
+    result_queue.put(("stopped", worker_id, os.getpid(), None))
+    result_queue.close()
+    result_queue.join_thread()
+    # Workers re-forked after the parent started its listener threads cannot
+    # run the normal interpreter shutdown safely; exit once the queue is flushed
+    os._exit(0)
+
+class _WorkerSlot:
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.stop_event = None
+        self.heartbeat = None
+        self.job_started = None
+        self.ready = False
+        self.restarts = 0
+        self.in_flight: Set[int] = set()
+
+class WorkerPool:
+    """Pool of forked workers sharing one pre-loaded, memory-mapped index
+    
+    The parent loads the index once, exports its embeddings to a read-only
+    memory-mapped matrix and forks the workers, so every process maps the same
+    pages. Jobs go through one shared queue; the parent keeps the only writable
+    state (conversation memory) and resolves each job's future from a listener thread.
+    Workers are only forked from the main thread: the monitor and rolling
+    restart threads hand the fork to the event loop.
+    """
+    
+    def __init__(self, num_workers: Optional[int] = None, storage_dir: str = config.STORAGE_DIR):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.storage_dir = storage_dir
+        methods = mp.get_all_start_methods()
+        self._mp = mp.get_context("fork" if "fork" in methods else "spawn")
+        self._task_queue = self._mp.Queue()
+        self._result_queue = self._mp.Queue()
+        self._slots = [_WorkerSlot(worker_id) for worker_id in range(self.num_workers)]
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+        self._restarting: Set[int] = set()
+        self._loop = None
+        self.completed = 0
+        self.failed = 0
+    
+    def start(self, assistant):
+        """Load the shared index in this process and fork the workers"""
+        global _inherited_assistant
+        from indexing.vector_backends import load_or_build_vector_backend
+        
+        if config.VECTOR_BACKEND != "simple":
+            # Loaded (or built from the full store) before the property drops the float lists
+            shared_backend = assistant.vector_backend
+        else:
+            document_index = assistant.document_index
+            shared_backend = load_or_build_vector_backend("dense", document_index, self.storage_dir)
+            if len(shared_backend) < len(document_index.docstore.docs):
+                raise RuntimeError("Shared vector backend is missing embeddings; the index copy was already stripped")
+            assistant.use_vector_backend(shared_backend)
+            # The memory-mapped matrix is now the only copy the workers score against.
+            # As with the vector_backend property, this copy must never be persisted again
+            document_index.vector_store.data.embedding_dict.clear()
+        assistant.preload("llm", "workflow")
+        
+        if self._mp.get_start_method() == "fork":
+            _inherited_assistant = assistant
+        
+        self._loop = asyncio.get_event_loop()
+        self._running = True
+        for slot in self._slots:
+            self._spawn(slot)
+        
+        threading.Thread(target=self._listen, daemon=True).start()
+        threading.Thread(target=self._monitor, daemon=True).start()
+    
+    def _spawn(self, slot: _WorkerSlot):
+        slot.stop_event = self._mp.Event()
+        slot.heartbeat = self._mp.Value('d', time.time())
+        slot.job_started = self._mp.Value('d', 0.0)
+        slot.ready = False
+        slot.process = self._mp.Process(
+            target=_worker_main,
+            args=(slot.worker_id, self._task_queue, self._result_queue, slot.stop_event, slot.heartbeat, slot.job_started, self.storage_dir),
+            daemon=True
+        )
+        slot.process.start()
+    
+    def _spawn_on_main_thread(self, slot: _WorkerSlot):
+        """Fork from the event loop's (main) thread; a fork from a helper thread can copy locks it holds"""
+        if threading.current_thread() is threading.main_thread():
+            self._spawn(slot)
+            return
+        spawned = concurrent.futures.Future()
+        
+        def spawn():
+            try:
+                self._spawn(slot)
+                spawned.set_result(None)
+            except Exception as e:
+                spawned.set_exception(e)
+        
+        self._loop.call_soon_threadsafe(spawn)
+        spawned.result()
+    
+    async def submit(self, kind: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Queue a job ("quick" or "research") and wait for a worker's result"""
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._futures[request_id] = future
+        self._task_queue.put((request_id, kind, payload))
+        
+        try:
+            return await asyncio.wait_for(future, timeout if timeout is not None else config.WORKER_REQUEST_TIMEOUT)
+        finally:
+            with self._lock:
+                self._futures.pop(request_id, None)
+    
+    def _resolve(self, request_id: int, result: Dict[str, Any]):
+        with self._lock:
+            future = self._futures.pop(request_id, None)
+            if "error" in result:
+                self.failed += 1
+            else:
+                self.completed += 1
+        if future is not None:
+            self._loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+    
+    def _listen(self):
+        while self._running:
+            try:
+                message, worker_id, value, result = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            slot = self._slots[worker_id]
+            if message == "ready":
+                slot.ready = True
+            elif message == "started":
+                slot.in_flight.add(value)
+            elif message == "result":
+                slot.in_flight.discard(value)
+                self._resolve(value, result)
+            elif message == "stopped":
+                slot.ready = False
+    
+    def _monitor(self):
+        """Restart workers that died, stopped sending heartbeats, or are stuck in one job
+        
+        A job running past WORKER_REQUEST_TIMEOUT has already failed for its
+        caller, so the worker is replaced rather than left holding the slot.
+        """
+        while self._running:
+            time.sleep(config.WORKER_HEARTBEAT_INTERVAL)
+            for slot in self._slots:
+                if not self._running or slot.worker_id in self._restarting:
+                    continue
+                
+                heartbeat_age = time.time() - slot.heartbeat.value
+                job_age = time.time() - slot.job_started.value if slot.job_started.value else 0.0
+                if (
+                    slot.process.is_alive()
+                    and heartbeat_age <= config.WORKER_HEARTBEAT_TIMEOUT
+                    and job_age <= config.WORKER_REQUEST_TIMEOUT
+                ):
+                    continue
+                
+                if slot.process.is_alive():
+                    if heartbeat_age > config.WORKER_HEARTBEAT_TIMEOUT:
+                        print(f"Worker {slot.worker_id} unresponsive for {heartbeat_age:.1f}s, restarting")
+                    else:
+                        print(f"Worker {slot.worker_id} stuck in one job for {job_age:.1f}s, restarting")
+                    slot.process.terminate()
+                    slot.process.join(timeout=5)
+                else:
+                    print(f"Worker {slot.worker_id} exited with code {slot.process.exitcode}, restarting")
+                
+                for request_id in list(slot.in_flight):
+                    self._resolve(request_id, {"error": f"Worker {slot.worker_id} failed while processing request"})
+                slot.in_flight.clear()
+                slot.restarts += 1
+                if self._running:
+                    self._spawn_on_main_thread(slot)
+    
+    def restart(self, timeout: float = config.WORKER_REQUEST_TIMEOUT):
+        """Rolling graceful restart: each worker finishes its current job before being replaced
+        
+        Blocks while workers drain, so call it from a helper thread, never the event loop.
+        """
+        for slot in self._slots:
+            self._restarting.add(slot.worker_id)
+            try:
+                slot.stop_event.set()
+                slot.process.join(timeout=timeout)
+                if slot.process.is_alive():
+                    slot.process.terminate()
+                    slot.process.join(timeout=5)
+                slot.restarts += 1
+                self._spawn_on_main_thread(slot)
+            finally:
+                self._restarting.discard(slot.worker_id)
+    
+    def health(self) -> Dict[str, Any]:
+        now = time.time()
+        workers = [
+            {
+                "worker_id": slot.worker_id,
+                "pid": slot.process.pid if slot.process else None,
+                "alive": bool(slot.process and slot.process.is_alive()),
+                "ready": slot.ready,
+                "heartbeat_age": round(now - slot.heartbeat.value, 2) if slot.heartbeat else None,
+                "job_age": round(now - slot.job_started.value, 2) if slot.job_started and slot.job_started.value else None,
+                "in_flight": len(slot.in_flight),
+                "restarts": slot.restarts
+            }
+            for slot in self._slots
+        ]
+        return {
+            "healthy": all(worker["alive"] for worker in workers),
+            "workers": workers,
+            "pending": len(self._futures),
+            "completed": self.completed,
+            "failed": self.failed
+        }
+    
+    def shutdown(self, timeout: float = 10.0):
+        self._running = False
+        for slot in self._slots:
+            if slot.stop_event is not None:
+                slot.stop_event.set()
+        for slot in self._slots:
+            if slot.process is not None:
+                slot.process.join(timeout=timeout)
+                if slot.process.is_alive():
+                    slot.process.terminate()
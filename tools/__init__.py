@@ -1,9 +1,14 @@
-from .financial_extractor import FinancialMetricsExtractor, create_financial_extractor_tool
-from .fact_verifier import FactVerifier, create_fact_verifier_tool
+from .financial_extractor import FinancialMetricsExtractor, SEGMENT_KEYWORDS, create_financial_extractor_tool
+from .fact_verifier import FactVerifier, SemanticClaimVerifier, extract_numeric_claims, create_fact_verifier_tool
+from .financial_calculator import FinancialCalculator
 
 __all__ = [
     'FinancialMetricsExtractor',
+    'SEGMENT_KEYWORDS',
     'create_financial_extractor_tool',
+    'FinancialCalculator',
     'FactVerifier',
+    'SemanticClaimVerifier',
+    'extract_numeric_claims',
     'create_fact_verifier_tool'
 ]
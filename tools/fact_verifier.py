@@ -1,19 +1,30 @@
-from typing import Dict, Optional
-from llama_index.core.tools import FunctionTool
+from typing import Any, Dict, List, Optional, Sequence, TYPE_CHECKING
 import os
 import re
+import numpy as np
+import config
+
+if TYPE_CHECKING:
+    from llama_index.core.tools import FunctionTool
 
 class FactVerifier:
     def __init__(self, tavily_api_key: Optional[str] = None):
         self.tavily_api_key = tavily_api_key or os.getenv("TAVILY_API_KEY")
-        self.tavily_client = None
-        
-        if self.tavily_api_key and self.tavily_api_key != "your-tavily-api-key-here":
-            try:
-                from tavily import TavilyClient
-                self.tavily_client = TavilyClient(api_key=self.tavily_api_key)
-            except Exception as e:
-                print(f"Tavily not available: {e}")
+        self._tavily_client = None
+        self._tavily_initialized = False
+    
+    @property
+    def tavily_client(self):
+        """Tavily client, created on first internet verification"""
+        if not self._tavily_initialized:
+            self._tavily_initialized = True
+            if self.tavily_api_key and self.tavily_api_key != "your-tavily-api-key-here":
+                try:
+                    from tavily import TavilyClient
+                    self._tavily_client = TavilyClient(api_key=self.tavily_api_key)
+                except Exception as e:
+                    print(f"Tavily not available: {e}")
+        return self._tavily_client
     
     def verify_claim(self, claim: str, context: str) -> Dict[str, any]:
         result = {
@@ -69,7 +80,7 @@ class FactVerifier:
         
         return result
     
-    def verify_with_search(self, claim: str, company: str = "Honeywell") -> Dict[str, any]:
+    def verify_with_search(self, claim: str, company: Optional[str] = None) -> Dict[str, any]:
         if not self.tavily_client:
             return {
                 "claim": claim,
@@ -80,7 +91,7 @@ class FactVerifier:
             }
         
         try:
-            query = f"{company} {claim}"
+            query = f"{company or config.DEFAULT_COMPANY} {claim}"
             response = self.tavily_client.search(query, max_results=3)
             
             results = response.get('results', [])
@@ -109,7 +120,137 @@ class FactVerifier:
             "method": "no_results"
         }
 
-def create_fact_verifier_tool(tavily_api_key: Optional[str] = None) -> FunctionTool:
+CLAIM_NUMBER_PATTERN = re.compile(r'(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(billion|million|B\b|M\b)?', re.IGNORECASE)
+SCALES = {"billion": 1000.0, "b": 1000.0, "million": 1.0, "m": 1.0}
+
+def extract_numeric_claims(texts: Sequence[str], max_claims: int = config.MAX_VERIFIED_CLAIMS) -> List[str]:
+    """Distinct sentences containing a number, in order, across all texts"""
+    claims = []
+    for text in texts:
+        for sentence in re.split(r'(?<=[.!?])\s+|\n', text or ""):
+            sentence = sentence.strip()
+            if any(char.isdigit() for char in sentence) and sentence not in claims:
+                claims.append(sentence)
+    return claims[:max_claims]
+
+def _claim_numbers(text: str) -> List[tuple]:
+    """(value, tolerance) for each number, with billions converted to millions
+    
+    The tolerance is half a unit in the last stated digit, so rounded figures
+    ("$13.6 billion") still agree with the exact ones in the filing ("13,624").
+    Four-digit whole numbers are treated as years and skipped.
+    """
+    numbers = []
+    for match in CLAIM_NUMBER_PATTERN.finditer(text):
+        raw, unit = match.group(1), (match.group(2) or "").lower()
+        if re.fullmatch(r'(19|20)\d{2}', raw) and not unit:
+            continue
+        decimals = len(raw.split('.')[1]) if '.' in raw else 0
+        scale = SCALES.get(unit, 1.0)
+        numbers.append((float(raw.replace(',', '')) * scale, 0.5 * 10 ** -decimals * scale))
+    return numbers
+
+def _context_numbers(text: str) -> np.ndarray:
+    """Every number as written, plus its value in millions when it carries a unit
+    
+    Scaled like the claim numbers, so a claim quoting "$36.7 billion" matches
+    a node that says "$36.7 billion" as well as one that says "36,700".
+    """
+    values = []
+    for match in CLAIM_NUMBER_PATTERN.finditer(text):
+        raw, unit = match.group(1), (match.group(2) or "").lower()
+        value = float(raw.replace(',', ''))
+        values.append(value)
+        if unit:
+            values.append(value * SCALES[unit])
+    return np.asarray(values)
+
+class SemanticClaimVerifier:
+    """Checks claims against the node embeddings already stored in the index
+    
+    All claims are embedded in one batch and scored against every node with a
+    single matrix multiply. A claim's support is the share of its numbers found
+    in the best of its top-matching nodes. No LLM or web calls are made.
+    """
+    
+    def __init__(
+        self,
+        node_ids: Sequence[str],
+        embeddings: np.ndarray,
+        docstore,
+        embed_model=None,
+        top_k: int = 5,
+        support_threshold: float = 0.7
+    ):
+        self.node_ids = list(node_ids)
+        self.embeddings = embeddings
+        self.docstore = docstore
+        self.embed_model = embed_model
+        self.top_k = top_k
+        self.support_threshold = support_threshold
+    
+    @classmethod
+    def from_index(cls, index, vector_backend=None, **kwargs) -> Optional["SemanticClaimVerifier"]:
+        """Reuse the vector backend's matrix, else the simple store's embeddings"""
+        if vector_backend is not None:
+            return cls(vector_backend.node_ids, vector_backend.embeddings, index.docstore, **kwargs)
+        from indexing.vector_backends import export_embeddings
+        node_ids, embeddings = export_embeddings(index)
+        if not node_ids:
+            return None
+        return cls(node_ids, embeddings, index.docstore, **kwargs)
+    
+    def _score(self, claims: List[str], claim_embeddings: List[List[float]]) -> List[Dict[str, Any]]:
+        from indexing.vector_backends import normalize_rows, top_k_indices
+        queries = normalize_rows(np.asarray(claim_embeddings, dtype=np.float32))
+        similarities = queries @ np.asarray(self.embeddings, dtype=np.float32).T
+        
+        results = []
+        for claim, scores in zip(claims, similarities):
+            numbers = _claim_numbers(claim)
+            best_rows = top_k_indices(scores, self.top_k)
+            node_results = []
+            for row in best_rows:
+                node_id = self.node_ids[row]
+                context = _context_numbers(self.docstore.get_node(node_id).get_content())
+                matched = sum(1 for value, tolerance in numbers if np.any(np.abs(context - value) <= tolerance + 1e-9))
+                agreement = matched / len(numbers) if numbers else 0.0
+                node_results.append((agreement, float(scores[row]), matched, node_id))
+            
+            support, similarity, matched, _ = max(node_results, default=(0.0, 0.0, 0, None))
+            supporting = [node_id for score, _, _, node_id in node_results if score > 0]
+            status = "verified" if support >= self.support_threshold else "partially_verified" if support > 0 else "cannot_verify"
+            results.append({
+                "claim": claim,
+                "verified": status == "verified",
+                "confidence": round(support, 2),
+                "similarity": round(similarity, 3),
+                "numbers_matched": f"{matched}/{len(numbers)}",
+                "node_ids": supporting or [self.node_ids[row] for row in best_rows],
+                "method": "semantic_index",
+                "status": status
+            })
+        return results
+    
+    def _get_embed_model(self):
+        if self.embed_model is None:
+            from llama_index.core import Settings
+            self.embed_model = Settings.embed_model
+        return self.embed_model
+    
+    def verify(self, claims: List[str]) -> List[Dict[str, Any]]:
+        if not claims or not self.node_ids:
+            return []
+        return self._score(claims, self._get_embed_model().get_text_embedding_batch(claims))
+    
+    async def averify(self, claims: List[str]) -> List[Dict[str, Any]]:
+        if not claims or not self.node_ids:
+            return []
+        return self._score(claims, await self._get_embed_model().aget_text_embedding_batch(claims))
+
+def create_fact_verifier_tool(tavily_api_key: Optional[str] = None) -> "FunctionTool":
+    from llama_index.core.tools import FunctionTool
+    
     verifier = FactVerifier(tavily_api_key)
     
     def verify_fact(claim: str, context: str = "") -> str:
@@ -0,0 +1,177 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .financial_extractor import SEGMENT_KEYWORDS
+
+SEGMENT_METRICS = ("revenue", "segment_profit", "margin")
+COMPANY_METRICS = ("revenue", "operating_income")
+
+def _to_list(values: np.ndarray, decimals: int = 2) -> List[Optional[float]]:
+    return [None if np.isnan(value) else round(float(value), decimals) for value in values]
+
+class FinancialCalculator:
+    """Exact segment arithmetic over figures extracted from research results
+    
+    Figures are laid out as (segment x year) arrays so margins, YoY changes,
+    basis-point moves and reconciliation residuals are computed in one pass
+    instead of being left to the LLM. A year's segment total is only reconciled
+    against the reported figure when every reportable segment has a value;
+    otherwise it is labelled partial with the segments it covers.
+    """
+    
+    def __init__(self, margin_tolerance_bps: float = 50.0, reportable_segments: Optional[List[str]] = None):
+        self.margin_tolerance_bps = margin_tolerance_bps
+        self.reportable_segments = reportable_segments if reportable_segments is not None else list(SEGMENT_KEYWORDS)
+    
+    @staticmethod
+    def _resolve(figures: List[Dict[str, Any]]) -> Dict[tuple, float]:
+        """One value per (segment, metric, year): the most frequently extracted one"""
+        candidates: Dict[tuple, Counter] = {}
+        for figure in figures:
+            key = (figure["segment"], figure["metric"], figure["year"])
+            candidates.setdefault(key, Counter())[figure["value"]] += 1
+        return {key: counts.most_common(1)[0][0] for key, counts in candidates.items()}
+    
+    def calculate(self, figures: List[Dict[str, Any]]) -> Dict[str, Any]:
+        resolved = self._resolve(figures)
+        segments = sorted({segment for segment, _, _ in resolved if segment})
+        years = sorted({year for _, _, year in resolved})
+        if not years:
+            return {"segments": [], "years": [], "figures_used": 0}
+        
+        year_index = {year: i for i, year in enumerate(years)}
+        segment_index = {segment: i for i, segment in enumerate(segments)}
+        grids = {metric: np.full((len(segments), len(years)), np.nan) for metric in SEGMENT_METRICS}
+        company = {metric: np.full(len(years), np.nan) for metric in COMPANY_METRICS}
+        for (segment, metric, year), value in resolved.items():
+            if segment is None:
+                if metric in company:
+                    company[metric][year_index[year]] = value
+            elif metric in grids:
+                grids[metric][segment_index[segment], year_index[year]] = value
+        
+        revenue = grids["revenue"]
+        profit = grids["segment_profit"]
+        reported_margin = grids["margin"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            computed_margin = np.where(revenue > 0, profit / revenue * 100.0, np.nan)
+            margin = np.where(np.isnan(computed_margin), reported_margin, computed_margin)
+            margin_change_bps = np.diff(margin, axis=1) * 100.0
+            revenue_growth_pct = np.diff(revenue, axis=1) / revenue[:, :-1] * 100.0
+            profit_growth_pct = np.diff(profit, axis=1) / profit[:, :-1] * 100.0
+            margin_discrepancy_bps = np.abs(computed_margin - reported_margin) * 100.0
+        
+        def column_total(grid: np.ndarray) -> np.ndarray:
+            return np.where(np.isnan(grid).all(axis=0), np.nan, np.nansum(grid, axis=0))
+        
+        def covered(grid: np.ndarray) -> List[List[str]]:
+            return [[segments[i] for i in np.flatnonzero(~np.isnan(grid[:, j]))] for j in range(len(years))]
+        
+        def complete(grid: np.ndarray) -> np.ndarray:
+            """Years where every reportable segment has a value"""
+            if any(segment not in segment_index for segment in self.reportable_segments):
+                return np.zeros(len(years), dtype=bool)
+            rows = [segment_index[segment] for segment in self.reportable_segments]
+            return ~np.isnan(grid[rows]).any(axis=0)
+        
+        segment_revenue_total = column_total(revenue)
+        segment_profit_total = column_total(profit)
+        # A residual over a subset of segments is just the missing segments, not an adjustment
+        revenue_residual = np.where(complete(revenue), company["revenue"] - segment_revenue_total, np.nan)
+        profit_residual = np.where(complete(profit), segment_profit_total - company["operating_income"], np.nan)
+        
+        periods = [f"{previous}-{current}" for previous, current in zip(years[:-1], years[1:])]
+        table = {
+            "segments": segments,
+            "years": years,
+            "periods": periods,
+            "figures_used": len(resolved),
+            "by_segment": {
+                segment: {
+                    "revenue": _to_list(revenue[i]),
+                    "segment_profit": _to_list(profit[i]),
+                    "margin_pct": _to_list(margin[i]),
+                    "revenue_growth_pct": _to_list(revenue_growth_pct[i]),
+                    "segment_profit_growth_pct": _to_list(profit_growth_pct[i]),
+                    "margin_change_bps": _to_list(margin_change_bps[i], 0)
+                }
+                for i, segment in enumerate(segments)
+            },
+            "reconciliation": {
+                "reportable_segments": list(self.reportable_segments),
+                "segment_revenue_total": _to_list(segment_revenue_total),
+                "revenue_segments_covered": covered(revenue),
+                "reported_revenue": _to_list(company["revenue"]),
+                "revenue_residual": _to_list(revenue_residual),
+                "segment_profit_total": _to_list(segment_profit_total),
+                "profit_segments_covered": covered(profit),
+                "operating_income": _to_list(company["operating_income"]),
+                # Corporate costs, repositioning and other adjustments bridging the two
+                "profit_to_operating_income_residual": _to_list(profit_residual)
+            },
+            "checks": []
+        }
+        
+        for i, j in zip(*np.nonzero(margin_discrepancy_bps > self.margin_tolerance_bps)):
+            table["checks"].append(
+                f"{segments[i]} {years[j]}: reported margin {reported_margin[i, j]:.1f}% "
+                f"differs from profit/revenue {computed_margin[i, j]:.1f}%"
+            )
+        
+        if periods and segments and not np.isnan(margin_change_bps[:, -1]).all():
+            best = int(np.nanargmax(margin_change_bps[:, -1]))
+            table["largest_margin_improvement"] = {
+                "segment": segments[best],
+                "period": periods[-1],
+                "margin_change_bps": round(float(margin_change_bps[best, -1]))
+            }
+        return table
+    
+    @staticmethod
+    def format_table(table: Dict[str, Any]) -> str:
+        """Plain-text rendering of the computed table for prompts"""
+        if not table.get("segments") and not table.get("years"):
+            return "No figures could be extracted for calculation."
+        
+        def fmt(value, suffix=""):
+            return "n/a" if value is None else f"{value:,}{suffix}"
+        
+        lines = [f"Years: {', '.join(str(year) for year in table['years'])} (USD millions unless noted)"]
+        for segment, row in table["by_segment"].items():
+            lines.append(
+                f"{segment}: revenue {' / '.join(fmt(v) for v in row['revenue'])}, "
+                f"segment profit {' / '.join(fmt(v) for v in row['segment_profit'])}, "
+                f"margin {' / '.join(fmt(v, '%') for v in row['margin_pct'])}"
+            )
+            for k, period in enumerate(table["periods"]):
+                lines.append(
+                    f"  {period}: revenue {fmt(row['revenue_growth_pct'][k], '%')}, "
+                    f"segment profit {fmt(row['segment_profit_growth_pct'][k], '%')}, "
+                    f"margin {fmt(row['margin_change_bps'][k], ' bps')}"
+                )
+        
+        reconciliation = table["reconciliation"]
+        reportable_count = len(reconciliation["reportable_segments"])
+        
+        def residual(value, covered):
+            if value is not None:
+                return f"residual {fmt(value)}"
+            if covered and len(covered) < reportable_count:
+                return f"partial: {', '.join(covered)} of {reportable_count} segments, no residual"
+            return "residual n/a"
+        
+        for j, year in enumerate(table["years"]):
+            lines.append(
+                f"Reconciliation {year}: segment revenue {fmt(reconciliation['segment_revenue_total'][j])} "
+                f"vs reported {fmt(reconciliation['reported_revenue'][j])} "
+                f"({residual(reconciliation['revenue_residual'][j], reconciliation['revenue_segments_covered'][j])}); "
+                f"segment profit {fmt(reconciliation['segment_profit_total'][j])} "
+                f"vs operating income {fmt(reconciliation['operating_income'][j])} "
+                f"({residual(reconciliation['profit_to_operating_income_residual'][j], reconciliation['profit_segments_covered'][j])})"
+            )
+        if table.get("largest_margin_improvement"):
+            best = table["largest_margin_improvement"]
+            lines.append(f"Largest margin improvement {best['period']}: {best['segment']} ({best['margin_change_bps']:+} bps)")
+        for check in table.get("checks", []):
+            lines.append(f"Check: {check}")
+        return "\n".join(lines)
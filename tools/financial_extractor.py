@@ -1,6 +1,40 @@
 import re
-from typing import Dict, List, Optional
-from llama_index.core.tools import FunctionTool
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from llama_index.core.tools import FunctionTool
+
+SEGMENT_KEYWORDS = {
+    'Aerospace': ['Aerospace', 'Aero'],
+    'HBT': ['HBT', 'Building Technologies', 'Honeywell Building'],
+    'PMT': ['PMT', 'Performance Materials', 'Performance Materials and Technologies'],
+    'SPS': ['SPS', 'Safety and Productivity', 'Safety and Productivity Solutions']
+}
+
+METRIC_KEYWORDS = {
+    'segment profit margin': ['segment profit margin', 'segment margin', 'profit margin'],
+    'segment profit': ['segment profit'],
+    'operating margin': ['operating margin'],
+    'operating income': ['operating income'],
+    'net income': ['net income'],
+    'revenue': ['revenue', 'revenues', 'net sales', 'sales'],
+    'earnings per share': ['earnings per share', 'EPS'],
+    'free cash flow': ['free cash flow'],
+    'cash flow': ['operating cash flow', 'cash flow'],
+    'margin': ['margin', 'margins']
+}
+
+YEAR_PATTERN = r'\b(?:19|20)\d{2}\b'
+
+# Metrics the calculation stage works with, keyed by METRIC_KEYWORDS canonical name
+FIGURE_METRICS = {
+    'segment profit margin': 'margin',
+    'margin': 'margin',
+    'segment profit': 'segment_profit',
+    'revenue': 'revenue',
+    'operating income': 'operating_income'
+}
+AMOUNT_PATTERN = r'(\$\s*)?(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(%|billion|million|B\b|M\b)?'
 
 class FinancialMetricsExtractor:
     @staticmethod
@@ -50,13 +84,7 @@ class FinancialMetricsExtractor:
                     "type": "year_over_year"
                 })
         
-        segment_keywords = {
-            'Aerospace': ['Aerospace', 'Aero'],
-            'HBT': ['HBT', 'Building Technologies', 'Honeywell Building'],
-            'PMT': ['PMT', 'Performance Materials', 'Performance Materials and Technologies'],
-            'SPS': ['SPS', 'Safety and Productivity', 'Safety and Productivity Solutions']
-        }
-        for segment_key, keywords in segment_keywords.items():
+        for segment_key, keywords in SEGMENT_KEYWORDS.items():
             if any(keyword in text for keyword in keywords):
                 metrics["segments"].append(segment_key)
         
@@ -70,6 +98,99 @@ class FinancialMetricsExtractor:
         
         return metrics
     
+    @staticmethod
+    def find_entity_mentions(text: str, companies: List[str] = ()) -> List[Dict[str, any]]:
+        """Locate company, segment, metric and year mentions as non-overlapping spans"""
+        vocabularies = [
+            ("company", {company: [company] for company in companies}),
+            ("segment", SEGMENT_KEYWORDS),
+            ("metric", METRIC_KEYWORDS)
+        ]
+        candidates = []
+        for slot_type, vocabulary in vocabularies:
+            for canonical, aliases in vocabulary.items():
+                for alias in aliases:
+                    for match in re.finditer(rf'\b{re.escape(alias)}\b', text, re.IGNORECASE):
+                        candidates.append((match.start(), match.end(), slot_type, canonical))
+        for match in re.finditer(YEAR_PATTERN, text):
+            candidates.append((match.start(), match.end(), "year", match.group(0)))
+        
+        # Longest span wins where mentions overlap (e.g. "segment profit margin" over "margin")
+        candidates.sort(key=lambda c: (c[0], -(c[1] - c[0])))
+        mentions = []
+        last_end = -1
+        for start, end, slot_type, canonical in candidates:
+            if start >= last_end:
+                mentions.append({
+                    "start": start,
+                    "end": end,
+                    "type": slot_type,
+                    "value": canonical,
+                    "text": text[start:end]
+                })
+                last_end = end
+        return mentions
+    
+    @staticmethod
+    def extract_figures(text: str) -> List[Dict[str, any]]:
+        """Segment/company figures as {segment, metric, year, value, unit} records
+        
+        Works sentence by sentence (and table row by row): a sentence may name
+        at most one segment (none = company level). Each supported metric mention
+        starts a clause whose values are paired with the clause's years in order,
+        or with the sentence's single year. Amounts are normalized to USD
+        millions; bare table numbers are assumed to be millions.
+        """
+        figures = []
+        for sentence in re.split(r'\n|\.\s+(?=[A-Z])', text):
+            mentions = FinancialMetricsExtractor.find_entity_mentions(sentence)
+            segments = {m["value"] for m in mentions if m["type"] == "segment"}
+            metric_mentions = [m for m in mentions if m["type"] == "metric" and m["value"] in FIGURE_METRICS]
+            sentence_years = [m for m in mentions if m["type"] == "year"]
+            if len(segments) > 1 or not metric_mentions or not sentence_years:
+                continue
+            segment = next(iter(segments)) if segments else None
+            
+            clause_ends = [m["start"] for m in metric_mentions[1:]] + [len(sentence)]
+            for metric_mention, clause_end in zip(metric_mentions, clause_ends):
+                metric = FIGURE_METRICS[metric_mention["value"]]
+                clause_start = metric_mention["end"]
+                years = [m for m in sentence_years if clause_start <= m["start"] < clause_end]
+                if not years and len(sentence_years) == 1:
+                    years = sentence_years
+                
+                values = []
+                for match in re.finditer(AMOUNT_PATTERN, sentence[clause_start:clause_end]):
+                    position = clause_start + match.start()
+                    if any(m["start"] <= position < m["end"] for m in sentence_years):
+                        continue
+                    currency, number, unit = match.groups()
+                    is_percentage = unit == '%'
+                    if (metric == 'margin') != is_percentage:
+                        continue
+                    value = float(number.replace(',', ''))
+                    if unit in ('billion', 'B'):
+                        value *= 1000
+                    elif not is_percentage and not currency and not unit and ',' not in number:
+                        continue
+                    values.append(value)
+                
+                if len(values) == len(years):
+                    pairs = zip(years, values)
+                elif len(years) == 1 and values:
+                    pairs = [(years[0], values[0])]
+                else:
+                    continue
+                for year, value in pairs:
+                    figures.append({
+                        "segment": segment,
+                        "metric": metric,
+                        "year": int(year["value"]),
+                        "value": value,
+                        "unit": "%" if metric == 'margin' else "USD millions"
+                    })
+        return figures
+    
     @staticmethod
     def parse_financial_table(text: str, segment: str) -> Optional[Dict]:
         result = {
@@ -96,7 +217,9 @@ class FinancialMetricsExtractor:
         
         return result if any(v is not None for k, v in result.items() if k != "segment") else None
 
-def create_financial_extractor_tool() -> FunctionTool:
+def create_financial_extractor_tool() -> "FunctionTool":
+    from llama_index.core.tools import FunctionTool
+    
     extractor = FinancialMetricsExtractor()
     
     def extract_financial_metrics(text: str) -> str:
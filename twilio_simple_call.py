@@ -1,24 +1,33 @@
 #!/usr/bin/env python3
 import os
+import re
+from collections import OrderedDict
 from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse, Gather
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 import uvicorn
 from main import ResearchAssistant
+from voice import prompt_library
 import asyncio
+import config
 
 app = FastAPI()
 assistant = None
+worker_pool = None
 
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 SERVER_URL = os.getenv("SERVER_URL", "http://your-ngrok-url.ngrok.io")
 
+# Uncached text handed to Twilio as an audio URL, rendered when Twilio fetches it (audio key -> text)
+pending_speech = OrderedDict()
+PENDING_SPEECH_MAX = 256
+
 @app.on_event("startup")
 async def startup_event():
-    global assistant
+    global assistant, worker_pool
     
     from llama_index.core import Settings
     from llama_index.llms.openai import OpenAI
@@ -31,14 +40,118 @@ async def startup_event():
     )
     
     assistant = ResearchAssistant()
+    assistant.preload("memory")
+    
+    if config.SERVER_WORKERS > 1:
+        from serving.worker_pool import WorkerPool
+        import signal
+        import threading
+        
+        worker_pool = WorkerPool(num_workers=config.SERVER_WORKERS)
+        worker_pool.start(assistant)
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP,
+            lambda: threading.Thread(target=worker_pool.restart, daemon=True).start()
+        )
+        print(f"Worker pool started with {config.SERVER_WORKERS} workers")
+    else:
+        assistant.preload("document_index", "workflow")
+    
+    if config.TTS_CACHE_WARMUP and assistant.voice_interface.tts.provider.available:
+        asyncio.create_task(warm_up_prompts())
     print("Server ready")
 
+async def warm_up_prompts():
+    from memory.answer_index import document_index_version
+    tts = assistant.voice_interface.tts
+    stats = await prompt_library.warm_up(tts)
+    print(f"Prompt audio cache: {stats['already_cached']} cached, {stats['rendered']} rendered, {stats['failed']} failed")
+    
+    # Recurring questions are answered from the precomputed index, so their answers are worth rendering ahead
+    precomputed_answers = assistant.precomputed_answers
+    if precomputed_answers.is_current(document_index_version()):
+        answers = [prompt_library.spoken_answer(entry["summary"]) for entry in precomputed_answers.entries]
+        stats = await prompt_library.warm_up(tts, answers)
+        print(f"Precomputed answer audio: {stats['already_cached']} cached, {stats['rendered']} rendered, {stats['failed']} failed")
+
+def speak(response: VoiceResponse, text: str, **say_options):
+    """Speak in the TTS provider's voice, from the audio cache or rendered when Twilio fetches it
+    
+    Twilio's own voice (say_options) is only used when no TTS provider is
+    configured, so a call never switches voices between phrases.
+    """
+    tts = assistant.voice_interface.tts
+    if not tts.provider.available:
+        response.say(text, **say_options)
+        return
+    key = tts.cache_key(text)
+    if not tts.is_cached(text):
+        pending_speech[key] = text
+        pending_speech.move_to_end(key)
+        while len(pending_speech) > PENDING_SPEECH_MAX:
+            pending_speech.popitem(last=False)
+    response.play(f"{SERVER_URL}/audio/{key}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if worker_pool is not None:
+        worker_pool.shutdown()
+    if assistant is not None:
+        await assistant.voice_interface.aclose()
+
+@app.get("/audio/{key}")
+async def cached_audio(key: str):
+    tts = assistant.voice_interface.tts
+    audio = tts.cache.get(key) if tts.cache is not None and re.fullmatch(r"[0-9a-f]{64}", key) else None
+    if audio is not None:
+        return Response(content=audio, media_type=tts.media_type)
+    text = pending_speech.get(key)
+    if text is None:
+        return Response(status_code=404)
+    # Streamed as it renders; a complete rendering lands in the cache for the next call
+    return StreamingResponse(tts.synthesize_streaming(text), media_type=tts.media_type)
+
+@app.get("/health")
+async def health():
+    if worker_pool is None:
+        return {"healthy": assistant is not None, "workers": []}
+    return worker_pool.health()
+
+async def research_in_background(query: str, call_sid: str = None):
+    """Run the full workflow off the call path; memory is only written in this process"""
+    if worker_pool is None:
+        await assistant.process_query(query, show_workflow_steps=False, session_id=call_sid)
+        return
+    
+    # The worker only runs the workflow; recall and the answer's turn stay in this process
+    conversation = assistant.conversation_for(call_sid)
+    recall = await conversation.recall(query)
+    assistant.memory.add_to_short_term("user", query)
+    assistant.memory.track_behavior(query, assistant._extract_topic_from_query(query))
+    try:
+        result = await worker_pool.submit("research", {
+            "query": query,
+            "context": assistant.memory.get_context_summary(recall["context"]),
+            "conversation_turns": recall["turns"]
+        })
+    except asyncio.TimeoutError:
+        print(f"Background research timed out: {query[:60]}")
+        return
+    if "error" in result:
+        print(f"Background research failed: {result['error']}")
+        return
+    
+    summary = result.get("summary", "")
+    assistant.memory.add_to_short_term("assistant", summary)
+    await conversation.add_turn(query, summary, result.get("source_nodes", []))
+
 @app.post("/voice")
 async def voice_webhook():
     response = VoiceResponse()
     
-    response.say(
-        "Hi! I'm your Honeywell research assistant. What would you like to know?",
+    speak(
+        response,
+        prompt_library.GREETING,
         voice='Polly.Joanna',
         language='en-US'
     )
@@ -52,40 +165,30 @@ async def voice_webhook():
         timeout=5
     )
     response.append(gather)
-    response.say("I didn't catch that. Feel free to call back anytime. Goodbye!")
+    speak(response, prompt_library.NO_INPUT_GOODBYE)
     
     return Response(content=str(response), media_type="application/xml")
 
 @app.post("/process-speech")
-async def process_speech(request: Request, SpeechResult: str = Form(None)):
+async def process_speech(request: Request, SpeechResult: str = Form(None), CallSid: str = Form(None)):
     import time
     import random
+    from agents.budget import QueryBudget
     
     start_time = time.time()
+    # The spoken answer has to arrive within the voice budget's deadline
+    budget = QueryBudget.resolve("voice")
     response = VoiceResponse()
     
     if not SpeechResult:
-        response.say("I didn't catch that. Please try again.")
+        speak(response, prompt_library.NO_INPUT)
         response.redirect('/voice')
         return Response(content=str(response), media_type="application/xml")
     
     print(f"User: {SpeechResult}")
     
     try:
-        acknowledgments = [
-            "Interesting question! Let me pull that up for you.",
-            "Great question. Give me just a second.",
-            "Absolutely, let me check the report.",
-            "Sure thing! Looking into that now.",
-            "Good question. Let me find that information.",
-            "Hmm, let me see what I can find.",
-            "Alright, checking that for you.",
-            "Perfect, let me grab those details.",
-            "Got it! Pulling up the data now.",
-            "Let me take a look at that."
-        ]
-        
-        response.say(random.choice(acknowledgments), voice='Polly.Joanna', language='en-US')
+        speak(response, random.choice(prompt_library.ACKNOWLEDGMENTS), voice='Polly.Joanna', language='en-US')
         
         query_lower = SpeechResult.lower()
         memory_keywords = ["previous question", "what did i ask", "last question", "earlier question",
@@ -103,30 +206,52 @@ async def process_speech(request: Request, SpeechResult: str = Form(None)):
             assistant.memory.add_to_short_term("user", SpeechResult)
             assistant.memory.add_to_short_term("assistant", answer)
         else:
-            query_engine = assistant.document_index.as_query_engine(
-                llm=assistant.workflow.llm,
-                similarity_top_k=2,
-                response_mode="compact"
-            )
-            
+            precomputed = None
             try:
-                result = query_engine.query(SpeechResult)
+                # The lookup embeds the question, so it counts against the deadline too
+                precomputed = await asyncio.wait_for(assistant.lookup_precomputed(SpeechResult), budget.remaining_seconds)
+                if precomputed is not None:
+                    result = precomputed["summary"]
+                elif worker_pool is not None:
+                    worker_result = await worker_pool.submit("quick", {
+                        "query": SpeechResult,
+                        "similarity_top_k": config.VOICE_RETRIEVAL_MAX_K,
+                        "min_k": config.VOICE_RETRIEVAL_MIN_K
+                    }, timeout=budget.remaining_seconds)
+                    if "error" in worker_result:
+                        raise RuntimeError(worker_result["error"])
+                    result = worker_result["answer"]
+                else:
+                    query_engine = assistant.workflow.create_query_engine(
+                        similarity_top_k=config.VOICE_RETRIEVAL_MAX_K,
+                        min_k=config.VOICE_RETRIEVAL_MIN_K,
+                        response_mode="compact"
+                    )
+                    result = await asyncio.wait_for(query_engine.aquery(SpeechResult), budget.remaining_seconds)
+            except asyncio.TimeoutError:
+                # The background research below still answers it for the conversation
+                print(f"Quick answer exceeded the {budget.deadline_seconds:.1f}s voice budget")
+                result = prompt_library.TIMED_OUT
             except Exception as query_error:
                 print(f"Query error: {query_error}")
-                answer = "I'm having trouble finding that information. Could you try asking differently?"
+                answer = prompt_library.QUERY_FAILED
                 assistant.memory.add_to_short_term("user", SpeechResult)
                 assistant.memory.add_to_short_term("assistant", answer)
-                response.say(answer, voice='Polly.Joanna', language='en-US')
+                speak(response, answer, voice='Polly.Joanna', language='en-US')
                 return Response(content=str(response), media_type="application/xml")
             
-            answer = str(result)[:400]
-            assistant.memory.add_to_short_term("user", SpeechResult)
-            assistant.memory.add_to_short_term("assistant", answer)
-            assistant._extract_and_store_user_preferences(SpeechResult)
-            
-            asyncio.create_task(assistant.process_query(SpeechResult, show_workflow_steps=False))
+            answer = prompt_library.spoken_answer(result)
+            if precomputed is None:
+                assistant.memory.add_to_short_term("user", SpeechResult)
+                assistant.memory.add_to_short_term("assistant", answer)
+                assistant._extract_and_store_user_preferences(SpeechResult)
+                asyncio.create_task(research_in_background(SpeechResult, CallSid))
+            else:
+                # Recorded like a workflow answer (memory, behavior, the call's conversation turn) so
+                # follow-ups work; the turn is embedded off the call path, as research answers are
+                asyncio.create_task(assistant._answer_from_precomputed(SpeechResult, precomputed, False, CallSid))
         
-        response.say(answer, voice='Polly.Joanna', language='en-US')
+        speak(response, answer, voice='Polly.Joanna', language='en-US')
         
         gather = Gather(
             input='speech',
@@ -137,7 +262,7 @@ async def process_speech(request: Request, SpeechResult: str = Form(None)):
             timeout=5
         )
         response.append(gather)
-        response.say("Thank you for using the research assistant. Goodbye!")
+        speak(response, prompt_library.GOODBYE)
         
         print(f"Response time: {time.time() - start_time:.2f}s\n")
         
@@ -148,11 +273,11 @@ async def process_speech(request: Request, SpeechResult: str = Form(None)):
         
         error_msg = str(e).lower()
         if "rate" in error_msg or "quota" in error_msg:
-            response.say("I'm experiencing high demand. Please try again in a moment.")
+            speak(response, prompt_library.RATE_LIMITED)
         elif "timeout" in error_msg:
-            response.say("That's taking longer than expected. Let me try a simpler approach.")
+            speak(response, prompt_library.TIMED_OUT)
         else:
-            response.say("I encountered an issue. Could you rephrase your question?")
+            speak(response, prompt_library.GENERIC_ERROR)
     
     return Response(content=str(response), media_type="application/xml")
 
@@ -184,5 +309,7 @@ if __name__ == "__main__":
         
         make_call(to_number)
     else:
+        if len(sys.argv) > 1 and sys.argv[1] == "serve" and len(sys.argv) > 2:
+            config.SERVER_WORKERS = int(sys.argv[2])
         print("Starting server on http://0.0.0.0:8000")
         uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
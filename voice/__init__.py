@@ -1,5 +1,7 @@
 from .voice_interface import VoiceInterface
 from .stt_handler import STTHandler
 from .tts_handler import TTSHandler
+from .audio_cache import AudioCache
+from .barge_in import VoiceTurn
 
-__all__ = ['VoiceInterface', 'STTHandler', 'TTSHandler']
+__all__ = ['VoiceInterface', 'STTHandler', 'TTSHandler', 'AudioCache', 'VoiceTurn']
@@ -0,0 +1,78 @@
+from typing import Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+class AudioRingBuffer:
+    """Preallocated byte ring for streamed audio; reads return memoryviews instead of copies
+    
+    A read that does not wrap around the end of the ring is a view straight
+    into the storage. A wrapping read is gathered into a preallocated scratch
+    area, so steady-state streaming allocates nothing. Views stay valid until
+    the next write. When a write would overflow, the oldest audio is dropped
+    and counted in overrun_bytes.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._storage = bytearray(capacity)
+        self._scratch = bytearray(capacity)
+        self._view = memoryview(self._storage)
+        self._scratch_view = memoryview(self._scratch)
+        self._start = 0
+        self._size = 0
+        self.overrun_bytes = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def free(self) -> int:
+        return self.capacity - self._size
+    
+    def write(self, data: BytesLike) -> int:
+        """Append audio; returns the number of bytes dropped to make room"""
+        data = memoryview(data).cast("B")
+        dropped = 0
+        if len(data) > self.capacity:
+            dropped += len(data) - self.capacity
+            data = data[-self.capacity:]
+        if len(data) > self.free:
+            dropped += self.skip(len(data) - self.free)
+        self.overrun_bytes += dropped
+        
+        end = (self._start + self._size) % self.capacity
+        first = min(len(data), self.capacity - end)
+        self._view[end:end + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self._size += len(data)
+        return dropped
+    
+    def peek(self, size: int) -> memoryview:
+        """View of the next size bytes (fewer if less is buffered) without consuming them"""
+        size = min(size, self._size)
+        end = self._start + size
+        if end <= self.capacity:
+            return self._view[self._start:end]
+        first = self.capacity - self._start
+        self._scratch_view[:first] = self._view[self._start:]
+        self._scratch_view[first:size] = self._view[:size - first]
+        return self._scratch_view[:size]
+    
+    def skip(self, size: int) -> int:
+        """Consume size bytes without reading them; returns how many were consumed"""
+        size = min(size, self._size)
+        self._start = (self._start + size) % self.capacity
+        self._size -= size
+        if not self._size:
+            self._start = 0
+        return size
+    
+    def read(self, size: int) -> memoryview:
+        """Consume and return up to size bytes (valid until the next write)"""
+        view = self.peek(size)
+        self.skip(len(view))
+        return view
+    
+    def clear(self):
+        self._start = 0
+        self._size = 0
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+import config
+
+def audio_key(text: str, voice_id: str, model_id: str) -> str:
+    """Content address of a rendering: the same text, voice and model always share one entry"""
+    return hashlib.sha256(f"{model_id}\0{voice_id}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+class AudioCache:
+    """Size-bounded LRU cache of synthesized audio on disk
+    
+    Entries are files named by their audio_key. Recency survives restarts
+    through file modification times, which are refreshed on every hit.
+    """
+    
+    def __init__(self, cache_dir: str = config.TTS_CACHE_DIR, max_bytes: int = config.TTS_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in sorted(self.cache_dir.glob("*.audio"), key=lambda path: path.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self._total_bytes += size
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.audio"
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+            return None
+        return audio
+    
+    def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        path = self._path(key)
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporary_path.write_bytes(audio)
+        os.replace(temporary_path, path)
+        with self._lock:
+            self._total_bytes += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_key, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                self.evictions += 1
+                self._path(evicted_key).unlink(missing_ok=True)
+    
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# The voice turn the current task works for; query handlers use it to report cancelled work
+current_turn: ContextVar[Optional["VoiceTurn"]] = ContextVar("current_turn", default=None)
+
+class VoiceTurn:
+    """Work in flight for one voice turn, cancelled together on barge-in
+    
+    Tracks the query task and the TTS stream. Cancelled query handlers add
+    what they abandoned (research tasks, LLM calls) through record().
+    """
+    
+    def __init__(self):
+        self.started = time.monotonic()
+        self.tasks: List[asyncio.Task] = []
+        self.cancelled = False
+        self.cancellation_finished = asyncio.Event()
+        self.tts_text = ""
+        self.tts_bytes = 0
+        self.tts_streaming = False
+        self.report: Dict[str, Any] = {}
+        self._abandoned: Dict[str, Any] = {}
+    
+    def track(self, task: asyncio.Task) -> asyncio.Task:
+        self.tasks.append(task)
+        return task
+    
+    def record(self, abandoned: Dict[str, Any]):
+        self._abandoned.update(abandoned)
+    
+    async def cancel(self) -> Dict[str, Any]:
+        """Cancel the turn's tasks, wait for their cleanup and report the work saved"""
+        if self.cancelled:
+            await self.cancellation_finished.wait()
+            return self.report
+        self.cancelled = True
+        
+        pending_tasks = [task for task in self.tasks if not task.done()]
+        for task in pending_tasks:
+            task.cancel()
+        await asyncio.gather(*pending_tasks, return_exceptions=True)
+        
+        self.report = {
+            "turn_seconds": round(time.monotonic() - self.started, 3),
+            "query_cancelled": bool(pending_tasks),
+            **self._abandoned,
+            "tts_stream_cancelled": self.tts_streaming,
+            "tts_bytes_received": self.tts_bytes,
+            "tts_text_chars": len(self.tts_text)
+        }
+        self.cancellation_finished.set()
+        return self.report
@@ -0,0 +1,63 @@
+import numpy as np
+from .audio_buffer import BytesLike
+
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+TELEPHONY_SAMPLE_RATE = 8000
+
+def _build_decode_table() -> np.ndarray:
+    """G.711 μ-law byte -> 16-bit linear sample, for all 256 codes"""
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+def _build_encode_table() -> np.ndarray:
+    """G.711 μ-law code for every 14-bit linear value (the low 2 bits never affect the code)"""
+    samples = (np.arange(-8192, 8192, dtype=np.int32) << 2)
+    sign = np.where(samples < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(samples), MULAW_CLIP) + MULAW_BIAS
+    exponent = np.floor(np.log2(magnitude >> 7)).astype(np.int32)
+    exponent = np.clip(exponent, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+MULAW_DECODE_TABLE = _build_decode_table()
+MULAW_ENCODE_TABLE = _build_encode_table()
+
+def mulaw_decode(data: BytesLike) -> np.ndarray:
+    """μ-law bytes -> int16 samples (one table lookup per sample, no Python loop)"""
+    return MULAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+def mulaw_encode(samples: np.ndarray) -> bytes:
+    """int16 samples -> μ-law bytes"""
+    return MULAW_ENCODE_TABLE[(samples.astype(np.int32) >> 2) + 8192].tobytes()
+
+def pcm16_samples(data: BytesLike) -> np.ndarray:
+    """Little-endian 16-bit PCM bytes as an int16 view (no copy)"""
+    return np.frombuffer(data, dtype="<i2")
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Resample int16 audio between telephony and STT/TTS rates
+    
+    Integer downsampling averages each group of samples (a cheap low-pass
+    against aliasing); everything else is linear interpolation.
+    """
+    if from_rate == to_rate or not len(samples):
+        return samples
+    if from_rate % to_rate == 0:
+        factor = from_rate // to_rate
+        usable = len(samples) - len(samples) % factor
+        return samples[:usable].reshape(-1, factor).mean(axis=1).astype(np.int16)
+    num_out = len(samples) * to_rate // from_rate
+    positions = np.arange(num_out) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+def mulaw_to_pcm(data: BytesLike, to_rate: int, from_rate: int = TELEPHONY_SAMPLE_RATE) -> bytes:
+    """Telephony μ-law (8 kHz) -> 16-bit PCM at the STT rate"""
+    return resample(mulaw_decode(data), from_rate, to_rate).tobytes()
+
+def pcm_to_mulaw(data: BytesLike, from_rate: int, to_rate: int = TELEPHONY_SAMPLE_RATE) -> bytes:
+    """16-bit PCM from TTS -> telephony μ-law (8 kHz)"""
+    return mulaw_encode(resample(pcm16_samples(data), from_rate, to_rate))
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Dict, List, Optional
+
+GREETING = "Hi! I'm your Honeywell research assistant. What would you like to know?"
+
+ACKNOWLEDGMENTS = [
+    "Interesting question! Let me pull that up for you.",
+    "Great question. Give me just a second.",
+    "Absolutely, let me check the report.",
+    "Sure thing! Looking into that now.",
+    "Good question. Let me find that information.",
+    "Hmm, let me see what I can find.",
+    "Alright, checking that for you.",
+    "Perfect, let me grab those details.",
+    "Got it! Pulling up the data now.",
+    "Let me take a look at that."
+]
+
+NO_INPUT = "I didn't catch that. Please try again."
+NO_INPUT_GOODBYE = "I didn't catch that. Feel free to call back anytime. Goodbye!"
+GOODBYE = "Thank you for using the research assistant. Goodbye!"
+QUERY_FAILED = "I'm having trouble finding that information. Could you try asking differently?"
+RATE_LIMITED = "I'm experiencing high demand. Please try again in a moment."
+TIMED_OUT = "That's taking longer than expected. Let me try a simpler approach."
+GENERIC_ERROR = "I encountered an issue. Could you rephrase your question?"
+
+# Calls read out at most this much of an answer
+SPOKEN_ANSWER_MAX_CHARS = 400
+
+def spoken_answer(answer) -> str:
+    """The part of an answer read out on a call, as rendered and cached"""
+    return str(answer)[:SPOKEN_ANSWER_MAX_CHARS]
+
+def static_prompts() -> List[str]:
+    """Every fixed phrase the voice server speaks"""
+    return [
+        GREETING,
+        *ACKNOWLEDGMENTS,
+        NO_INPUT,
+        NO_INPUT_GOODBYE,
+        GOODBYE,
+        QUERY_FAILED,
+        RATE_LIMITED,
+        TIMED_OUT,
+        GENERIC_ERROR
+    ]
+
+async def warm_up(tts, phrases: Optional[List[str]] = None, concurrency: int = 4) -> Dict[str, int]:
+    """Pre-render phrases into the TTS audio cache; already cached phrases cost nothing"""
+    phrases = static_prompts() if phrases is None else phrases
+    missing = [phrase for phrase in phrases if not tts.is_cached(phrase)]
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def render(phrase: str) -> bool:
+        async with semaphore:
+            return bool(await tts.synthesize(phrase))
+    
+    rendered = await asyncio.gather(*[render(phrase) for phrase in missing])
+    return {
+        "phrases": len(phrases),
+        "already_cached": len(phrases) - len(missing),
+        "rendered": sum(rendered),
+        "failed": len(missing) - sum(rendered)
+    }
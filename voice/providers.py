@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import itertools
+import os
+from importlib import import_module
+from typing import AsyncGenerator, List, Optional
+import numpy as np
+import config
+from .vad import pcm_to_wav
+
+def _wav_content_type(audio: bytes) -> str:
+    return "audio/wav" if audio[:4] == b"RIFF" else "application/octet-stream"
+
+class PooledHTTPProvider:
+    """Base for HTTP provider adapters: one pooled, keepalive httpx.AsyncClient per event loop
+    
+    The client is created on first request in the running loop and replaced
+    if the adapter is later used from another loop (e.g. a new asyncio.run).
+    """
+    
+    base_url = ""
+    
+    def __init__(self, timeout: float, connect_timeout: float = config.PROVIDER_CONNECT_TIMEOUT):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._http = None
+        self._http_loop = None
+    
+    def _headers(self) -> dict:
+        return {}
+    
+    @property
+    def http(self):
+        import httpx
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http_loop is not loop or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers(),
+                limits=httpx.Limits(
+                    max_connections=config.PROVIDER_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=config.PROVIDER_KEEPALIVE_SECONDS
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+            )
+            self._http_loop = loop
+        return self._http
+    
+    async def aclose(self):
+        if self._http is not None and self._http_loop is asyncio.get_running_loop():
+            await self._http.aclose()
+        self._http = None
+
+class DeepgramSTT(PooledHTTPProvider):
+    """Deepgram pre-recorded transcription over the REST API"""
+    
+    base_url = "https://api.deepgram.com"
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "nova-2",
+        language: str = "en-US",
+        timeout: float = config.STT_TIMEOUT_SECONDS
+    ):
+        super().__init__(timeout)
+        self.api_key = api_key or os.getenv("DEEPGRAM_API_KEY")
+        self.model = model
+        self.language = language
+    
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+    
+    def _headers(self) -> dict:
+        return {"Authorization": f"Token {self.api_key}"}
+    
+    async def transcribe(self, audio: bytes) -> str:
+        response = await self.http.post(
+            "/v1/listen",
+            params={"model": self.model, "smart_format": "true", "language": self.language},
+            headers={"Content-Type": _wav_content_type(audio)},
+            content=audio
+        )
+        response.raise_for_status()
+        return response.json()["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+class ElevenLabsTTS(PooledHTTPProvider):
+    """ElevenLabs streaming synthesis over the REST API"""
+    
+    base_url = "https://api.elevenlabs.io"
+    media_type = "audio/mpeg"
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        model_id: str = config.TTS_MODEL_ID,
+        timeout: float = config.TTS_TIMEOUT_SECONDS,
+        chunk_bytes: int = config.TTS_CACHE_CHUNK_BYTES
+    ):
+        super().__init__(timeout)
+        self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
+        self.voice_id = voice_id or os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+        self.model_id = model_id
+        self.chunk_bytes = chunk_bytes
+    
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+    
+    def _headers(self) -> dict:
+        return {"xi-api-key": self.api_key, "Accept": self.media_type}
+    
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        """Audio chunks as they arrive; closing the generator ends the HTTP stream"""
+        async with self.http.stream(
+            "POST",
+            f"/v1/text-to-speech/{self.voice_id}/stream",
+            json={"text": text, "model_id": self.model_id}
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(self.chunk_bytes):
+                yield chunk
+    
+    async def synthesize(self, text: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(text)])
+
+class OfflineSTT:
+    """Canned transcripts with simulated latency, for load tests without Deepgram"""
+    
+    available = True
+    
+    def __init__(self, transcripts: Optional[List[str]] = None, latency: float = config.OFFLINE_STT_LATENCY, **kwargs):
+        # kwargs: credentials and options meant for real providers are ignored
+        self.transcripts = transcripts or config.OFFLINE_TRANSCRIPTS
+        self.latency = latency
+        self._next = itertools.cycle(range(len(self.transcripts)))
+        self.calls = 0
+    
+    async def transcribe(self, audio: bytes) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.transcripts[next(self._next)]
+    
+    async def aclose(self):
+        pass
+
+class OfflineTTS:
+    """Synthetic speech-length WAV audio with simulated first-chunk latency, for load tests
+    
+    Duration follows the text at about SECONDS_PER_WORD and the tone is
+    derived from the text, so renderings are deterministic and cacheable.
+    """
+    
+    SECONDS_PER_WORD = 0.35
+    media_type = "audio/wav"
+    available = True
+    
+    def __init__(
+        self,
+        voice_id: str = "synthetic",
+        model_id: str = "offline-tone",
+        sample_rate: int = config.STT_SAMPLE_RATE,
+        first_chunk_latency: float = config.OFFLINE_TTS_FIRST_CHUNK_LATENCY,
+        chunk_bytes: int = config.TTS_CACHE_CHUNK_BYTES,
+        **kwargs
+    ):
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.sample_rate = sample_rate
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_bytes = chunk_bytes
+        self.calls = 0
+    
+    def render(self, text: str) -> bytes:
+        seconds = max(len(text.split()), 1) * self.SECONDS_PER_WORD
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        pitch = 120 + int(hashlib.sha256(text.encode()).hexdigest()[:4], 16) % 120
+        samples = 8000 * np.sin(2 * np.pi * pitch * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+        return pcm_to_wav(samples.astype("<i2").tobytes(), self.sample_rate)
+    
+    async def stream(self, text: str) -> AsyncGenerator[bytes, None]:
+        self.calls += 1
+        if self.first_chunk_latency:
+            await asyncio.sleep(self.first_chunk_latency)
+        audio = self.render(text)
+        for start in range(0, len(audio), self.chunk_bytes):
+            yield audio[start:start + self.chunk_bytes]
+            await asyncio.sleep(0)
+    
+    async def synthesize(self, text: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(text)])
+    
+    async def aclose(self):
+        pass
+
+# Provider name -> (module, class, default constructor params)
+STT_PROVIDERS = {
+    "deepgram": ("voice.providers", "DeepgramSTT", {}),
+    "offline": ("voice.providers", "OfflineSTT", {})
+}
+TTS_PROVIDERS = {
+    "elevenlabs": ("voice.providers", "ElevenLabsTTS", {}),
+    "offline": ("voice.providers", "OfflineTTS", {})
+}
+
+def _create(registry: dict, kind: str, name: str, params: dict):
+    if name not in registry:
+        raise ValueError(f"Unknown {kind} provider '{name}'; available: {', '.join(sorted(registry))}")
+    module_name, class_name, default_params = registry[name]
+    provider_cls = getattr(import_module(module_name), class_name)
+    return provider_cls(**{**default_params, **{key: value for key, value in params.items() if value is not None}})
+
+def create_stt_provider(name: str = config.STT_PROVIDER, **params):
+    return _create(STT_PROVIDERS, "STT", name, params)
+
+def create_tts_provider(name: str = config.TTS_PROVIDER, **params):
+    return _create(TTS_PROVIDERS, "TTS", name, params)
@@ -1,53 +1,75 @@
-import asyncio
-from typing import Optional, Callable
-import os
+import time
+from typing import Any, Dict, Optional, Callable
+import config
+from .providers import create_stt_provider
+from .vad import VoiceActivityDetector, pcm_to_wav
 
 class STTHandler:
-    """Speech-to-Text handler using Deepgram"""
+    """Speech-to-Text handler over the configured STT provider (Deepgram by default)"""
     
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv("DEEPGRAM_API_KEY")
-        self.client = None
-        
-        if self.api_key:
-            try:
-                from deepgram import DeepgramClient
-                self.client = DeepgramClient(api_key=self.api_key)
-            except Exception as e:
-                pass  # Deepgram not available
+    def __init__(self, api_key: Optional[str] = None, provider=None):
+        self.api_key = api_key
+        self._provider = provider
+        self.last_latency = 0.0
+    
+    @property
+    def provider(self):
+        """STT provider adapter from config.STT_PROVIDER, created on first transcription"""
+        if self._provider is None:
+            self._provider = create_stt_provider(config.STT_PROVIDER, api_key=self.api_key)
+        return self._provider
     
     async def transcribe_audio(self, audio_data: bytes) -> str:
         """Transcribe audio bytes to text"""
-        if not self.client:
+        if not self.provider.available:
             return "[STT not available]"
         
         try:
-            # Deepgram SDK v5+ API
-            options = {
-                "model": "nova-2",
-                "smart_format": True,
-                "language": "en-US"
-            }
-            response = self.client.listen.rest.v("1").transcribe_file(
-                {"buffer": audio_data},
-                options
-            )
-            
-            transcript = response["results"]["channels"][0]["alternatives"][0]["transcript"]
-            return transcript
+            return await self.provider.transcribe(audio_data)
         except Exception as e:
             return f"[Transcription error: {str(e)}]"
     
-    async def transcribe_stream(self, audio_stream, callback: Callable[[str], None]):
-        if not self.client:
+    async def transcribe_stream(
+        self,
+        audio_stream,
+        callback: Callable[[str], None],
+        on_speech_start: Optional[Callable[[], None]] = None,
+        vad: Optional[VoiceActivityDetector] = None
+    ) -> Dict[str, Any]:
+        """Transcribe streamed 16-bit mono PCM one utterance at a time
+        
+        Local VAD drops silence and holds audio until the speaker pauses, so
+        each STT call gets one complete utterance and callback fires as soon
+        as it is transcribed. on_speech_start is called at each speech onset
+        (e.g. to barge in on playback). Returns VAD and STT call counts.
+        """
+        if not self.provider.available:
             callback("[STT not available]")
-            return
+            return {}
+        
+        vad = vad or VoiceActivityDetector()
+        stt_calls = 0
+        
+        async def handle(events):
+            nonlocal stt_calls
+            for event in events:
+                if event["type"] == "speech_start":
+                    if on_speech_start:
+                        on_speech_start()
+                    continue
+                stt_calls += 1
+                stt_start = time.time()
+                text = await self.transcribe_audio(pcm_to_wav(event["audio"], vad.sample_rate))
+                self.last_latency = time.time() - stt_start
+                if text.strip():
+                    callback(text)
         
-        buffer = bytearray()
         async for chunk in audio_stream:
-            buffer.extend(chunk)
-            
-            if len(buffer) > 32000:
-                text = await self.transcribe_audio(bytes(buffer))
-                callback(text)
-                buffer.clear()
+            await handle(vad.process(chunk))
+        await handle(vad.flush())
+        return {**vad.stats(), "stt_calls": stt_calls}
+    
+    async def aclose(self):
+        """Release the provider's pooled connections"""
+        if self._provider is not None:
+            await self._provider.aclose()
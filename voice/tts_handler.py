@@ -1,58 +1,148 @@
 import asyncio
-from typing import Optional, AsyncGenerator
-import os
+from typing import Any, AsyncGenerator, Dict, Optional
+import config
+from .audio_cache import AudioCache, audio_key
+from .providers import create_tts_provider
 
 class TTSHandler:
-    """Text-to-Speech handler using ElevenLabs"""
+    """Text-to-Speech handler over the configured TTS provider (ElevenLabs by default)
     
-    def __init__(self, api_key: Optional[str] = None, voice_id: Optional[str] = None):
-        self.api_key = api_key or os.getenv("ELEVENLABS_API_KEY")
-        self.voice_id = voice_id or os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
-        self.client = None
-        
-        if self.api_key:
-            try:
-                from elevenlabs.client import ElevenLabs
-                self.client = ElevenLabs(api_key=self.api_key)
-            except Exception as e:
-                pass  # ElevenLabs not available
+    Renderings are kept in a content-addressed audio cache (text + voice +
+    model), so repeated phrases are served from disk without a network call.
+    """
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        voice_id: Optional[str] = None,
+        model_id: Optional[str] = None,
+        cache: Optional[AudioCache] = None,
+        provider=None
+    ):
+        self.api_key = api_key
+        self._voice_id = voice_id
+        self._model_id = model_id
+        self._provider = provider
+        self._cache = cache
+        # Stream -> its pending chunk read, cancelled on interruption
+        self._active_streams: Dict[Any, Optional[asyncio.Future]] = {}
+        self._interrupted_streams = set()
+    
+    @property
+    def provider(self):
+        """TTS provider adapter from config.TTS_PROVIDER, created on first use"""
+        if self._provider is None:
+            self._provider = create_tts_provider(
+                config.TTS_PROVIDER,
+                api_key=self.api_key,
+                voice_id=self._voice_id,
+                model_id=self._model_id
+            )
+        return self._provider
+    
+    @property
+    def voice_id(self) -> str:
+        return self.provider.voice_id
+    
+    @property
+    def model_id(self) -> str:
+        return self.provider.model_id
+    
+    @property
+    def media_type(self) -> str:
+        return self.provider.media_type
+    
+    @property
+    def cache(self) -> Optional[AudioCache]:
+        """Audio cache, opened on first use (None when TTS_CACHE_MAX_BYTES is 0)"""
+        if self._cache is None and config.TTS_CACHE_MAX_BYTES > 0:
+            self._cache = AudioCache()
+        return self._cache
+    
+    def cache_key(self, text: str) -> str:
+        return audio_key(text, self.voice_id, self.model_id)
+    
+    def is_cached(self, text: str) -> bool:
+        return self.cache is not None and self.cache_key(text) in self.cache
+    
+    def cached_audio(self, text: str) -> Optional[bytes]:
+        return self.cache.get(self.cache_key(text)) if self.cache is not None else None
     
     async def synthesize_streaming(self, text: str) -> AsyncGenerator[bytes, None]:
         """Stream TTS audio for low latency"""
-        if not self.client:
+        cached = self.cached_audio(text)
+        if cached is not None:
+            for start in range(0, len(cached), config.TTS_CACHE_CHUNK_BYTES):
+                yield cached[start:start + config.TTS_CACHE_CHUNK_BYTES]
+            return
+        
+        if not self.provider.available:
             yield b"[TTS not available]"
             return
         
         try:
-            # ElevenLabs v1+ streaming API
-            audio_stream = self.client.text_to_speech.convert_as_stream(
-                voice_id=self.voice_id,
-                text=text,
-                model_id="eleven_turbo_v2"
-            )
+            audio_stream = self.provider.stream(text)
+            audio_chunks = []
+            self._active_streams[audio_stream] = None
+            try:
+                while True:
+                    read = asyncio.ensure_future(audio_stream.__anext__())
+                    self._active_streams[audio_stream] = read
+                    try:
+                        chunk = await read
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.CancelledError:
+                        # handle_interruption cancelled the read; anything else is our own cancellation
+                        if audio_stream not in self._interrupted_streams:
+                            raise
+                        break
+                    if audio_stream in self._interrupted_streams:
+                        break
+                    audio_chunks.append(chunk)
+                    yield chunk
+            finally:
+                # Closing the provider stream ends the HTTP response, so an abandoned rendering stops generating
+                self._active_streams.pop(audio_stream, None)
+                await audio_stream.aclose()
             
-            for chunk in audio_stream:
-                yield chunk
+            # Only complete renderings are cached
+            if audio_stream in self._interrupted_streams:
+                self._interrupted_streams.discard(audio_stream)
+            elif self.cache is not None:
+                self.cache.put(self.cache_key(text), b"".join(audio_chunks))
                 
         except Exception as e:
             yield b""
     
     async def synthesize(self, text: str) -> bytes:
         """Generate complete audio (non-streaming)"""
-        if not self.client:
+        cached = self.cached_audio(text)
+        if cached is not None:
+            return cached
+        
+        if not self.provider.available:
             return b""
         
         try:
-            audio = self.client.text_to_speech.convert(
-                voice_id=self.voice_id,
-                text=text,
-                model_id="eleven_turbo_v2"
-            )
-            return b"".join(audio)
+            audio = await self.provider.synthesize(text)
         except Exception as e:
             return b""
+        if self.cache is not None:
+            self.cache.put(self.cache_key(text), audio)
+        return audio
+    
+    def handle_interruption(self) -> int:
+        """Stop every in-flight synthesis stream; returns how many were cancelled"""
+        interrupted = list(self._active_streams.items())
+        for audio_stream, read in interrupted:
+            self._interrupted_streams.add(audio_stream)
+            if read is not None:
+                read.cancel()
+        self._active_streams.clear()
+        return len(interrupted)
     
-    def handle_interruption(self):
-        """Handle voice interruption"""
-        # In production, this would stop current audio playback
-        pass
+    async def aclose(self):
+        """Release the provider's pooled connections"""
+        if self._provider is not None:
+            await self._provider.aclose()
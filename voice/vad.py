@@ -0,0 +1,209 @@
+import io
+import wave
+from typing import Any, Dict, List, Optional
+import numpy as np
+import config
+from .audio_buffer import AudioRingBuffer, BytesLike
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap 16-bit mono PCM in a WAV container so STT needs no encoding hints"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    return buffer.getvalue()
+
+def frame_features(frames: np.ndarray) -> tuple:
+    """Per-frame energy (dBFS) and zero-crossing rate for a (num_frames, frame_length) array"""
+    samples = frames.astype(np.float32) / 32768.0
+    energy_db = 10.0 * np.log10(np.mean(samples * samples, axis=1) + 1e-10)
+    signs = np.signbit(samples)
+    zero_crossing_rate = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy_db, zero_crossing_rate
+
+class FrameRing:
+    """Fixed-capacity ring of the most recent frames (pre-roll kept before speech onset)"""
+    
+    def __init__(self, capacity: int, frame_length: int):
+        self._frames = np.zeros((max(capacity, 1), frame_length), dtype=np.int16)
+        self._start = 0
+        self._size = 0
+    
+    @property
+    def capacity(self) -> int:
+        return len(self._frames)
+    
+    def push(self, frame: np.ndarray):
+        capacity = len(self._frames)
+        self._frames[(self._start + self._size) % capacity] = frame
+        if self._size < capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % capacity
+    
+    def drain_into(self, target: np.ndarray) -> int:
+        """Copy the frames, oldest first, into the rows of target; the ring is empty afterwards"""
+        capacity = len(self._frames)
+        first = min(self._size, capacity - self._start)
+        target[:first] = self._frames[self._start:self._start + first]
+        target[first:self._size] = self._frames[:self._size - first]
+        size = self._size
+        self._start = 0
+        self._size = 0
+        return size
+
+class VoiceActivityDetector:
+    """Energy / zero-crossing voice activity detection and endpointing for 16-bit mono PCM
+    
+    Frame features are computed for a whole chunk at once. A frame is speech
+    when its energy clears both an absolute floor and the adaptive noise
+    floor by a margin, and it is not broadband noise (high zero-crossing rate
+    at low energy). Onset needs min_speech_ms of consecutive speech; the
+    utterance ends after hangover_ms of non-speech, so short pauses between
+    words do not split it.
+    """
+    
+    def __init__(
+        self,
+        sample_rate: int = config.STT_SAMPLE_RATE,
+        frame_ms: int = config.VAD_FRAME_MS,
+        energy_margin_db: float = config.VAD_ENERGY_MARGIN_DB,
+        min_energy_dbfs: float = config.VAD_MIN_ENERGY_DBFS,
+        hangover_ms: int = config.VAD_HANGOVER_MS,
+        min_speech_ms: int = config.VAD_MIN_SPEECH_MS,
+        pre_roll_ms: int = config.VAD_PRE_ROLL_MS,
+        min_utterance_ms: int = config.VAD_MIN_UTTERANCE_MS,
+        max_utterance_seconds: float = config.VAD_MAX_UTTERANCE_SECONDS
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.frame_seconds = frame_ms / 1000
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_dbfs = min_energy_dbfs
+        self.hangover_frames = max(hangover_ms // frame_ms, 1)
+        self.min_speech_frames = max(min_speech_ms // frame_ms, 1)
+        self.min_utterance_frames = max(min_utterance_ms // frame_ms, 1)
+        self.max_utterance_frames = int(max_utterance_seconds / self.frame_seconds)
+        
+        self.noise_floor_db = min_energy_dbfs - energy_margin_db
+        # Incoming audio is framed straight out of a preallocated ring; frames kept
+        # across chunks are copied into the preallocated pre-roll, onset and utterance arrays
+        self._input = AudioRingBuffer(int(config.AUDIO_BUFFER_SECONDS * sample_rate) * 2)
+        self._pre_roll = FrameRing(max(pre_roll_ms // frame_ms, 1), self.frame_length)
+        self._onset = np.zeros((self.min_speech_frames, self.frame_length), dtype=np.int16)
+        self._onset_count = 0
+        self._utterance = np.zeros((self.max_utterance_frames + self._pre_roll.capacity + self.min_speech_frames, self.frame_length), dtype=np.int16)
+        self._utterance_count = 0
+        self._pre_roll_frames = 0
+        self._in_speech = False
+        self._silent_run = 0
+        self._frame_index = 0
+        self._utterance_start_frame = 0
+        
+        self.frames_processed = 0
+        self.speech_frames = 0
+        self.utterances = 0
+    
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        energy_db, zero_crossing_rate = frame_features(frames)
+        threshold = max(self.noise_floor_db + self.energy_margin_db, self.min_energy_dbfs)
+        # Fricatives cross zero often but are loud; quiet frames that do are noise
+        is_speech = (energy_db > threshold) & ((zero_crossing_rate < 0.4) | (energy_db > threshold + 10.0))
+        
+        quiet = energy_db[~is_speech]
+        if len(quiet):
+            # Track the noise floor from non-speech frames only; rise slowly, fall quickly
+            observed = float(np.median(quiet))
+            rate = 0.05 if observed > self.noise_floor_db else 0.5
+            self.noise_floor_db += rate * (observed - self.noise_floor_db)
+        return is_speech
+    
+    def process(self, chunk: BytesLike) -> List[Dict[str, Any]]:
+        """Feed PCM bytes; returns speech_start and utterance events in order"""
+        chunk = memoryview(chunk).cast("B")
+        frame_bytes = self.frame_length * 2
+        events = []
+        while len(chunk):
+            # Chunks larger than the ring are framed in pieces rather than overrunning it
+            room = self._input.free
+            self._input.write(chunk[:room])
+            chunk = chunk[room:]
+            num_frames = len(self._input) // frame_bytes
+            if num_frames:
+                view = self._input.read(num_frames * frame_bytes)
+                events.extend(self._process_frames(np.frombuffer(view, dtype="<i2").reshape(num_frames, self.frame_length)))
+        return events
+    
+    def _process_frames(self, frames: np.ndarray) -> List[Dict[str, Any]]:
+        is_speech = self._classify(frames)
+        self.frames_processed += len(frames)
+        self.speech_frames += int(is_speech.sum())
+        
+        events = []
+        for frame, speech in zip(frames, is_speech):
+            self._frame_index += 1
+            if not self._in_speech:
+                if speech:
+                    self._onset[self._onset_count] = frame
+                    self._onset_count += 1
+                    if self._onset_count >= self.min_speech_frames:
+                        self._in_speech = True
+                        self._silent_run = 0
+                        self._pre_roll_frames = self._pre_roll.drain_into(self._utterance)
+                        self._utterance_count = self._pre_roll_frames + self._onset_count
+                        self._utterance[self._pre_roll_frames:self._utterance_count] = self._onset[:self._onset_count]
+                        self._utterance_start_frame = self._frame_index - self._utterance_count
+                        self._onset_count = 0
+                        events.append({"type": "speech_start", "time": round(self._utterance_start_frame * self.frame_seconds, 3)})
+                else:
+                    for onset_frame in self._onset[:self._onset_count]:
+                        self._pre_roll.push(onset_frame)
+                    self._onset_count = 0
+                    self._pre_roll.push(frame)
+                continue
+            
+            self._utterance[self._utterance_count] = frame
+            self._utterance_count += 1
+            self._silent_run = 0 if speech else self._silent_run + 1
+            if self._silent_run >= self.hangover_frames or self._utterance_count - self._pre_roll_frames >= self.max_utterance_frames:
+                event = self._end_utterance()
+                if event is not None:
+                    events.append(event)
+        return events
+    
+    def _end_utterance(self) -> Optional[Dict[str, Any]]:
+        # Keep a little of the trailing silence; drop the rest of the hangover
+        trailing = max(self._silent_run - self.hangover_frames // 4, 0)
+        num_frames = self._utterance_count - trailing
+        self._in_speech = False
+        self._silent_run = 0
+        self._utterance_count = 0
+        if num_frames - self._pre_roll_frames < self.min_utterance_frames:
+            return None
+        self.utterances += 1
+        start = self._utterance_start_frame * self.frame_seconds
+        return {
+            "type": "utterance",
+            # The one copy per utterance: the event outlives the preallocated array's contents
+            "audio": self._utterance[:num_frames].tobytes(),
+            "start": round(start, 3),
+            "end": round(start + num_frames * self.frame_seconds, 3)
+        }
+    
+    def flush(self) -> List[Dict[str, Any]]:
+        """End of stream: close any utterance still open"""
+        if not self._in_speech:
+            return []
+        self._silent_run = 0
+        event = self._end_utterance()
+        return [event] if event is not None else []
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "utterances": self.utterances,
+            "audio_seconds": round(self.frames_processed * self.frame_seconds, 2),
+            "speech_seconds": round(self.speech_frames * self.frame_seconds, 2),
+            "noise_floor_dbfs": round(self.noise_floor_db, 1)
+        }
@@ -1,15 +1,30 @@
 import asyncio
 import time
 from typing import Optional, Callable
+from .barge_in import VoiceTurn, current_turn
 from .stt_handler import STTHandler
 from .tts_handler import TTSHandler
 
 class VoiceInterface:
     def __init__(self):
-        self.stt = STTHandler()
-        self.tts = TTSHandler()
+        self._stt = None
+        self._tts = None
         self.is_speaking = False
         self.interrupted = False
+        self._turn: Optional[VoiceTurn] = None
+        self.last_barge_in: Optional[dict] = None
+    
+    @property
+    def stt(self) -> STTHandler:
+        if self._stt is None:
+            self._stt = STTHandler()
+        return self._stt
+    
+    @property
+    def tts(self) -> TTSHandler:
+        if self._tts is None:
+            self._tts = TTSHandler()
+        return self._tts
     
     async def process_voice_query(
         self, 
@@ -18,13 +33,75 @@ class VoiceInterface:
         on_response: Optional[Callable] = None
     ) -> dict:
         start_time = time.time()
-        
         stt_start = time.time()
         text_query = await self.stt.transcribe_audio(audio_data)
         stt_latency = time.time() - stt_start
+        return await self._respond(text_query, query_handler, on_response, start_time, stt_latency)
+    
+    async def process_voice_stream(
+        self,
+        audio_stream,
+        query_handler: Callable,
+        on_response: Optional[Callable] = None
+    ) -> dict:
+        """Hands-free conversation over streamed PCM
+        
+        Each utterance starts a turn as soon as the caller stops speaking;
+        speech starting while a turn is still running barges in on it.
+        Returns the turn results in order plus the VAD/STT stats.
+        """
+        turns = []
+        
+        def on_speech_start():
+            if any(not task.done() for task in turns):
+                asyncio.get_running_loop().create_task(self.barge_in())
+        
+        def on_utterance(text_query: str):
+            start_time = time.time() - self.stt.last_latency
+            turns.append(asyncio.get_running_loop().create_task(
+                self._respond(text_query, query_handler, on_response, start_time, self.stt.last_latency)
+            ))
+        
+        stats = await self.stt.transcribe_stream(audio_stream, on_utterance, on_speech_start=on_speech_start)
+        results = await asyncio.gather(*turns)
+        return {"turns": list(results), "stream": stats}
+    
+    async def _respond(
+        self,
+        text_query: str,
+        query_handler: Callable,
+        on_response: Optional[Callable],
+        start_time: float,
+        stt_latency: float
+    ) -> dict:
+        turn = VoiceTurn()
+        self._turn = turn
+        self.interrupted = False
         
         process_start = time.time()
-        response = await query_handler(text_query)
+        # The query task inherits current_turn, so a cancelled handler can report what it abandoned
+        turn_token = current_turn.set(turn)
+        try:
+            query_task = turn.track(asyncio.create_task(query_handler(text_query)))
+        finally:
+            current_turn.reset(turn_token)
+        try:
+            response = await query_task
+        except asyncio.CancelledError:
+            if not turn.cancelled:
+                raise
+            await turn.cancellation_finished.wait()
+            return {
+                "text_query": text_query,
+                "response": None,
+                "audio_chunks": [],
+                "interrupted": True,
+                "barge_in": turn.report,
+                "latency": {
+                    "stt": round(stt_latency, 3),
+                    "total": round(time.time() - start_time, 3)
+                }
+            }
         process_latency = time.time() - process_start
         
         tts_start = time.time()
@@ -32,19 +109,32 @@ class VoiceInterface:
         
         audio_chunks = []
         first_chunk_time = None
+        interrupted = False
         
-        async for chunk in self.tts.synthesize_streaming(response_text):
-            if first_chunk_time is None:
-                first_chunk_time = time.time()
-            
-            audio_chunks.append(chunk)
-            
-            if on_response:
-                on_response(chunk)
-            
-            if self.interrupted:
-                self.interrupted = False
-                break
+        audio_stream = self.tts.synthesize_streaming(response_text)
+        turn.tts_text = response_text
+        turn.tts_streaming = True
+        self.is_speaking = True
+        try:
+            async for chunk in audio_stream:
+                if first_chunk_time is None:
+                    first_chunk_time = time.time()
+                
+                audio_chunks.append(chunk)
+                turn.tts_bytes += len(chunk)
+                
+                if on_response:
+                    on_response(chunk)
+                
+                if self.interrupted or turn.cancelled:
+                    break
+            # The stream also ends early when an interruption stops it between chunks
+            interrupted = self.interrupted or turn.cancelled
+            self.interrupted = False
+        finally:
+            self.is_speaking = False
+            turn.tts_streaming = False
+            await audio_stream.aclose()
         
         tts_latency = time.time() - tts_start
         first_audio_latency = (first_chunk_time - start_time) if first_chunk_time else 0
@@ -54,6 +144,8 @@ class VoiceInterface:
             "text_query": text_query,
             "response": response,
             "audio_chunks": audio_chunks,
+            "interrupted": interrupted,
+            "barge_in": turn.report if interrupted else None,
             "latency": {
                 "stt": round(stt_latency, 3),
                 "processing": round(process_latency, 3),
@@ -64,8 +156,30 @@ class VoiceInterface:
         }
     
     def interrupt(self):
+        """Synchronous barge-in: stop playback now and cancel the rest of the turn in the background"""
         self.interrupted = True
         self.tts.handle_interruption()
+        try:
+            asyncio.get_running_loop().create_task(self.barge_in())
+        except RuntimeError:
+            pass  # no event loop: nothing in flight to cancel
+    
+    async def barge_in(self) -> dict:
+        """Cancel the current turn's TTS stream, query generation and research; returns the work saved"""
+        self.interrupted = True
+        tts_streams_closed = self.tts.handle_interruption() if self._tts is not None else 0
+        if self._turn is None:
+            return {}
+        report = await self._turn.cancel()
+        report["tts_streams_closed"] = report.get("tts_streams_closed", 0) + tts_streams_closed
+        self.last_barge_in = report
+        return report
+    
+    async def aclose(self):
+        """Close the STT/TTS providers' pooled HTTP connections"""
+        for handler in (self._stt, self._tts):
+            if handler is not None:
+                await handler.aclose()
     
     async def text_to_speech(self, text: str) -> bytes:
         return await self.tts.synthesize(text)